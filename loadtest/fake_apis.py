@@ -0,0 +1,544 @@
+"""Local stand-ins for the Elexon BMRS and National Gas APIs.
+
+Both servers generate deterministic, realistically shaped data on the fly
+for any date range and any BM unit, so years of data for hundreds of units
+cost nothing to store: every value is derived from a checksum of the unit,
+timestamp and field name. Responses are streamed in chunks, so a year of
+B1610 for every unit does not have to fit in memory.
+
+Endpoints mirror the ones the taps call:
+
+- ``/balancing/acceptances``, ``/balancing/bid-offer`` and
+  ``/balancing/physical``: one unit and at most 7 days per request, as
+  the real API enforces
+- ``/datasets/B1610/stream``: any number of ``bmUnit`` parameters and
+  dates, returned as a bare JSON list
+- ``/balancing/pricing/market-index``: MIDP prices from two providers
+- ``/balancing/settlement/system-prices/<date>``: DISEBSP prices of a day
+- ``/operationaldata/v1/gasquality/latestdata``: National Gas quality of
+  every site at the latest six-minute publication
+
+Every server can inject latency and throttle a share of requests with 429
+and ``Retry-After``. Requests that pass ``page`` (and optionally
+``pageSize``) get that slice of the data plus ``totalPages``; without
+them the whole range is returned, which is what the taps expect. With
+``etags`` on, responses carry an ``ETag`` and a matching
+``If-None-Match`` is answered with 304, for exercising response caches.
+"""
+
+import http.server
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+HALF_HOUR = timedelta(minutes=30)
+MAX_BALANCING_DAYS = 7
+_CHUNK_RECORDS = 1000
+
+
+def _unit_value(*parts) -> float:
+    """Return a deterministic value in [0, 1) for the given key parts."""
+    return zlib.crc32("|".join(str(part) for part in parts).encode()) / 2 ** 32
+
+
+def _iso(moment: datetime) -> str:
+    """Format a UTC datetime the way BMRS does."""
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_time(text: str) -> datetime:
+    """Parse a ``from``/``to`` parameter: a date, or a minute-precision UTC time."""
+    text = text.replace("Z", "+00:00")
+    if "T" not in text:
+        return datetime.combine(date.fromisoformat(text), datetime.min.time(), timezone.utc)
+    moment = datetime.fromisoformat(text)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _half_hours(start: datetime, end: datetime) -> Iterator[datetime]:
+    """Yield the half-hour boundaries in ``[start, end)``."""
+    moment = start.replace(minute=0 if start.minute < 30 else 30, second=0, microsecond=0)
+    if moment < start:
+        moment += HALF_HOUR
+    while moment < end:
+        yield moment
+        moment += HALF_HOUR
+
+
+def _settlement(moment: datetime):
+    """Return the settlement date and period of a half hour (UTC, ignoring clock changes)."""
+    return moment.date().isoformat(), moment.hour * 2 + moment.minute // 30 + 1
+
+
+def _published() -> datetime:
+    """Return the time of the latest six-minute National Gas publication."""
+    now = datetime.now(timezone.utc)
+    return now.replace(minute=now.minute - now.minute % 6, second=0, microsecond=0)
+
+
+def _national_grid_unit(bm_unit: str) -> str:
+    """Derive a National Grid unit id from a BM unit id such as ``T_DRAXX-1``."""
+    return bm_unit.split("_", 1)[-1]
+
+
+class APIError(Exception):
+    """An error response: status and message."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Dispatch GET requests to the server's routes."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        throttled = server.admit()
+        if server.latency:
+            time.sleep(server.latency)
+        if throttled:
+            self._respond_error(429, "Too many requests", {"Retry-After": str(server.retry_after)})
+            return
+        self.etag = server.etag(url.path, url.query)
+        if self.etag is not None and self.headers.get("If-None-Match") == self.etag:
+            server.count_not_modified()
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        try:
+            records = server.route(url.path, params)
+            page = params.get("page")
+            if page is not None:
+                size = int(params.get("pageSize", [server.page_size])[0])
+                records = list(records)
+                pages = max(1, -(-len(records) // size))
+                index = int(page[0])
+                body = {
+                    "data": records[(index - 1) * size:index * size],
+                    "page": index,
+                    "pageSize": size,
+                    "totalPages": pages,
+                }
+                self._respond_json(json.dumps(body).encode())
+                return
+            self._respond_stream(records, *server.envelope(url.path))
+        except APIError as e:
+            self._respond_error(e.status, str(e))
+        except (KeyError, ValueError) as e:
+            self._respond_error(400, f"Invalid request: {e}")
+
+    def _respond_error(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        self.server.count_error(status)
+        body = json.dumps({"status": status, "message": message}).encode()
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _respond_json(self, body: bytes):
+        self.send_response(200)
+        self._send_etag()
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count_bytes(len(body))
+
+    def _respond_stream(self, records: Iterable[dict], head: str, tail: str):
+        """Send records, wrapped in ``head`` and ``tail``, in chunked transfer encoding."""
+        self.send_response(200)
+        self._send_etag()
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        sent = 0
+
+        def chunk(text: str):
+            nonlocal sent
+            data = text.encode()
+            if data:
+                self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                sent += len(data)
+
+        chunk(head)
+        buffered: List[str] = []
+        first = True
+        for record in records:
+            buffered.append(("" if first else ",") + json.dumps(record))
+            first = False
+            if len(buffered) >= _CHUNK_RECORDS:
+                chunk("".join(buffered))
+                buffered = []
+        chunk("".join(buffered) + tail)
+        self.wfile.write(b"0\r\n\r\n")
+        self.server.count_bytes(sent)
+
+    def _send_etag(self):
+        if self.etag is not None:
+            self.send_header("ETag", self.etag)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _FakeAPI(http.server.ThreadingHTTPServer):
+    """Threaded server with request accounting, latency and throttling."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        page_size: int = 1000,
+        seed: int = 0,
+        etags: bool = False,
+    ):
+        """Bind the server; port 0 picks a free port.
+
+        Args:
+            port: Port to listen on.
+            latency: Seconds added to every response.
+            throttle_rate: Share of requests answered with 429.
+            retry_after: ``Retry-After`` seconds sent with a 429.
+            page_size: Default ``pageSize`` of paginated requests.
+            seed: Seed of the throttling decisions, so runs are repeatable.
+            etags: Send an ``ETag`` with every response and answer a matching
+                ``If-None-Match`` with 304.
+        """
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.page_size = page_size
+        self.seed = seed
+        self.etags = etags
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.requests = 0
+        self.errors: Dict[int, int] = {}
+        self.bytes = 0
+        self.not_modified = 0
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def admit(self) -> bool:
+        """Count a request; return True if it should be throttled."""
+        with self._lock:
+            self.requests += 1
+            return self._random.random() < self.throttle_rate
+
+    def count_error(self, status: int) -> None:
+        """Count an error response."""
+        with self._lock:
+            self.errors[status] = self.errors.get(status, 0) + 1
+
+    def count_not_modified(self) -> None:
+        """Count a 304 response."""
+        with self._lock:
+            self.not_modified += 1
+
+    def count_bytes(self, size: int) -> None:
+        """Count response body bytes."""
+        with self._lock:
+            self.bytes += size
+
+    def stats(self) -> Dict[str, object]:
+        """Return the request, error and byte counts."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": dict(self.errors),
+                "bytes": self.bytes,
+                "not_modified": self.not_modified,
+            }
+
+    def etag(self, path: str, query: str) -> Optional[str]:
+        """Return the ETag of a response, or None when ETags are off.
+
+        Generated data depends only on the request, so its ETag does too.
+        """
+        if not self.etags:
+            return None
+        return f'"{zlib.crc32(f"{self.seed}|{path}|{query}".encode()):08x}"'
+
+    def route(self, path: str, params: Dict[str, List[str]]) -> Iterable[dict]:
+        """Return the records of a request."""
+        raise APIError(404, f"No route for {path}")
+
+    def envelope(self, path: str):
+        """Return the JSON text before and after the records of a response."""
+        return '{"data": [', "]}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+
+class FakeBMRS(_FakeAPI):
+    """Stand-in for the Elexon BMRS API under ``/bmrs/api/v1``."""
+
+    prefix = "/bmrs/api/v1"
+
+    def __init__(self, *args, pairs: int = 6, **kwargs):
+        """Initialize the server.
+
+        Args:
+            pairs: Bid-offer pairs per unit and half hour in BOD.
+            *args, **kwargs: Passed to the base server.
+        """
+        super().__init__(*args, **kwargs)
+        self.pairs = pairs
+
+    @property
+    def api_url(self) -> str:
+        """URL the taps' ``api_url`` should point at."""
+        return f"{self.url}{self.prefix}"
+
+    def envelope(self, path):
+        if path.endswith("/datasets/B1610/stream"):
+            return "[", "]"
+        return super().envelope(path)
+
+    def route(self, path, params):
+        if not path.startswith(self.prefix):
+            raise APIError(404, f"No route for {path}")
+        path = path[len(self.prefix):]
+        if path.startswith("/balancing/settlement/system-prices/"):
+            day = date.fromisoformat(path.rsplit("/", 1)[1])
+            start = datetime.combine(day, datetime.min.time(), timezone.utc)
+            return self.system_prices(start, start + timedelta(days=1))
+
+        start = _parse_time(params["from"][0])
+        end = _parse_time(params["to"][0])
+        if end < start:
+            raise APIError(400, "'to' must not be before 'from'")
+        if path == "/balancing/pricing/market-index":
+            return self.market_index(start, end)
+        if path == "/datasets/B1610/stream":
+            # Dates are inclusive
+            return self.b1610(params.get("bmUnit", []), start, end + timedelta(days=1))
+
+        handlers = {
+            "/balancing/acceptances": self.acceptances,
+            "/balancing/bid-offer": self.bid_offer,
+            "/balancing/physical": self.physical,
+        }
+        if path not in handlers:
+            raise APIError(404, f"No route for {path}")
+        if end - start > timedelta(days=MAX_BALANCING_DAYS):
+            raise APIError(400, f"The date range must not exceed {MAX_BALANCING_DAYS} days")
+        units = params.get("bmUnit")
+        if not units:
+            raise APIError(400, "bmUnit is required")
+        return handlers[path](units[0], start, end)
+
+    def bid_offer(self, unit: str, start: datetime, end: datetime) -> Iterator[dict]:
+        """BOD: ``pairs`` bid-offer pairs per half hour."""
+        ng_unit = _national_grid_unit(unit)
+        for moment in _half_hours(start, end):
+            settlement_date, period = _settlement(moment)
+            for pair in range(-(self.pairs // 2), self.pairs - self.pairs // 2):
+                if pair == 0:
+                    continue
+                level = round(100 * _unit_value(unit, moment, pair, "level"), 1) * (1 if pair > 0 else -1)
+                price = round(50 + 100 * _unit_value(unit, moment.date(), pair, "price"), 2)
+                yield {
+                    "settlementDate": settlement_date,
+                    "settlementPeriod": period,
+                    "timeFrom": _iso(moment),
+                    "timeTo": _iso(moment + HALF_HOUR),
+                    "levelFrom": level,
+                    "levelTo": level,
+                    "nationalGridBmUnit": ng_unit,
+                    "bmUnit": unit,
+                    "pairId": pair,
+                    "offer": price + 5 * abs(pair),
+                    "bid": price - 5 * abs(pair),
+                }
+
+    def acceptances(self, unit: str, start: datetime, end: datetime) -> Iterator[dict]:
+        """BOALF: an acceptance in about one half hour in four."""
+        ng_unit = _national_grid_unit(unit)
+        for moment in _half_hours(start, end):
+            if _unit_value(unit, moment, "accepted") >= 0.25:
+                continue
+            settlement_date, period = _settlement(moment)
+            level = round(400 * _unit_value(unit, moment, "level"))
+            yield {
+                "settlementDate": settlement_date,
+                "settlementPeriodFrom": period,
+                "settlementPeriodTo": period,
+                "timeFrom": _iso(moment),
+                "timeTo": _iso(moment + HALF_HOUR),
+                "levelFrom": level,
+                "levelTo": level + 10,
+                "nationalGridBmUnit": ng_unit,
+                "bmUnit": unit,
+                "acceptanceNumber": zlib.crc32(f"{unit}|{moment}".encode()) % 10 ** 6,
+                "acceptanceTime": _iso(moment - timedelta(minutes=15)),
+                "deemedBoFlag": False,
+                "soFlag": _unit_value(unit, moment, "so") < 0.3,
+                "storFlag": False,
+                "rrFlag": False,
+            }
+
+    def physical(self, unit: str, start: datetime, end: datetime) -> Iterator[dict]:
+        """Physical: PN, MELS and MILS per half hour."""
+        ng_unit = _national_grid_unit(unit)
+        for moment in _half_hours(start, end):
+            settlement_date, period = _settlement(moment)
+            for dataset in ("PN", "MELS", "MILS"):
+                level = round(500 * _unit_value(unit, moment, dataset))
+                yield {
+                    "dataset": dataset,
+                    "settlementDate": settlement_date,
+                    "settlementPeriod": period,
+                    "timeFrom": _iso(moment),
+                    "timeTo": _iso(moment + HALF_HOUR),
+                    "levelFrom": level,
+                    "levelTo": level,
+                    "nationalGridBmUnit": ng_unit,
+                    "bmUnit": unit,
+                }
+
+    def b1610(self, units: List[str], start: datetime, end: datetime) -> Iterator[dict]:
+        """B1610: metered output per unit per half hour."""
+        for moment in _half_hours(start, end):
+            settlement_date, period = _settlement(moment)
+            for unit in units:
+                yield {
+                    "dataset": "B1610",
+                    "psrType": "Generation",
+                    "bmUnit": unit,
+                    "nationalGridBmUnitId": _national_grid_unit(unit),
+                    "settlementDate": settlement_date,
+                    "settlementPeriod": period,
+                    "halfHourEndTime": _iso(moment + HALF_HOUR),
+                    "quantity": round(250 * _unit_value(unit, moment, "quantity"), 3),
+                }
+
+    def market_index(self, start: datetime, end: datetime) -> Iterator[dict]:
+        """MIDP: a price from each of two providers per half hour."""
+        for moment in _half_hours(start, end):
+            settlement_date, period = _settlement(moment)
+            for provider in ("APXMIDP", "N2EXMIDP"):
+                volume = 0 if provider == "N2EXMIDP" else round(2000 * _unit_value(moment, "volume"), 2)
+                yield {
+                    "startTime": _iso(moment),
+                    "dataProvider": provider,
+                    "settlementDate": settlement_date,
+                    "settlementPeriod": period,
+                    "price": round(40 + 80 * _unit_value(moment, provider), 2) if volume else 0,
+                    "volume": volume,
+                }
+
+    def system_prices(self, start: datetime, end: datetime) -> Iterator[dict]:
+        """DISEBSP: system prices and volumes per half hour."""
+        for moment in _half_hours(start, end):
+            settlement_date, period = _settlement(moment)
+            price = round(20 + 150 * _unit_value(moment, "price"), 5)
+            yield {
+                "settlementDate": settlement_date,
+                "settlementPeriod": period,
+                "startTime": _iso(moment),
+                "createdDateTime": _iso(moment + timedelta(days=1)),
+                "systemSellPrice": price,
+                "systemBuyPrice": price,
+                "bsadDefaulted": False,
+                "priceDerivationCode": "N",
+                "reserveScarcityPrice": 0,
+                "netImbalanceVolume": round(1000 * _unit_value(moment, "niv") - 500, 4),
+                "sellPriceAdjustment": 0,
+                "buyPriceAdjustment": 0,
+                "replacementPrice": None,
+                "replacementPriceReferenceVolume": None,
+                "totalAcceptedOfferVolume": round(2000 * _unit_value(moment, "offers"), 4),
+                "totalAcceptedBidVolume": -round(2000 * _unit_value(moment, "bids"), 4),
+                "totalAdjustmentSellVolume": 0,
+                "totalAdjustmentBuyVolume": round(50 * _unit_value(moment, "adjust"), 4),
+                "totalSystemTaggedAcceptedOfferVolume": 0,
+                "totalSystemTaggedAcceptedBidVolume": 0,
+                "totalSystemTaggedAdjustmentSellVolume": 0,
+                "totalSystemTaggedAdjustmentBuyVolume": 0,
+            }
+
+
+class FakeNationalGas(_FakeAPI):
+    """Stand-in for the National Gas operational data API."""
+
+    path = "/operationaldata/v1/gasquality/latestdata"
+
+    def __init__(self, *args, sites: int = 30, **kwargs):
+        """Initialize the server.
+
+        Args:
+            sites: Number of gas quality sites reported.
+            *args, **kwargs: Passed to the base server.
+        """
+        super().__init__(*args, **kwargs)
+        self.sites = sites
+
+    @property
+    def api_url(self) -> str:
+        """URL the tap's ``api_url`` should point at."""
+        return f"{self.url}{self.path}"
+
+    def route(self, path, params):
+        if path != self.path:
+            raise APIError(404, f"No route for {path}")
+        return self.latest()
+
+    def etag(self, path, query):
+        # The latest data changes with every publication
+        etag = super().etag(path, query)
+        return etag and f'{etag[:-1]}-{_published():%Y%m%d%H%M}"'
+
+    def envelope(self, path):
+        return f'{{"publishedTime": "{_iso(_published())}", "gasQualityData": [', "]}"
+
+    def latest(self) -> List[dict]:
+        """Gas quality of every site at the latest six-minute publication."""
+        published = _published()
+        return [
+            {
+                "siteId": site,
+                "siteName": f"Site {site}",
+                "areaName": f"Area {site // 5}",
+                "siteGasQualityDetail": {
+                    name: round(base + spread * _unit_value(site, published, name), 3)
+                    for name, base, spread in (
+                        ("cv24", 39.0, 1.0), ("sg24", 0.6, 0.03), ("cv", 39.0, 1.2),
+                        ("sg", 0.6, 0.03), ("wi", 50.0, 1.0), ("co2", 1.5, 0.8), ("n2", 0.8, 0.5),
+                    )
+                },
+            }
+            for site in range(1, self.sites + 1)
+        ]
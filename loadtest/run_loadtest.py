@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Run every tap -> target-influxdb pipeline against local stand-in APIs.
+
+Starts the fake BMRS and National Gas APIs (fake_apis.py) and the fake
+InfluxDB write API from the target's benchmarks, then runs each pipeline
+as ``<tap> --config ... | target-influxdb --config ...`` the way Meltano
+does. For each pipeline it reports wall time, API requests and errors,
+the points and write requests InfluxDB received, and the peak RSS of the
+tap and the target processes.
+
+Scale is set with --units (BM units), --days (history fetched by the
+incremental taps; B1610 always fetches a year), --pairs (BOD pairs per
+unit and half hour) and --sites (gas quality sites). --latency and
+--throttle-rate inject API latency and 429 responses.
+
+Usage:
+    python loadtest/run_loadtest.py [--pipelines bm b1610] [--units 200] [--days 30]
+        [--latency 0.05] [--throttle-rate 0.05] [--etags] [--tap-config '{"http_cache_dir": "cache"}']
+        [--target-config '{"write_mode": "pipelined"}']
+        [--json results.json] [--keep-logs DIR]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from fake_apis import FakeBMRS, FakeNationalGas
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "plugins" / "target-influxdb" / "benchmarks"))
+
+from fake_influxdb import FakeInfluxDB  # noqa: E402
+
+PIPELINES = ["nationalgas", "disebsp", "midp", "bm", "b1610"]
+
+
+def tap_configs(args, bmrs, gas):
+    """Build the tap executable and config of every pipeline."""
+    start_date = (datetime.now(timezone.utc) - timedelta(days=args.days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    units = [f"T_LOAD-{index:03d}" for index in range(1, args.units + 1)]
+    return {
+        "nationalgas": ("tap-nationalgas", {"api_url": gas.api_url}),
+        "disebsp": (
+            "tap-elexon-disebsp",
+            {"api_url": f"{bmrs.api_url}/balancing/settlement/system-prices", "start_date": start_date},
+        ),
+        "midp": (
+            "tap-elexon-midp",
+            {"api_url": f"{bmrs.api_url}/balancing/pricing/market-index", "start_date": start_date},
+        ),
+        "bm": ("tap-elexon-bm", {"api_url": bmrs.api_url, "bm_units": units, "start_date": start_date}),
+        "b1610": ("tap-elexon-b1610", {"api_url": bmrs.api_url, "bm_units": units}),
+    }
+
+
+def run_pipeline(tap, tap_config, target_config, log_dir):
+    """Run one tap piped into the target; return wall time, exit codes and peak RSS."""
+    tap_config_path = log_dir / f"{tap}.config.json"
+    target_config_path = log_dir / f"{tap}.target.json"
+    tap_config_path.write_text(json.dumps(tap_config))
+    target_config_path.write_text(json.dumps(target_config))
+
+    started = time.perf_counter()
+    with open(log_dir / f"{tap}.tap.log", "wb") as tap_log, \
+            open(log_dir / f"{tap}.target.log", "wb") as target_log:
+        tap_process = subprocess.Popen(
+            [tap, "--config", str(tap_config_path)], stdout=subprocess.PIPE, stderr=tap_log
+        )
+        target_process = subprocess.Popen(
+            ["target-influxdb", "--config", str(target_config_path)],
+            stdin=tap_process.stdout, stdout=subprocess.DEVNULL, stderr=target_log,
+        )
+        # The target owns the read end now
+        tap_process.stdout.close()
+        # wait4 reports each child's own peak RSS, in KiB on Linux
+        _, tap_status, tap_usage = os.wait4(tap_process.pid, 0)
+        _, target_status, target_usage = os.wait4(target_process.pid, 0)
+    tap_process.returncode = os.waitstatus_to_exitcode(tap_status)
+    target_process.returncode = os.waitstatus_to_exitcode(target_status)
+    return {
+        "seconds": round(time.perf_counter() - started, 2),
+        "tap_exit": tap_process.returncode,
+        "target_exit": target_process.returncode,
+        "tap_peak_mib": round(tap_usage.ru_maxrss / 1024, 1),
+        "target_peak_mib": round(target_usage.ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pipelines", nargs="+", choices=PIPELINES, default=PIPELINES)
+    parser.add_argument("--units", type=int, default=20, help="BM units configured for the BM and B1610 taps")
+    parser.add_argument("--days", type=int, default=7, help="days of history for the incremental taps")
+    parser.add_argument("--pairs", type=int, default=6, help="BOD bid-offer pairs per unit and half hour")
+    parser.add_argument("--sites", type=int, default=30, help="gas quality sites")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every API response")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of API requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--etags", action="store_true", help="send ETags and answer If-None-Match with 304")
+    parser.add_argument("--tap-config", type=json.loads, default={}, help="JSON settings merged into every tap config")
+    parser.add_argument("--write-delay", type=float, default=0.0, help="seconds InfluxDB takes per write")
+    parser.add_argument("--target-config", type=json.loads, default={}, help="JSON settings merged into the target config")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    parser.add_argument("--keep-logs", type=Path, help="directory for configs and logs (default: a temporary one)")
+    args = parser.parse_args()
+
+    if args.keep_logs:
+        args.keep_logs.mkdir(parents=True, exist_ok=True)
+        log_dir, cleanup = args.keep_logs, None
+    else:
+        cleanup = tempfile.TemporaryDirectory(prefix="loadtest-")
+        log_dir = Path(cleanup.name)
+
+    api_options = {
+        "latency": args.latency,
+        "throttle_rate": args.throttle_rate,
+        "retry_after": args.retry_after,
+        "etags": args.etags,
+    }
+    results = {}
+    failed = False
+    print(
+        f"{'pipeline':<12} {'seconds':>8} {'api reqs':>9} {'api errs':>9} {'api MiB':>8} "
+        f"{'points':>9} {'writes':>7} {'tap MiB':>8} {'target MiB':>11}  status"
+    )
+    try:
+        with FakeBMRS(pairs=args.pairs, **api_options) as bmrs, \
+                FakeNationalGas(sites=args.sites, **api_options) as gas, \
+                FakeInfluxDB(delay=args.write_delay) as influx:
+            configs = tap_configs(args, bmrs, gas)
+            target_config = {
+                "influxdb_url": influx.url,
+                "influxdb_token": "loadtest",
+                "influxdb_org": "loadtest",
+                "influxdb_bucket": "loadtest",
+                **args.target_config,
+            }
+            for name in args.pipelines:
+                tap, tap_config = configs[name]
+                api = bmrs if name != "nationalgas" else gas
+                api_before = api.stats()
+                influx.reset()
+
+                result = run_pipeline(tap, {**tap_config, **args.tap_config}, target_config, log_dir)
+                api_after = api.stats()
+                written = influx.stats()
+                result.update({
+                    "api_requests": api_after["requests"] - api_before["requests"],
+                    "api_errors": sum(api_after["errors"].values()) - sum(api_before["errors"].values()),
+                    "api_mib": round((api_after["bytes"] - api_before["bytes"]) / 1024 / 1024, 1),
+                    "points": written["points"],
+                    "write_requests": written["requests"],
+                })
+                results[name] = result
+                ok = result["tap_exit"] == 0 and result["target_exit"] == 0
+                failed = failed or not ok
+                print(
+                    f"{name:<12} {result['seconds']:>8} {result['api_requests']:>9} {result['api_errors']:>9} "
+                    f"{result['api_mib']:>8} {result['points']:>9} {result['write_requests']:>7} "
+                    f"{result['tap_peak_mib']:>8} {result['target_peak_mib']:>11}  "
+                    f"{'ok' if ok else 'FAILED (see ' + str(log_dir) + ')'}"
+                )
+    finally:
+        if cleanup is not None and not failed:
+            cleanup.cleanup()
+
+    if args.json:
+        args.json.write_text(json.dumps({"args": {k: str(v) for k, v in vars(args).items()}, "results": results}, indent=2) + "\n")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark the peak memory of parsing B1610 responses, whole vs streamed.
+
+Writes B1610 fixtures (a bare JSON list, as the API returns) for a number of
+units over windows of increasing length, then parses each with
+``response.json()`` and with ``iter_json_records`` reading the file as a
+streamed response body. Prints the time and traced peak memory of both and
+checks they yield the same records. Exits with status 1 if the streaming
+parser's peak grows by more than ``--max-growth`` from the shortest window
+to the longest, i.e. if its memory is not constant in the response size.
+
+Usage:
+    python benchmarks/bench_parse.py [--units N] [--days N [N ...]] [--max-growth X]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from elexon_common.jsonstream import iter_json_records
+
+HALF_HOUR = timedelta(minutes=30)
+
+
+def write_fixture(path, units, days):
+    """Write B1610 records for ``units`` BM units over ``days`` days; return the record count."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    count = 0
+    with open(path, "w") as f:
+        f.write("[")
+        for step in range(days * 48):
+            moment = start + step * HALF_HOUR
+            for unit in range(units):
+                record = {
+                    "dataset": "B1610",
+                    "psrType": "Generation",
+                    "bmUnit": f"T_BENCH-{unit}",
+                    "nationalGridBmUnitId": f"BENCH-{unit}",
+                    "settlementDate": moment.date().isoformat(),
+                    "settlementPeriod": step % 48 + 1,
+                    "halfHourEndTime": (moment + HALF_HOUR).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "quantity": zlib.crc32(f"{unit}|{step}".encode()) % 250000 / 1000,
+                }
+                f.write(("," if count else "") + json.dumps(record))
+                count += 1
+        f.write("]")
+    return count
+
+
+def fixture_response(path):
+    """Return a 200 response whose unread body is the fixture file, like ``stream=True``."""
+    response = requests.Response()
+    response.status_code = 200
+    response.encoding = "utf-8"
+    response.raw = open(path, "rb")
+    return response
+
+
+def parse_whole(response):
+    """Parse the body the way the taps did before: all of it, then every record."""
+    data = response.json()
+    return data.get("data", []) if isinstance(data, dict) else data
+
+
+def measure(path, parse):
+    """Parse a fixture; return (records, checksum, seconds, traced peak bytes)."""
+    response = fixture_response(path)
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = checksum = 0
+    for record in parse(response):
+        count += 1
+        checksum = zlib.crc32(record["halfHourEndTime"].encode(), checksum ^ int(record["quantity"] * 1000))
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    response.close()
+    return count, checksum, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--units", type=int, default=10)
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 120, 365])
+    parser.add_argument(
+        "--max-growth", type=float, default=1.5, help="allowed growth of the streaming peak across window sizes"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'days':>5} {'records':>9} {'body MiB':>9} {'json() s':>9} {'json() MiB':>11} "
+        f"{'stream s':>9} {'stream MiB':>11}"
+    )
+    failed = False
+    stream_peaks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for days in sorted(args.days):
+            path = os.path.join(tmp, f"b1610-{days}.json")
+            written = write_fixture(path, args.units, days)
+            whole = measure(path, parse_whole)
+            streamed = measure(path, iter_json_records)
+            stream_peaks.append(streamed[3])
+            print(
+                f"{days:>5} {written:>9} {os.path.getsize(path) / 2**20:>9.1f} "
+                f"{whole[2]:>9.2f} {whole[3] / 2**20:>11.1f} {streamed[2]:>9.2f} {streamed[3] / 2**20:>11.2f}"
+            )
+            if streamed[:2] != whole[:2] or whole[0] != written:
+                failed = True
+                print(f"  MISMATCH: json() gave {whole[0]} records, streaming gave {streamed[0]}")
+            os.remove(path)
+
+    growth = stream_peaks[-1] / stream_peaks[0]
+    print(f"Streaming peak grew {growth:.2f}x from {min(args.days)} to {max(args.days)} days")
+    if growth > args.max_growth:
+        failed = True
+        print(f"  REGRESSION: streaming peak grew more than {args.max_growth}x")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
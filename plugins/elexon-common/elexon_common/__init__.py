@@ -0,0 +1,17 @@
+"""Shared HTTP fetching for the Elexon BMRS taps."""
+
+from elexon_common.cache import ResponseCache
+from elexon_common.engine import ENGINE_SETTINGS, FetchEngine, FetchRequest
+from elexon_common.jsonstream import iter_json_records
+from elexon_common.ratelimit import TokenBucket
+from elexon_common.streams import ElexonStream
+
+__all__ = [
+    "ENGINE_SETTINGS",
+    "ElexonStream",
+    "FetchEngine",
+    "FetchRequest",
+    "ResponseCache",
+    "TokenBucket",
+    "iter_json_records",
+]
@@ -0,0 +1,240 @@
+"""Persistent HTTP response cache for the Elexon API.
+
+Historic BMRS windows rarely change once their settlement runs have closed,
+yet every sync downloads them again. The cache keeps response bodies in a
+SQLite file, keyed by URL and query parameters, so a later sync (or the
+retry of a failed one) can reuse them:
+
+- A response is fresh for the TTL of its data's age bucket: windows that
+  ended long ago can be kept for good, recent ones are revalidated sooner.
+  Age is measured from the end of the window a request covers, when the
+  stream knows it; requests without one get the TTL of age 0.
+- A stale entry is revalidated with ``If-None-Match`` / ``If-Modified-Since``
+  when the API sent an ``ETag`` or ``Last-Modified``; a 304 reuses the body.
+- Bodies are stored zlib-compressed, and the least recently used entries
+  are evicted once the stored bodies exceed ``max_bytes``.
+
+Only 200 responses are stored, and only when they can be reused: with a TTL,
+or with a validator to revalidate them.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from hashlib import sha256
+from typing import Iterable, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# (minimum age in days, TTL in seconds; -1 never expires), by age. Settlement
+# runs restate recent days, so only data over four weeks old is kept for good
+DEFAULT_TTLS: Tuple[Tuple[float, int], ...] = (
+    (0, 0),
+    (1, 3600),
+    (7, 86400),
+    (28, -1),
+)
+
+# Response headers kept with a body
+_STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Date")
+
+
+class CacheEntry(NamedTuple):
+    """A stored response."""
+
+    key: str
+    url: str
+    headers: dict
+    body: bytes
+    stored_at: float
+    ttl: int
+
+    @property
+    def fresh(self) -> bool:
+        """Whether the entry can be used without asking the API."""
+        return self.ttl < 0 or time.time() < self.stored_at + self.ttl
+
+    @property
+    def validators(self) -> dict:
+        """Conditional request headers that revalidate the entry."""
+        headers = {}
+        if self.headers.get("ETag"):
+            headers["If-None-Match"] = self.headers["ETag"]
+        if self.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = self.headers["Last-Modified"]
+        return headers
+
+    def response(self) -> requests.Response:
+        """Rebuild the stored response."""
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = self.url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = self.body
+        response._content_consumed = True
+        response.from_cache = True
+        return response
+
+
+def parse_ttls(ttls: Optional[Iterable[dict]]) -> Tuple[Tuple[float, int], ...]:
+    """Parse the ``http_cache_ttls`` setting into sorted (age days, TTL) buckets.
+
+    Raises:
+        ValueError: If a bucket lacks ``age_days`` or ``ttl_seconds``.
+    """
+    if not ttls:
+        return DEFAULT_TTLS
+    buckets = []
+    for bucket in ttls:
+        try:
+            buckets.append((float(bucket["age_days"]), int(bucket["ttl_seconds"])))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid http_cache_ttls entry {bucket!r}: {e}") from e
+    return tuple(sorted(buckets))
+
+
+class ResponseCache:
+    """SQLite store of compressed API responses with LRU eviction."""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 1024 * 1024 * 1024,
+        ttls: Sequence[Tuple[float, int]] = DEFAULT_TTLS,
+        compression_level: int = 6,
+    ):
+        """Open (or create) the cache file.
+
+        Args:
+            path: SQLite file of the cache.
+            max_bytes: Compressed bytes stored before least recently used entries are evicted.
+            ttls: (minimum age in days, TTL in seconds) buckets; a TTL of -1 never expires.
+            compression_level: zlib level of stored bodies.
+        """
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.ttls = tuple(sorted(ttls))
+        self.compression_level = compression_level
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                ttl INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)")
+
+    @staticmethod
+    def key(url: str, params) -> str:
+        """Return the cache key of a URL and its query parameters, in any order."""
+        if isinstance(params, dict):
+            params = params.items()
+        query = urlencode(sorted((str(k), str(v)) for k, v in (params or ())))
+        return sha256(f"{url}?{query}".encode()).hexdigest()
+
+    def ttl(self, window_end: Optional[datetime]) -> int:
+        """Return the TTL of data whose window ended at ``window_end``."""
+        age_days = 0.0
+        if window_end is not None:
+            if window_end.tzinfo is None:
+                window_end = window_end.replace(tzinfo=timezone.utc)
+            age_days = max(0.0, (datetime.now(timezone.utc) - window_end).total_seconds() / 86400)
+        ttl = 0
+        for min_age, bucket_ttl in self.ttls:
+            if age_days >= min_age:
+                ttl = bucket_ttl
+        return ttl
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return a stored entry, marking it as recently used."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, headers, body, stored_at, ttl FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        url, headers, body, stored_at, ttl = row
+        return CacheEntry(key, url, json.loads(headers), zlib.decompress(body), stored_at, ttl)
+
+    def put(self, key: str, response: requests.Response, ttl: int) -> None:
+        """Store a 200 response if it can be reused, then evict down to ``max_bytes``."""
+        if response.status_code != 200 or "no-store" in response.headers.get("Cache-Control", ""):
+            return
+        headers = {name: response.headers[name] for name in _STORED_HEADERS if name in response.headers}
+        if ttl == 0 and "ETag" not in headers and "Last-Modified" not in headers:
+            return
+        body = zlib.compress(response.content, self.compression_level)
+        if len(body) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, response.url, json.dumps(headers), body, len(body), now, now, ttl),
+            )
+            self._evict()
+
+    def refresh(self, key: str, response: requests.Response, ttl: int) -> None:
+        """Restart an entry's TTL after a 304, taking any new validators."""
+        with self._lock:
+            row = self._conn.execute("SELECT headers FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            headers = json.loads(row[0])
+            for name in ("ETag", "Last-Modified", "Date"):
+                if name in response.headers:
+                    headers[name] = response.headers[name]
+            now = time.time()
+            self._conn.execute(
+                "UPDATE responses SET headers = ?, stored_at = ?, accessed_at = ?, ttl = ? WHERE key = ?",
+                (json.dumps(headers), now, now, ttl, key),
+            )
+
+    def close(self) -> None:
+        """Checkpoint the write-ahead log into the cache file and close it."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            try:
+                # Streams share the file; a checkpoint blocked by another
+                # stream's reader is finished by the last one to close
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                self._conn.close()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the stored bodies fit ``max_bytes``."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.evicted += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
@@ -0,0 +1,326 @@
+"""Asyncio fetch engine for the Elexon BMRS API.
+
+Every Elexon tap turns its work into a list of requests (one per BM unit
+and date window, one per day, ...). The engine sends them on an event loop
+with at most ``max_concurrency`` in flight, shares a pooled keep-alive
+``requests`` session between them, waits on a token bucket before every
+attempt and retries throttled (429), unavailable (5xx) and failed
+connections, honouring ``Retry-After`` up to ``backoff_max``. A stream can
+hand the engine its own response validation and backoff (see
+``ElexonStream``). Responses are handed back in request
+order, so streams emit records (and advance bookmarks) exactly as a serial
+fetch would. Requests marked ``stream`` come back with their body unread, to
+be parsed as it arrives (see ``jsonstream``).
+
+HTTP calls run on a thread pool owned by the event loop; ``requests`` has no
+asyncio interface, but its connection pool is what keeps connections to the
+API alive between requests.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Generator, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from singer_sdk import typing as th
+from singer_sdk.exceptions import FatalAPIError, RetriableAPIError
+
+from elexon_common.cache import ResponseCache, parse_ttls
+from elexon_common.ratelimit import TokenBucket
+
+# Settings every Elexon tap accepts, read by FetchEngine.from_config
+ENGINE_SETTINGS = (
+    th.Property(
+        "max_concurrent_requests",
+        th.IntegerType,
+        default=4,
+        description="Requests each stream has in flight at once (1 fetches serially)"
+    ),
+    th.Property(
+        "max_requests_per_second",
+        th.NumberType,
+        default=5,
+        description="Requests per second across all streams, retries included (0 disables the limit)"
+    ),
+    th.Property(
+        "http_cache_dir",
+        th.StringType,
+        description="Directory of the persistent HTTP response cache (no caching when unset)"
+    ),
+    th.Property(
+        "http_cache_max_mb",
+        th.NumberType,
+        default=1024,
+        description="Compressed response bodies kept in the cache before the least recently used are evicted"
+    ),
+    th.Property(
+        "http_cache_ttls",
+        th.ArrayType(
+            th.ObjectType(
+                th.Property("age_days", th.NumberType, required=True),
+                th.Property("ttl_seconds", th.IntegerType, required=True),
+            )
+        ),
+        description="Seconds a cached response stays fresh, by the age of its data in days (-1 never expires)"
+    ),
+)
+
+RETRIABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+Params = Union[Dict[str, Any], List[Tuple[str, Any]]]
+
+
+class FetchRequest(NamedTuple):
+    """One GET request to the API."""
+
+    url: str
+    params: Optional[Params] = None
+    # End of the data window the request covers, for the cache TTL
+    window_end: Optional[datetime] = None
+    # Leave the body unread until it is consumed (requests' stream=True)
+    stream: bool = False
+    # Request to send instead of a GET of url and params, which then only
+    # key the cache
+    prepared: Optional[requests.PreparedRequest] = None
+
+
+def retry_after(response: requests.Response) -> Optional[float]:
+    """Return the seconds a response asks the client to wait, if it says."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class FetchEngine:
+    """Fetch API requests concurrently and yield the responses in order."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        rate_limiter: Optional[TokenBucket] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 300,
+        max_tries: int = 5,
+        backoff_factor: float = 2.0,
+        backoff_max: float = 60.0,
+        cache: Optional[ResponseCache] = None,
+        logger: Optional[logging.Logger] = None,
+        validate: Optional[Callable[[requests.Response], None]] = None,
+        wait_generator: Optional[Callable[[], Generator[float, Any, None]]] = None,
+        jitter: Optional[Callable[[float], float]] = None,
+    ):
+        """Initialize the engine and its connection pool.
+
+        Args:
+            max_concurrency: Requests in flight (or fetched and waiting to be consumed) at once.
+            rate_limiter: Token bucket every attempt waits on; none means no limit.
+            headers: Headers sent with every request.
+            timeout: Seconds to wait for a response.
+            max_tries: Attempts per request before giving up.
+            backoff_factor: Seconds before the first retry, doubled on every further retry.
+            backoff_max: Longest wait between attempts, ``Retry-After`` included.
+            cache: Persistent response cache; none means every request goes to the API.
+            logger: Logger for retries; the module logger when None.
+            validate: Raises FatalAPIError or RetriableAPIError for a response
+                that is not usable, like ``RESTStream.validate_response``;
+                none fails 4xx responses and retries RETRIABLE_STATUS_CODES.
+            wait_generator: Creates a ``backoff`` wait generator for the
+                retries of one request, like ``RESTStream.backoff_wait_generator``;
+                none waits ``backoff_factor`` seconds, doubled on every retry.
+            jitter: Applied to every wait of ``wait_generator``.
+        """
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.rate_limiter = rate_limiter or TokenBucket(0)
+        self.timeout = timeout
+        self.max_tries = max(1, int(max_tries))
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.cache = cache
+        self.logger = logger or logging.getLogger(__name__)
+        self.validate = validate
+        self.wait_generator = wait_generator
+        self.jitter = jitter
+        self.requests_sent = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.not_modified = 0
+
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        # One keep-alive connection per request in flight
+        adapter = HTTPAdapter(pool_connections=self.max_concurrency, pool_maxsize=self.max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @classmethod
+    def from_config(cls, config: dict, **kwargs) -> "FetchEngine":
+        """Create an engine from a tap config with the ENGINE_SETTINGS."""
+        if "rate_limiter" not in kwargs:
+            kwargs["rate_limiter"] = TokenBucket(config.get("max_requests_per_second", 5))
+        if config.get("http_cache_dir") and "cache" not in kwargs:
+            os.makedirs(config["http_cache_dir"], exist_ok=True)
+            kwargs["cache"] = ResponseCache(
+                os.path.join(config["http_cache_dir"], "responses.sqlite"),
+                max_bytes=int(float(config.get("http_cache_max_mb", 1024)) * 1024 * 1024),
+                ttls=parse_ttls(config.get("http_cache_ttls")),
+            )
+        return cls(max_concurrency=config.get("max_concurrent_requests", 4), **kwargs)
+
+    def fetch_all(self, fetch_requests: Iterable[FetchRequest]) -> Iterator[requests.Response]:
+        """Fetch every request and yield the responses in request order.
+
+        Requests are started as earlier responses are consumed, so at most
+        ``max_concurrency`` responses are in flight or held in memory.
+
+        Raises:
+            FatalAPIError: If the API rejects a request.
+            RetriableAPIError: If a request still fails after ``max_tries`` attempts.
+        """
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="elexon-fetch")
+        loop.set_default_executor(executor)
+        pending = deque()
+        remaining = iter(fetch_requests)
+        try:
+            for request in remaining:
+                pending.append(loop.create_task(self.fetch(request)))
+                if len(pending) >= self.max_concurrency:
+                    break
+            while pending:
+                # Running the loop until the oldest task is done also
+                # progresses the others
+                response = loop.run_until_complete(pending.popleft())
+                request = next(remaining, None)
+                if request is not None:
+                    pending.append(loop.create_task(self.fetch(request)))
+                yield response
+            if self.cache is not None:
+                self.logger.info(
+                    f"HTTP cache: {self.cache_hits} fresh hits, {self.not_modified} revalidated "
+                    f"(304), {self.requests_sent} requests sent"
+                )
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                results = loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                for result in results:
+                    # Release the connections of streamed bodies never read
+                    if isinstance(result, requests.Response):
+                        result.close()
+            loop.close()
+            executor.shutdown(wait=True)
+
+    async def fetch(self, request: FetchRequest) -> requests.Response:
+        """Fetch one request, retrying throttled and failed attempts.
+
+        Raises:
+            FatalAPIError: If the API rejects the request.
+            RetriableAPIError: If the request still fails after ``max_tries`` attempts.
+        """
+        loop = asyncio.get_running_loop()
+        key = entry = None
+        if self.cache is not None:
+            key = ResponseCache.key(request.url, request.params)
+            entry = await loop.run_in_executor(None, self.cache.get, key)
+            if entry is not None and entry.fresh:
+                self.cache_hits += 1
+                return entry.response()
+        headers = entry.validators if entry is not None else None
+
+        waits = None
+        for attempt in range(1, self.max_tries + 1):
+            await self.rate_limiter.wait()
+            self.requests_sent += 1
+            try:
+                response = await loop.run_in_executor(None, self._get, request, headers)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, delay = RetriableAPIError(f"{e} for path: {request.url}"), None
+            else:
+                if response.status_code == 304 and entry is not None:
+                    response.close()
+                    self.not_modified += 1
+                    ttl = self.cache.ttl(request.window_end)
+                    await loop.run_in_executor(None, self.cache.refresh, key, response, ttl)
+                    return entry.response()
+                try:
+                    self._validate(request, response)
+                except RetriableAPIError as e:
+                    response.close()
+                    error, delay = e, retry_after(response)
+                except Exception:
+                    response.close()
+                    raise
+                else:
+                    if self.cache is not None:
+                        ttl = self.cache.ttl(request.window_end)
+                        await loop.run_in_executor(None, self.cache.put, key, response, ttl)
+                    return response
+
+            if attempt == self.max_tries:
+                raise error
+            if delay is None:
+                if self.wait_generator is None:
+                    delay = self.backoff_factor * 2 ** (attempt - 1)
+                else:
+                    if waits is None:
+                        # backoff generators are primed with an empty send
+                        waits = self.wait_generator()
+                        waits.send(None)
+                    delay = waits.send(error)
+                    if self.jitter is not None:
+                        delay = self.jitter(delay)
+            # A broken or hostile Retry-After must not stall the sync
+            delay = min(self.backoff_max, delay)
+            self.retries += 1
+            self.logger.warning(f"{error}; retrying in {delay:.1f}s (attempt {attempt} of {self.max_tries})")
+            await asyncio.sleep(delay)
+
+    def close(self) -> None:
+        """Close the pooled connections and the cache."""
+        try:
+            self.session.close()
+        finally:
+            if self.cache is not None:
+                self.cache.close()
+
+    def _validate(self, request: FetchRequest, response: requests.Response) -> None:
+        """Raise FatalAPIError or RetriableAPIError if a response is not usable."""
+        if self.validate is not None:
+            self.validate(response)
+            return
+        if response.status_code < 400:
+            return
+        message = f"{response.status_code} {response.reason} for path: {request.url}"
+        if response.status_code not in RETRIABLE_STATUS_CODES:
+            raise FatalAPIError(message)
+        raise RetriableAPIError(message, response)
+
+    def _get(self, request: FetchRequest, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """Send one request; runs on the loop's thread pool."""
+        if request.prepared is None:
+            return self.session.get(
+                request.url, params=request.params, headers=headers, timeout=self.timeout, stream=request.stream
+            )
+        prepared = request.prepared
+        if headers:
+            prepared = prepared.copy()
+            prepared.headers.update(headers)
+        settings = self.session.merge_environment_settings(prepared.url, {}, request.stream, None, None)
+        return self.session.send(prepared, timeout=self.timeout, **settings)
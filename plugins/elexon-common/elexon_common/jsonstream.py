@@ -0,0 +1,157 @@
+"""Incremental parsing of the record arrays in BMRS responses.
+
+BMRS returns records either as a bare JSON array or as the ``data`` array
+of an object. ``response.json()`` builds the whole body and then every
+record before the first one can be used, so a year of B1610 for many units
+costs hundreds of MB. ``iter_json_records`` instead decodes the body as it
+is read, chunk by chunk, and yields each record as soon as it is complete;
+memory is bounded by a chunk plus one record, whatever the size of the
+response.
+
+Records are decoded with the standard library decoder (``raw_decode``), so
+they are the same dicts ``response.json()`` would have produced.
+"""
+
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+import requests
+
+CHUNK_SIZE = 64 * 1024
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class _Buffer:
+    """Decoded text of a byte stream, read as far as the parser needs."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        """Initialize an empty buffer over byte chunks."""
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self) -> bool:
+        """Append the next chunk, dropping consumed text; False at the end of the stream."""
+        if self.eof:
+            return False
+        text = ""
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                break
+        else:
+            text = self._decoder.decode(b"", final=True)
+            self.eof = True
+        self.text = self.text[self.pos:] + text
+        self.pos = 0
+        return bool(text) or not self.eof
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character; empty at the end of the stream."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return ""
+
+    def value(self) -> Any:
+        """Decode the JSON value at the current position.
+
+        Raises:
+            json.JSONDecodeError: If the value is invalid or the stream ends inside it.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                # Most likely the value continues in the next chunk
+                if self.more():
+                    continue
+                raise
+            # A number that reaches the end of the text (or is followed only by
+            # what could be the rest of it, like "1." of "1.5") may continue
+            # in the next chunk
+            if (
+                isinstance(value, (int, float))
+                and not self.text[end:].strip(_NUMBER_CHARS)
+                and self.more()
+            ):
+                continue
+            self.pos = end
+            return value
+
+
+def _items(buffer: _Buffer) -> Iterator[Any]:
+    """Yield the items of the array that starts at the buffer's position."""
+    buffer.pos += 1
+    while True:
+        char = buffer.peek()
+        if char == "]":
+            buffer.pos += 1
+            return
+        if char == ",":
+            buffer.pos += 1
+            continue
+        if char == "":
+            raise ValueError("Response ended inside a JSON array")
+        yield buffer.value()
+
+
+def iter_json_chunks(chunks: Iterable[bytes], key: str = "data") -> Iterator[Any]:
+    """Yield the records of a JSON body given as byte chunks.
+
+    The records are the items of a top-level array, or of the array under
+    ``key`` in a top-level object; keys after that array are not read. An
+    empty body or an object without the array has no records.
+
+    Raises:
+        ValueError: If the body is not valid JSON of either shape.
+    """
+    buffer = _Buffer(chunks)
+    first = buffer.peek()
+    if first == "":
+        return
+    if first == "[":
+        yield from _items(buffer)
+        return
+    if first != "{":
+        raise ValueError(f"Expected a JSON object or array, got {first!r}")
+
+    buffer.pos += 1
+    while True:
+        char = buffer.peek()
+        if char in ("}", ""):
+            return
+        if char == ",":
+            buffer.pos += 1
+            continue
+        name = buffer.value()
+        if buffer.peek() != ":":
+            raise ValueError(f"Expected ':' after key {name!r}")
+        buffer.pos += 1
+        if name == key and buffer.peek() == "[":
+            yield from _items(buffer)
+            return
+        # Skip the value of any other key
+        buffer.value()
+
+
+def iter_json_records(response: requests.Response, key: str = "data") -> Iterator[Any]:
+    """Yield the records of a response as its body is read.
+
+    Works on streamed responses (``stream=True``), which are then never held
+    in memory whole, and on responses whose body was already read.
+
+    Raises:
+        ValueError: If the body is not valid JSON of the expected shape.
+    """
+    yield from iter_json_chunks(response.iter_content(CHUNK_SIZE), key)
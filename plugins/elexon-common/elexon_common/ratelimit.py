@@ -0,0 +1,54 @@
+"""Token-bucket rate limiting shared by threads and event loops."""
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second on average, with bursts of up to ``burst``.
+
+    The bucket is guarded by a thread lock rather than an asyncio lock, so one
+    bucket can be shared by streams that run on different threads, each with
+    its own event loop.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """Initialize a full bucket; a rate of 0 or less disables the limit.
+
+        Args:
+            rate: Tokens added per second.
+            burst: Most tokens the bucket holds, i.e. requests sent back to back.
+        """
+        self.rate = float(rate) if rate and rate > 0 else 0.0
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return the seconds to wait before it may be used.
+
+        The bucket goes into debt rather than refusing, so callers are served
+        in the order they asked.
+        """
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self) -> None:
+        """Block the calling thread until a token is available."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def wait(self) -> None:
+        """Wait, without blocking the event loop, until a token is available."""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
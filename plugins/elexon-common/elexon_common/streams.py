@@ -0,0 +1,120 @@
+"""Base stream for taps that fetch through the shared engine."""
+
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from singer_sdk.streams import RESTStream
+
+from elexon_common.engine import FetchEngine, FetchRequest
+from elexon_common.jsonstream import iter_json_records
+from elexon_common.ratelimit import TokenBucket
+
+
+class ElexonStream(RESTStream):
+    """REST stream whose requests are sent by a FetchEngine.
+
+    Subclasses describe requests as usual (``url_base``, ``path``,
+    ``get_url_params``, ``parse_response``, ``post_process``); ``get_records``
+    fetches one request per context, concurrently, and yields the records in
+    context order. Responses are parsed incrementally, so records are
+    yielded as the body is decoded instead of after it is all in memory.
+
+    The engine sends the request built by ``prepare_request``, checks
+    responses with ``validate_response`` and retries with
+    ``backoff_max_tries``, ``backoff_wait_generator`` and ``backoff_jitter``,
+    so overrides of those apply as they would to a plain RESTStream. A
+    ``Retry-After`` header takes the place of the generator's wait, and no
+    wait is longer than the engine's ``backoff_max``. ``backoff_handler`` is
+    not called; the engine logs every retry itself.
+    """
+
+    # Retry request timeouts as well as 429 and 5xx responses
+    extra_retry_statuses = [408, 429]
+
+    # Read response bodies from the connection as they are parsed, for
+    # responses too large to hold whole (unless the HTTP cache is on, which
+    # stores whole bodies)
+    stream_responses = False
+
+    def __init__(self, tap, rate_limiter: Optional[TokenBucket] = None, **kwargs):
+        """Initialize the stream with the tap's shared rate limiter."""
+        super().__init__(tap, **kwargs)
+        self.rate_limiter = rate_limiter or TokenBucket(self.config.get("max_requests_per_second", 5))
+        self._engine: Optional[FetchEngine] = None
+
+    @property
+    def engine(self) -> FetchEngine:
+        """Return the stream's fetch engine, created on first use."""
+        if self._engine is None:
+            self._engine = FetchEngine.from_config(
+                self.config,
+                rate_limiter=self.rate_limiter,
+                headers=self.http_headers,
+                logger=self.logger,
+                max_tries=self.backoff_max_tries(),
+                validate=self.validate_response,
+                wait_generator=self.backoff_wait_generator,
+                jitter=self.backoff_jitter,
+            )
+        return self._engine
+
+    def sync(self, context: Optional[dict] = None) -> None:
+        """Sync the stream, then close its engine.
+
+        Each stream owns its engine, so with ``parallel_streams`` every
+        stream closes its own when its sync ends, whether or not it failed.
+        """
+        try:
+            super().sync(context)
+        finally:
+            self.close_engine()
+
+    def close_engine(self) -> None:
+        """Close the engine's connections and cache; a later sync creates a new one."""
+        if self._engine is not None:
+            self._engine.close()
+            self._engine = None
+
+    def get_records(self, context):
+        """Fetch the stream's single request and yield its records."""
+        yield from self.fetch_records([context or {}])
+
+    def fetch_records(self, contexts: Iterable[dict]) -> Iterator[dict]:
+        """Fetch one request per context and yield the records in context order."""
+        contexts = list(contexts)
+        fetch_requests = [
+            FetchRequest(
+                self.get_url(context),
+                self.get_url_params(context, None),
+                self.get_window_end(context),
+                stream=self.stream_responses,
+                prepared=self.prepare_request(context, None),
+            )
+            for context in contexts
+        ]
+        responses = self.engine.fetch_all(fetch_requests)
+        for response, context in zip(responses, contexts):
+            self.log_fetched(context, response)
+            try:
+                for record in self.parse_response(response):
+                    row = self.post_process(record, context)
+                    if row is not None:
+                        yield row
+            finally:
+                response.close()
+
+    def parse_response(self, response) -> Iterator[dict]:
+        """Yield the records of a response (a bare array or the ``data`` array) as it is decoded."""
+        yield from iter_json_records(response)
+
+    def get_window_end(self, context: dict) -> Optional[datetime]:
+        """Return the end of the data window a context covers, for the cache TTL.
+
+        Defaults to the context's ``to_date``; None means the data is current.
+        """
+        to_date = context.get("to_date")
+        return to_date if isinstance(to_date, datetime) else None
+
+    def log_fetched(self, context: dict, response) -> None:
+        """Log a fetched response; override to describe the context."""
+        self.logger.info(f"Fetched {self.name} data from {response.url}")
@@ -1,17 +1,18 @@
 """Stream classes for B1610 data."""
 
 from datetime import datetime, timedelta, timezone
+from elexon_common import ElexonStream
 from singer_sdk import typing as th
-from singer_sdk.streams import RESTStream
 
 
-class B1610Stream(RESTStream):
+class B1610Stream(ElexonStream):
     """Stream for B1610 Actual Generation Output per BM Unit."""
 
     name = "B1610"
     path = "/datasets/B1610/stream"
     primary_keys = ["bmUnit", "settlementDate", "settlementPeriod"]
-    replication_key = None  # Disable state tracking - always fetch 365 days
+    replication_key = "halfHourEndTime"  # Bookmark; each sync also re-fetches the last restatement_days before now
+    stream_responses = True  # A year for every unit is too large to read whole
 
     schema = th.PropertiesList(
         th.Property("dataset", th.StringType),
@@ -27,8 +28,8 @@ class B1610Stream(RESTStream):
     def compare_start_date(self, value, start_date_value):
         """Override to avoid timezone comparison issues.
         
-        We use lookback-based sync instead of state-based, so we don't
-        need to compare with start_date. Just return the value as-is.
+        The fetch window is bounded by lookback_days in get_records, so the
+        bookmark does not need comparing with start_date. Just return it as-is.
         """
         return value
 
@@ -47,57 +48,19 @@ class B1610Stream(RESTStream):
         from_str = from_dt.strftime("%Y-%m-%d")
         to_str = to_dt.strftime("%Y-%m-%d")
         
-        # Get all bmUnits from context
-        bm_units = context.get("bm_units", [])
-        
-        # Build params with multiple bmUnit values
-        params = {
-            "from": from_str,
-            "to": to_str,
-            "format": "json"
-        }
-        
+        # Build params with one bmUnit value per unit
+        params = [("from", from_str), ("to", to_str), ("format", "json")]
+        params.extend(("bmUnit", unit) for unit in context.get("bm_units", []))
+
         return params
-    
-    def prepare_request(self, context, next_page_token):
-        """Prepare the request with multiple bmUnit parameters."""
-        http_method = self.rest_method
-        url = self.get_url(context)
-        params = self.get_url_params(context, next_page_token)
-        
-        # Add multiple bmUnit parameters
-        bm_units = context.get("bm_units", [])
-        if bm_units:
-            # Create a list of tuples for multiple same-key params
-            param_list = [(k, v) for k, v in params.items()]
-            for unit in bm_units:
-                param_list.append(("bmUnit", unit))
-            params = param_list
-        
-        request_data = self.prepare_request_payload(context, next_page_token)
-        headers = self.http_headers
-        
-        return self.build_prepared_request(
-            method=http_method,
-            url=url,
-            params=params,
-            headers=headers,
-            json=request_data,
-        )
 
     def parse_response(self, response):
-        """Parse the API response."""
-        data = response.json()
-        if isinstance(data, dict):
-            records = data.get("data", [])
-        else:
-            records = data
-        
-        # Log first record to debug
-        if records:
-            self.logger.info(f"Sample API response record: {records[0]}")
-        
-        yield from records
+        """Parse the API response as it is read."""
+        for index, record in enumerate(super().parse_response(response)):
+            # Log first record to debug
+            if index == 0:
+                self.logger.info(f"Sample API response record: {record}")
+            yield record
 
     def post_process(self, row, context):
         """Process record - quantity field should already be present from API."""
@@ -114,18 +77,43 @@ class B1610Stream(RESTStream):
         return row
 
     def get_records(self, context):
-        """Fetch records for all BM units in a single request for the last 365 days."""
+        """Fetch records for all BM units in a single request.
+
+        The first sync, and every sync with deep_reconcile, fetches the last
+        lookback_days. Later syncs fetch from the halfHourEndTime bookmark or
+        from restatement_days before now, whichever is earlier, since
+        settlement runs keep revising recent data: after a gap longer than
+        the restatement window they still resume from the bookmark. No sync
+        fetches from before start_date, when it is set.
+        """
         bm_units = self.config.get("bm_units", [])
         
         if not bm_units:
             self.logger.warning("No BM units configured, skipping sync")
             return
         
-        # Always fetch last 365 days
         end_dt = datetime.now(timezone.utc)
-        start_dt = end_dt - timedelta(days=365)
-        
-        self.logger.info(f"Fetching last 365 days from {start_dt.date()} to {end_dt.date()}")
+        floor_dt = end_dt - timedelta(days=self.config.get("lookback_days", 365))
+        if self.config.get("start_date"):
+            start_date = datetime.fromisoformat(self.config["start_date"].replace("Z", "+00:00"))
+            if start_date.tzinfo is None:
+                start_date = start_date.replace(tzinfo=timezone.utc)
+            floor_dt = max(floor_dt, start_date)
+
+        has_bookmark = "replication_key_value" in self.get_context_state(context)
+        if self.config.get("deep_reconcile", False) or not has_bookmark:
+            start_dt = floor_dt
+            self.logger.info(f"Full sync: fetching from {start_dt.date()} to {end_dt.date()}")
+        else:
+            start_dt = self.get_starting_timestamp(context)
+            if start_dt.tzinfo is None:
+                start_dt = start_dt.replace(tzinfo=timezone.utc)
+            restatement_dt = end_dt - timedelta(days=self.config.get("restatement_days", 28))
+            start_dt = max(floor_dt, min(start_dt, restatement_dt))
+            self.logger.info(
+                f"Incremental sync: fetching from {start_dt.date()} to {end_dt.date()} "
+                f"(restatement window of {self.config.get('restatement_days', 28)} days)"
+            )
         
         # Set context for all BM units
         context = context or {}
@@ -135,5 +123,5 @@ class B1610Stream(RESTStream):
         
         self.logger.info(f"Fetching B1610 data for {len(bm_units)} BM units: {', '.join(bm_units)}")
         
-        # Call parent get_records with this context - single API call for all units
-        yield from super().get_records(context)
+        # Single API call for all units
+        yield from self.fetch_records([context])
@@ -3,6 +3,7 @@
 from typing import List
 from singer_sdk import Tap, Stream
 from singer_sdk import typing as th
+from elexon_common import ENGINE_SETTINGS
 from tap_elexon_b1610.streams import B1610Stream
 
 
@@ -27,8 +28,30 @@ class TapElexonB1610(Tap):
         th.Property(
             "start_date",
             th.DateTimeType,
-            description="Start date for initial data extraction (ISO 8601 format)"
+            description="Earliest date any sync fetches (ISO 8601 format); lookback_days alone when unset"
         ),
+        th.Property(
+            "restatement_days",
+            th.IntegerType,
+            default=28,
+            description=(
+                "Days before now that incremental syncs re-fetch, to pick up restated data; "
+                "syncs start from the bookmark instead when it is older"
+            )
+        ),
+        th.Property(
+            "lookback_days",
+            th.IntegerType,
+            default=365,
+            description="Days fetched by the first sync and by deep reconciles, from start_date at the earliest"
+        ),
+        th.Property(
+            "deep_reconcile",
+            th.BooleanType,
+            default=False,
+            description="Ignore the bookmark and re-fetch the full lookback_days"
+        ),
+        *ENGINE_SETTINGS,
     ).to_dict()
 
     def discover_streams(self) -> List[Stream]:
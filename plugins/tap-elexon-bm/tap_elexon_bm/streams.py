@@ -1,13 +1,54 @@
 """Stream classes for Elexon BM data."""
 
+import threading
 from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from elexon_common import ElexonStream, TokenBucket
 from singer_sdk import typing as th
-from singer_sdk.streams import RESTStream
 
 
-class BaseBMStream(RESTStream):
+class BaseBMStream(ElexonStream):
     """Base class for Balancing Mechanism streams with common functionality."""
 
+    def __init__(
+        self,
+        tap,
+        rate_limiter: Optional[TokenBucket] = None,
+        state_lock: Optional[threading.RLock] = None,
+        **kwargs,
+    ):
+        """Initialize the stream with the tap's shared rate limiter and state lock."""
+        super().__init__(tap, rate_limiter=rate_limiter, **kwargs)
+        # The tap state is one dict shared by every stream; when streams sync
+        # in parallel, changes to it and STATE messages are made under this lock
+        self.state_lock = state_lock or threading.RLock()
+
+    def _increment_stream_state(self, latest_record, *, context=None):
+        """Advance the stream's bookmark under the state lock."""
+        with self.state_lock:
+            super()._increment_stream_state(latest_record, context=context)
+
+    def _write_starting_replication_value(self, context):
+        """Record the starting bookmark under the state lock."""
+        with self.state_lock:
+            super()._write_starting_replication_value(context)
+
+    def _write_replication_key_signpost(self, context, value):
+        """Record the bookmark signpost under the state lock."""
+        with self.state_lock:
+            super()._write_replication_key_signpost(context, value)
+
+    def _finalize_state(self, state=None):
+        """Promote the stream's progress markers under the state lock."""
+        with self.state_lock:
+            super()._finalize_state(state)
+
+    def _write_state_message(self):
+        """Write a STATE message of a consistent snapshot of the tap state."""
+        with self.state_lock:
+            super()._write_state_message()
+
     @property
     def url_base(self) -> str:
         """Return the API base URL."""
@@ -33,16 +74,6 @@ class BaseBMStream(RESTStream):
             "format": "json"
         }
 
-    def parse_response(self, response):
-        """Parse the API response."""
-        data = response.json()
-        if isinstance(data, dict):
-            records = data.get("data", [])
-        else:
-            records = data
-        
-        yield from records
-
     def get_records(self, context):
         """Override to iterate over each BM unit and chunk dates into 7-day periods."""
         bm_units = self.config.get("bm_units", [])
@@ -94,21 +125,21 @@ class BaseBMStream(RESTStream):
             current_start = current_end
         
         self.logger.info(f"Split date range into {len(date_ranges)} chunks of max 7 days each")
-        
-        for bm_unit in bm_units:
-            for from_date, to_date in date_ranges:
-                self.logger.info(
-                    f"Fetching {self.name} data for BM unit: {bm_unit}, "
-                    f"from {from_date.isoformat()} to {to_date.isoformat()}"
-                )
-                
-                context = context or {}
-                context["bm_unit"] = bm_unit
-                context["from_date"] = from_date
-                context["to_date"] = to_date
-                
-                # Call parent get_records with this context
-                yield from super().get_records(context)
+
+        # Each window gets its own context, so windows can be fetched concurrently
+        windows = [
+            {**(context or {}), "bm_unit": bm_unit, "from_date": from_date, "to_date": to_date}
+            for bm_unit in bm_units
+            for from_date, to_date in date_ranges
+        ]
+        yield from self.fetch_records(windows)
+
+    def log_fetched(self, context, response):
+        """Log the BM unit and date chunk of a fetched window."""
+        self.logger.info(
+            f"Fetched {self.name} data for BM unit: {context['bm_unit']}, "
+            f"from {context['from_date'].isoformat()} to {context['to_date'].isoformat()}"
+        )
 
 
 class BOALFStream(BaseBMStream):
@@ -1,8 +1,13 @@
 """Tap for Elexon BM data."""
 
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
 from singer_sdk import Tap, Stream
+from singer_sdk._singerlib import StateMessage
 from singer_sdk import typing as th
 
+from elexon_common import ENGINE_SETTINGS, TokenBucket
 from tap_elexon_bm.streams import (
     BOALFStream,
     BODStream,
@@ -34,15 +39,75 @@ class TapElexonBM(Tap):
             th.DateTimeType,
             description="Start date for data fetch (defaults to yesterday)"
         ),
+        *ENGINE_SETTINGS,
+        th.Property(
+            "parallel_streams",
+            th.BooleanType,
+            default=False,
+            description="Sync the selected streams at the same time, one thread per stream"
+        ),
     ).to_dict()
 
+    def __init__(self, *args, **kwargs):
+        """Initialize the tap with the lock that serializes its output and state."""
+        self.message_lock = threading.RLock()
+        super().__init__(*args, **kwargs)
+
+    def write_message(self, message) -> None:
+        """Write a Singer message as one whole line, whichever thread sends it."""
+        with self.message_lock:
+            super().write_message(message)
+
+    def sync_all(self) -> None:
+        """Sync all streams, one after another or in parallel with `parallel_streams`."""
+        if not self.config.get("parallel_streams", False):
+            super().sync_all()
+            return
+
+        self._reset_state_progress_markers()
+        self._set_compatible_replication_methods()
+        self.write_message(StateMessage(value=self.state))
+
+        streams = []
+        for stream in self.streams.values():
+            if not stream.selected and not stream.has_selected_descendents:
+                self.logger.info(f"Skipping deselected stream '{stream.name}'.")
+                continue
+            if stream.parent_stream_type:
+                continue
+            # Create the stream's bookmark entry now, so threads only ever
+            # change their own stream's part of the state
+            stream.get_context_state(None)
+            streams.append(stream)
+
+        self.logger.info(f"Syncing {len(streams)} streams in parallel")
+        with ThreadPoolExecutor(max_workers=max(1, len(streams)), thread_name_prefix="stream") as executor:
+            futures = [executor.submit(self._sync_stream, stream) for stream in streams]
+            wait(futures)
+
+        for stream in self.streams.values():
+            stream.log_sync_costs()
+
+        # A failed stream does not stop the others; their state is written
+        # before the first failure is raised
+        for future in futures:
+            future.result()
+
+    def _sync_stream(self, stream: Stream) -> None:
+        """Sync one stream and promote its bookmarks, as the serial sync does."""
+        stream.sync()
+        stream.finalize_state_progress_markers()
+
     def discover_streams(self) -> list[Stream]:
         """Return a list of discovered streams."""
+        # One limiter for every stream, so the limit holds for the whole tap
+        rate_limiter = TokenBucket(self.config.get("max_requests_per_second", 5))
+        shared = {"rate_limiter": rate_limiter, "state_lock": self.message_lock}
         return [
-            BOALFStream(self),
-            BODStream(self),
-            PhysicalStream(self),
-            B1610Stream(self),
+            BOALFStream(self, **shared),
+            BODStream(self, **shared),
+            PhysicalStream(self, **shared),
+            B1610Stream(self, **shared),
         ]
 
 
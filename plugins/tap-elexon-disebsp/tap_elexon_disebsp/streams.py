@@ -1,19 +1,21 @@
 """Stream type classes for tap-elexon."""
 
 from typing import Any, Dict, Optional, Iterable
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta, timezone
 import requests
+from elexon_common import ElexonStream
 from singer_sdk import typing as th
-from singer_sdk.streams import RESTStream
 
 
-class SystemPricesStream(RESTStream):
+class SystemPricesStream(ElexonStream):
     """Define stream for Elexon settlement system prices data."""
 
     name = "DISEBSP"
+    path = "/{settlement_date}"
     primary_keys = ["settlementDate", "startTime"]
-    replication_key = None
-    
+    replication_key = "settlementDate"  # Bookmark of the last synced day; each sync re-fetches it
+    is_sorted = True  # Days are emitted in order, so the bookmark advances as each one completes
+
     records_jsonpath = "$.data[*]"
 
     schema = th.PropertiesList(
@@ -32,11 +34,9 @@ class SystemPricesStream(RESTStream):
         """Return the API URL root."""
         return self.config["api_url"]
 
-    @property
-    def path(self) -> str:
-        """Return the API path with date for previous day."""
-        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-        return f"/{yesterday}"
+    def compare_start_date(self, value: str, start_date_value: str) -> str:
+        """Return the later of the bookmark date and the start_date's date."""
+        return max(value[:10], start_date_value[:10])
 
     def get_url_params(
         self, context: Optional[dict], next_page_token: Optional[Any]
@@ -46,11 +46,7 @@ class SystemPricesStream(RESTStream):
 
     def parse_response(self, response: requests.Response) -> Iterable[dict]:
         """Parse the response and return an iterator of result records."""
-        json_response = response.json()
-        
-        data = json_response.get("data", [])
-        
-        for record in data:
+        for record in super().parse_response(response):
             yield {
                 "settlementDate": record.get("settlementDate"),
                 "startTime": record.get("startTime"),
@@ -62,6 +58,45 @@ class SystemPricesStream(RESTStream):
                 "totalAdjustmentBuyVolume": self._to_float(record.get("totalAdjustmentBuyVolume")),
             }
 
+    def get_records(self, context: Optional[dict]) -> Iterable[dict]:
+        """Fetch every settlement date from the bookmark (or start_date) up to yesterday.
+
+        The bookmark's own day is fetched again, in case the previous sync
+        stopped part way through it; without a bookmark or start_date only
+        yesterday is fetched. Days are fetched concurrently and their records
+        emitted in date order, with a state message after each day, so an
+        interrupted backfill resumes from the last completed day.
+        """
+        yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+        start_value = self.get_starting_replication_key_value(context)
+        start_day = date.fromisoformat(start_value[:10]) if start_value else yesterday
+
+        if start_day > yesterday:
+            self.logger.info(f"Already synced up to {start_value}, nothing to fetch")
+            return
+        days = [start_day + timedelta(days=offset) for offset in range((yesterday - start_day).days + 1)]
+        self.logger.info(f"Fetching {len(days)} settlement dates from {start_day} to {yesterday}")
+
+        contexts = [
+            {
+                **(context or {}),
+                "settlement_date": day.isoformat(),
+                "to_date": datetime.combine(day + timedelta(days=1), time(), timezone.utc),
+            }
+            for day in days
+        ]
+        previous_day = None
+        for record in self.fetch_records(contexts):
+            if previous_day is not None and record["settlementDate"] != previous_day:
+                # Every record of the previous day has been bookmarked by now
+                self._write_state_message()
+            previous_day = record["settlementDate"]
+            yield record
+
+    def log_fetched(self, context: dict, response: requests.Response) -> None:
+        """Log the settlement date of a fetched day."""
+        self.logger.info(f"Fetched {self.name} data for settlement date {context['settlement_date']}")
+
     def _to_float(self, value: Any) -> Optional[float]:
         """Convert value to float, return None if conversion fails."""
         if value is None:
@@ -5,6 +5,7 @@ from typing import List
 from singer_sdk import Tap, Stream
 from singer_sdk import typing as th
 
+from elexon_common import ENGINE_SETTINGS
 from tap_elexon_disebsp.streams import SystemPricesStream
 
 
@@ -24,8 +25,9 @@ class TapElexonDISEBSP(Tap):
         th.Property(
             "start_date",
             th.DateTimeType,
-            description="The earliest record date to sync",
+            description="The first settlement date to sync when there is no bookmark",
         ),
+        *ENGINE_SETTINGS,
     ).to_dict()
 
     def discover_streams(self) -> List[Stream]:
@@ -1,11 +1,11 @@
 """Stream classes for Elexon MIDP data."""
 
 from datetime import datetime, timedelta
+from elexon_common import ElexonStream
 from singer_sdk import typing as th
-from singer_sdk.streams import RESTStream
 
 
-class MIDPStream(RESTStream):
+class MIDPStream(ElexonStream):
     """Stream for Market Index Data Provider (MIDP) pricing data."""
 
     name = "MIDP"
@@ -49,12 +49,3 @@ class MIDPStream(RESTStream):
             "format": "json"
         }
 
-    def parse_response(self, response):
-        """Parse the API response."""
-        data = response.json()
-        if isinstance(data, dict):
-            records = data.get("data", [])
-        else:
-            records = data
-        
-        yield from records
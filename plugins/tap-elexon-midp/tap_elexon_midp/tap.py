@@ -3,6 +3,7 @@
 from singer_sdk import Tap, Stream
 from singer_sdk import typing as th
 
+from elexon_common import ENGINE_SETTINGS
 from tap_elexon_midp.streams import MIDPStream
 
 
@@ -23,6 +24,7 @@ class TapElexonMIDP(Tap):
             th.DateTimeType,
             description="Start date for data fetch (defaults to 1 hour ago)"
         ),
+        *ENGINE_SETTINGS,
     ).to_dict()
 
     def discover_streams(self) -> list[Stream]:
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark columnar encoding against the Point path and row-by-row encoding.
+
+Encodes the same synthetic BOD, Physical and B1610 batch through equivalent
+influxdb_client Point objects (the path the sink used before its own
+encoder), through the row mapping and through the columnar path, checks
+that all three produce the same bytes and prints the time taken by each and
+the speedup of the columnar path over the Point and row paths.
+
+Usage:
+    python benchmarks/bench_columnar.py [--records N] [--repeat N]
+"""
+
+import argparse
+
+from bench_encoder import CONFIG, b1610_points, bod_points, default_points, point_payload, timed
+from records import GENERATORS, SCHEMAS
+from target_influxdb import columnar
+from target_influxdb.target import TargetInfluxDB
+
+REFERENCE_POINTS = {"BOD": bod_points, "Physical": default_points, "B1610": b1610_points}
+COLUMNAR_ENCODERS = {
+    "BOD": lambda sink, records: columnar.encode_bod(records, sink.encoder),
+    "Physical": lambda sink, records: columnar.encode_default(records, sink.mapper, sink.encoder),
+    "B1610": lambda sink, records: columnar.encode_b1610(records, sink.encoder),
+}
+
+
+def row_payload(sink, records):
+    """Encode records one at a time through the sink's row mapping."""
+    encoder = sink.encoder
+    encoder.reset()
+    for record in records:
+        sink._record_to_points(record)
+    return encoder.getvalue()
+
+
+def columnar_payload(sink, records):
+    """Encode records as one columnar chunk."""
+    encoder = sink.encoder
+    encoder.reset()
+    COLUMNAR_ENCODERS[sink.stream_name](sink, records)
+    return encoder.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    target = TargetInfluxDB(config=CONFIG)
+
+    print(
+        f"{'stream':<9} {'records':>8} {'point (s)':>10} {'row (s)':>8} {'columnar (s)':>13} "
+        f"{'vs point':>9} {'vs row':>7}"
+    )
+    for stream_name in COLUMNAR_ENCODERS:
+        records = GENERATORS[stream_name](args.records)
+        sink = target.get_sink(stream_name, schema=SCHEMAS[stream_name], key_properties=[])
+        to_points = REFERENCE_POINTS[stream_name]
+
+        point_time, expected = timed(lambda: point_payload(sink, records, to_points), args.repeat)
+        row_time, row = timed(lambda: row_payload(sink, records), args.repeat)
+        columnar_time, actual = timed(lambda: columnar_payload(sink, records), args.repeat)
+
+        if row != expected:
+            raise SystemExit(f"{stream_name}: row output differs from Point output")
+        if actual != expected:
+            raise SystemExit(f"{stream_name}: columnar output differs from Point output")
+
+        print(
+            f"{stream_name:<9} {len(records):>8} {point_time:>10.3f} {row_time:>8.3f} "
+            f"{columnar_time:>13.3f} {point_time / columnar_time:>8.1f}x {row_time / columnar_time:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark the line protocol encoder against the influxdb_client Point path.
+
+Builds synthetic BOD, B1610 and MIDP records, encodes them through
+InfluxDBSink and through equivalent Point objects, checks that both produce
+the same bytes and prints the throughput of each.
+
+Usage:
+    python benchmarks/bench_encoder.py [--records N] [--repeat N]
+"""
+
+import argparse
+import time
+from datetime import date, datetime
+
+from influxdb_client import Point, WritePrecision
+
+from records import SCHEMAS, make_b1610_records, make_bod_records, make_midp_records
+from target_influxdb.mappers import parse_timestamp
+from target_influxdb.target import TargetInfluxDB
+
+CONFIG = {
+    "influxdb_url": "http://localhost:8086",
+    "influxdb_token": "benchmark",
+    "influxdb_org": "benchmark",
+    "influxdb_bucket": "benchmark",
+}
+
+
+def bod_points(sink, record):
+    """Reference BOD mapping using Point objects."""
+    tags = {
+        "settlementDate": str(record.get("settlementDate", "")),
+        "settlementPeriod": str(record.get("settlementPeriod", "")),
+        "nationalGridBmUnit": str(record.get("nationalGridBmUnit", "")),
+        "bmUnit": str(record.get("bmUnit", "")),
+        "levelFrom": str(record.get("levelFrom", "")),
+        "levelTo": str(record.get("levelTo", "")),
+        "pairId": str(record.get("pairId", "")),
+    }
+    p1 = Point("BOD").time(parse_timestamp(record.get("timeFrom")), WritePrecision.S)
+    p1.field("bidPrice_GBPMWh", float(record.get("bid", 0)))
+    p1.field("offPrice_GBPMWh", float(record.get("offer", 0)))
+    p2 = Point("BOD").time(parse_timestamp(record.get("timeTo")), WritePrecision.S)
+    p2.field("bidPrice_GBPMWh", 0.0)
+    p2.field("offPrice_GBPMWh", 0.0)
+    for k, v in tags.items():
+        if v:
+            p1.tag(k, v)
+            p2.tag(k, v)
+    return [p1, p2]
+
+
+def b1610_points(sink, record):
+    """Reference B1610 mapping using Point objects."""
+    point = Point("B1610").time(parse_timestamp(record.get("halfHourEndTime")), WritePrecision.S)
+    point.field("Gen_MV_MW", float(record["quantity"]))
+    for key, value in record.items():
+        if key.startswith("_sdc_") or key in ("halfHourEndTime", "Gen_MV_MW", "quantity"):
+            continue
+        if value is None:
+            continue
+        if isinstance(value, (datetime, date)):
+            point.tag(key, value.isoformat())
+        else:
+            point.tag(key, str(value))
+    return [point]
+
+
+def default_points(sink, record):
+    """Reference default mapping using Point objects."""
+    point = Point(sink.stream_name)
+    timestamp = None
+    if "startTime" in record and record["startTime"] is not None:
+        timestamp = parse_timestamp(record["startTime"])
+    elif "timestamp" in record and record["timestamp"] is not None:
+        timestamp = parse_timestamp(record["timestamp"])
+    if timestamp:
+        point.time(timestamp, WritePrecision.NS)
+    tags = {}
+    fields = {}
+    for key, value in record.items():
+        if key.startswith("_sdc_") or key in ("timestamp", "startTime", "halfHourEndTime"):
+            continue
+        if value is None:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            fields[key] = value
+        elif isinstance(value, bool):
+            fields[key] = value
+        elif isinstance(value, (datetime, date)):
+            tags[key] = value.isoformat()
+        elif isinstance(value, str):
+            tags[key] = value
+        else:
+            fields[key] = float(value)
+    for tag_key, tag_value in tags.items():
+        point.tag(tag_key, tag_value)
+    for field_key, field_value in fields.items():
+        point.field(field_key, field_value)
+    return [point]
+
+
+def point_payload(sink, records, to_points):
+    """Serialize records the way the write API serializes a list of Points."""
+    lines = []
+    for record in records:
+        for point in to_points(sink, record):
+            lines.append(point.to_line_protocol().encode("utf-8"))
+    return b"\n".join(lines)
+
+
+def encoder_payload(sink, records):
+    """Serialize records through the sink's line protocol encoder."""
+    encoder = sink.encoder
+    encoder.reset()
+    for record in records:
+        sink._record_to_points(record)
+    return encoder.getvalue()
+
+
+def timed(func, repeat):
+    """Return the best wall time of ``repeat`` calls and the last result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    target = TargetInfluxDB(config=CONFIG)
+    cases = [
+        ("BOD", make_bod_records, bod_points),
+        ("B1610", make_b1610_records, b1610_points),
+        ("MIDP", make_midp_records, default_points),
+    ]
+
+    print(f"{'stream':<8} {'records':>8} {'point (s)':>10} {'encoder (s)':>12} {'speedup':>8}")
+    for stream_name, make_records, to_points in cases:
+        records = make_records(args.records)
+        sink = target.get_sink(stream_name, schema=SCHEMAS[stream_name], key_properties=[])
+
+        point_time, expected = timed(lambda: point_payload(sink, records, to_points), args.repeat)
+        encoder_time, actual = timed(lambda: encoder_payload(sink, records), args.repeat)
+
+        if actual != expected:
+            raise SystemExit(f"{stream_name}: encoder output differs from Point output")
+
+        print(
+            f"{stream_name:<8} {len(records):>8} {point_time:>10.3f} "
+            f"{encoder_time:>12.3f} {point_time / encoder_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Benchmark InfluxDBSink end to end against a local InfluxDB stand-in.
+
+Feeds synthetic records of every stream shape (GasQual, DISEBSP, MIDP,
+BOALF, BOD, Physical, B1610) through a sink the way the target does,
+draining whenever the batch is full, with writes going to a local server
+that implements /api/v2/write. For each stream it reports records/s,
+points/s and bytes/point as received by the server, and the peak memory
+the sink allocated (measured with tracemalloc in a separate, untimed pass).
+
+Absolute rates only hold for the machine they were measured on, so each
+stream also times the influxdb_client Point path on the same records in the
+same run (the reference mappings in bench_encoder.py) and reports the sink's
+throughput relative to it. Results are compared with a stored baseline; a
+stream is reported as a regression when its relative throughput drops by
+more than --tolerance, or its bytes/point or peak memory grow by more than
+--size-tolerance, and the script exits with status 1. Absolute records/s
+and points/s are printed and stored for information but never compared.
+
+Usage:
+    python benchmarks/bench_sink.py [--records N] [--repeat N] [--streams BOD B1610]
+        [--config '{"write_mode": "pipelined"}'] [--baseline FILE]
+        [--save-baseline] [--tolerance 0.35] [--size-tolerance 0.1]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from bench_encoder import CONFIG, b1610_points, bod_points, default_points, point_payload, timed
+from fake_influxdb import FakeInfluxDB
+from records import GENERATORS, SCHEMAS
+from target_influxdb.clients import registry
+from target_influxdb.target import TargetInfluxDB
+
+BASELINE = Path(__file__).with_name("baseline.json")
+STREAMS = ["GasQual", "DISEBSP", "MIDP", "BOALF", "BOD", "Physical", "B1610"]
+REFERENCE_POINTS = {"BOD": bod_points, "B1610": b1610_points}
+
+
+def run_sink(config, stream_name, records):
+    """Write records through a fresh target's sink and return the seconds taken."""
+    target = TargetInfluxDB(config=config)
+    sink = target.get_sink(stream_name, schema=SCHEMAS[stream_name], key_properties=[])
+    started = time.perf_counter()
+    try:
+        for record in records:
+            sink.process_record(record, {})
+            if sink.is_full:
+                sink.process_batch({})
+        sink.process_batch({})
+        sink.clean_up()
+        return time.perf_counter() - started
+    finally:
+        registry.close_all()
+
+
+def reference_seconds(config, stream_name, records, repeat):
+    """Return the best time to serialize records through the Point path."""
+    target = TargetInfluxDB(config=config)
+    sink = target.get_sink(stream_name, schema=SCHEMAS[stream_name], key_properties=[])
+    to_points = REFERENCE_POINTS.get(stream_name, default_points)
+    seconds, _ = timed(lambda: point_payload(sink, records, to_points), repeat)
+    return seconds
+
+
+def measure(server, config, stream_name, records, repeat):
+    """Return the best throughput, bytes/point and peak memory of one stream."""
+    best = None
+    for _ in range(repeat):
+        server.reset()
+        seconds = run_sink(config, stream_name, records)
+        best = seconds if best is None else min(best, seconds)
+    stats = server.stats()
+    reference = reference_seconds(config, stream_name, records, repeat)
+    if not stats["points"]:
+        raise SystemExit(f"{stream_name}: no points reached the server")
+
+    server.reset()
+    tracemalloc.start()
+    try:
+        run_sink(config, stream_name, records)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "records": len(records),
+        "points": stats["points"],
+        "requests": stats["requests"],
+        "records_per_s": round(len(records) / best),
+        "points_per_s": round(stats["points"] / best),
+        "reference_records_per_s": round(len(records) / reference),
+        "relative_throughput": round(reference / best, 2),
+        "bytes_per_point": round(stats["bytes"] / stats["points"], 2),
+        "peak_mib": round(peak / 1024 / 1024, 2),
+    }
+
+
+def regressions(result, baseline, tolerance, size_tolerance):
+    """List the ways a stream's result is worse than its baseline."""
+    found = []
+    key = "relative_throughput"
+    if key in baseline and result[key] < baseline[key] * (1 - tolerance):
+        found.append(f"{key} {result[key]} < {baseline[key]}")
+    for key in ("bytes_per_point", "peak_mib"):
+        if key in baseline and result[key] > baseline[key] * (1 + size_tolerance):
+            found.append(f"{key} {result[key]} > {baseline[key]}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--streams", nargs="+", choices=STREAMS, default=STREAMS)
+    parser.add_argument("--config", type=json.loads, default={}, help="JSON settings merged into the target config")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.35, help="allowed drop in throughput relative to the Point path"
+    )
+    parser.add_argument(
+        "--size-tolerance", type=float, default=0.1, help="allowed relative growth of bytes/point and peak memory"
+    )
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text()).get("streams", {})
+
+    results = {}
+    failed = False
+    print(
+        f"{'stream':<9} {'records':>8} {'points':>8} {'requests':>8} {'records/s':>10} "
+        f"{'points/s':>10} {'vs Point':>9} {'bytes/pt':>9} {'peak MiB':>9}"
+    )
+    with FakeInfluxDB() as server:
+        config = {**CONFIG, **args.config, "influxdb_url": server.url}
+        # Untimed warm-up of every stream, so one-off costs such as imports,
+        # cache fills and allocator growth do not land on the first one measured
+        for stream_name in args.streams:
+            run_sink(config, stream_name, GENERATORS[stream_name](args.records))
+        for stream_name in args.streams:
+            records = GENERATORS[stream_name](args.records)
+            result = results[stream_name] = measure(server, config, stream_name, records, args.repeat)
+            print(
+                f"{stream_name:<9} {result['records']:>8} {result['points']:>8} "
+                f"{result['requests']:>8} {result['records_per_s']:>10} {result['points_per_s']:>10} "
+                f"{result['relative_throughput']:>8.2f}x {result['bytes_per_point']:>9} {result['peak_mib']:>9}"
+            )
+            if stream_name in baseline:
+                for problem in regressions(result, baseline[stream_name], args.tolerance, args.size_tolerance):
+                    failed = True
+                    print(f"  REGRESSION {stream_name}: {problem}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "records": args.records,
+            "config": args.config,
+            "streams": results,
+        }, indent=2) + "\n")
+        print(f"Saved baseline to {args.baseline}")
+    elif not baseline:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to store one")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Local stand-in for the InfluxDB 2.x write API.
+
+Accepts ``POST /api/v2/write`` (and answers ``/ping`` and ``/health``) and
+records the requests, bytes, points and server-side latency of every write,
+so sink benchmarks measure the target rather than a database. Bodies are
+counted and discarded; gzip-encoded bodies are decompressed first.
+
+Usage as a module::
+
+    with FakeInfluxDB() as server:
+        config["influxdb_url"] = server.url
+        ...
+        print(server.stats())
+
+or standalone, for manual runs of the target::
+
+    python benchmarks/fake_influxdb.py [--port 8086] [--delay SECONDS]
+"""
+
+import argparse
+import gzip
+import http.server
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Request handler; state lives on the server object."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        started = time.perf_counter()
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        url = urlparse(self.path)
+        if url.path != "/api/v2/write":
+            self._respond(404)
+            return
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        points = sum(1 for line in body.split(b"\n") if line and not line.startswith(b"#"))
+        precision = parse_qs(url.query).get("precision", ["ns"])[0]
+        self.server.record(len(body), points, precision, time.perf_counter() - started)
+        self._respond(204)
+
+    def do_GET(self):
+        if urlparse(self.path).path in ("/ping", "/health"):
+            self._respond(204)
+        else:
+            self._respond(404)
+
+    def _respond(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.send_header("X-Influxdb-Version", "fake")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeInfluxDB(http.server.ThreadingHTTPServer):
+    """Threaded HTTP server implementing the parts of the write API the target uses."""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, delay=0.0):
+        """Bind the server; port 0 picks a free port.
+
+        Args:
+            port: Port to listen on.
+            delay: Seconds every write waits before it is acknowledged.
+        """
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._thread = None
+        self.reset()
+
+    @property
+    def url(self):
+        """Base URL of the server."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def record(self, size, points, precision, latency):
+        """Record one acknowledged write."""
+        with self._lock:
+            self.requests += 1
+            self.bytes += size
+            self.points += points
+            self.precisions[precision] = self.precisions.get(precision, 0) + 1
+            self.latencies.append(latency)
+
+    def reset(self):
+        """Forget every recorded write."""
+        with self._lock:
+            self.requests = 0
+            self.bytes = 0
+            self.points = 0
+            self.precisions = {}
+            self.latencies = []
+
+    def stats(self):
+        """Return the totals and latency percentiles of the recorded writes."""
+        with self._lock:
+            latencies = sorted(self.latencies)
+            return {
+                "requests": self.requests,
+                "bytes": self.bytes,
+                "points": self.points,
+                "precisions": dict(self.precisions),
+                "latency_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+                "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+            }
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-influxdb", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8086)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before acknowledging a write")
+    args = parser.parse_args()
+
+    server = FakeInfluxDB(args.port, args.delay)
+    print(f"Listening on {server.url}; Ctrl-C prints the totals")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(server.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Synthetic records shaped like the ones InfluxDBSink receives.
+
+Values carry the Python types the Singer SDK produces after parsing a
+RECORD message against the stream schema: ``datetime`` for date-time
+properties, ``date`` for date properties, ``Decimal`` for numbers and
+``int`` for integers.
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+HALF_HOUR = timedelta(minutes=30)
+
+
+def make_bod_records(count, units=5, pairs=10):
+    """Generate BOD records: ``pairs`` bid-offer pairs per unit per half hour."""
+    records = []
+    for i in range(count):
+        time_from = START + HALF_HOUR * (i // (units * pairs))
+        records.append({
+            "timeFrom": time_from,
+            "timeTo": time_from + HALF_HOUR,
+            "settlementDate": time_from.date(),
+            "settlementPeriod": (i // (units * pairs)) % 48 + 1,
+            "bmUnit": f"2__DSTAT00{i % units}",
+            "nationalGridBmUnit": f"DSTAT-{i % units}",
+            "pairId": i % pairs - pairs // 2,
+            "levelFrom": Decimal("49.5"),
+            "levelTo": Decimal("49.5"),
+            "bid": Decimal("-120.25") + i % 7,
+            "offer": Decimal("150") + i % 11,
+        })
+    return records
+
+
+def make_physical_records(count, units=5):
+    """Generate Physical (PN/MELS/MILS) records."""
+    datasets = ("PN", "MELS", "MILS")
+    records = []
+    for i in range(count):
+        time_from = START + HALF_HOUR * (i // (units * len(datasets)))
+        records.append({
+            "dataset": datasets[i % len(datasets)],
+            "timeFrom": time_from,
+            "timeTo": time_from + HALF_HOUR,
+            "settlementDate": time_from.date(),
+            "settlementPeriod": (i // (units * len(datasets))) % 48 + 1,
+            "bmUnit": f"2__ESTAT00{i % units}",
+            "nationalGridBmUnit": f"ESTAT-{i % units}",
+            "levelFrom": Decimal(i % 50),
+            "levelTo": Decimal(i % 50 + 1),
+        })
+    return records
+
+
+def make_b1610_records(count, units=5):
+    """Generate B1610 records, one per unit per half hour."""
+    records = []
+    for i in range(count):
+        end_time = START + HALF_HOUR * (i // units + 1)
+        records.append({
+            "dataset": "B1610",
+            "psrType": "Generation",
+            "bmUnit": f"2__HSTAT00{i % units}",
+            "nationalGridBmUnitId": f"HSTAT-{i % units}",
+            "settlementDate": end_time.date(),
+            "settlementPeriod": (i // units) % 48 + 1,
+            "halfHourEndTime": end_time,
+            "quantity": Decimal("12.345") + i % 13,
+        })
+    return records
+
+
+def make_midp_records(count):
+    """Generate MIDP records from two data providers."""
+    records = []
+    for i in range(count):
+        start_time = START + HALF_HOUR * (i // 2)
+        records.append({
+            "startTime": start_time,
+            "settlementDate": start_time.date(),
+            "settlementPeriod": (i // 2) % 48 + 1,
+            "dataProvider": "APXMIDP" if i % 2 else "N2EXMIDP",
+            "price": Decimal("85.12") + i % 5,
+            "volume": Decimal("1250.0"),
+        })
+    return records
+
+
+def make_disebsp_records(count):
+    """Generate DISEBSP system price records, one per half hour."""
+    records = []
+    for i in range(count):
+        start_time = START + HALF_HOUR * i
+        records.append({
+            "settlementDate": start_time.date(),
+            "startTime": start_time,
+            "systemSellPrice": Decimal("72.5") + i % 17,
+            "netImbalanceVolume": Decimal("-310.4321") + i % 23,
+            "totalAcceptedOfferVolume": Decimal("1450.25"),
+            "totalAcceptedBidVolume": Decimal("-980.75"),
+            "totalAdjustmentSellVolume": Decimal("0"),
+            "totalAdjustmentBuyVolume": Decimal("12.5"),
+        })
+    return records
+
+
+def make_boalf_records(count, units=5):
+    """Generate BOALF acceptance records."""
+    records = []
+    for i in range(count):
+        time_from = START + HALF_HOUR * (i // units)
+        records.append({
+            "timeFrom": time_from,
+            "timeTo": time_from + HALF_HOUR,
+            "settlementDate": time_from.date(),
+            "settlementPeriodFrom": (i // units) % 48 + 1,
+            "settlementPeriodTo": (i // units) % 48 + 1,
+            "bmUnit": f"T_DRAXX-{i % units}",
+            "nationalGridBmUnit": f"DRAXX-{i % units}",
+            "acceptanceNumber": 100000 + i,
+            "acceptanceTime": time_from - HALF_HOUR,
+            "levelFrom": Decimal(i % 400),
+            "levelTo": Decimal(i % 400 + 10),
+            "deemedBoFlag": False,
+            "soFlag": i % 3 == 0,
+            "storFlag": False,
+            "rrFlag": False,
+        })
+    return records
+
+
+def make_gasqual_records(count, sites=20):
+    """Generate National Gas quality records, one per site per interval."""
+    records = []
+    for i in range(count):
+        records.append({
+            "timestamp": START + timedelta(minutes=6) * (i // sites),
+            "siteId": i % sites,
+            "siteName": f"Site {i % sites}",
+            "areaName": f"Area {i % sites // 5}",
+            "cv24": Decimal("39.4") + Decimal(i % 9) / 10,
+            "sg24": Decimal("0.612"),
+            "cv": Decimal("39.5") + Decimal(i % 7) / 10,
+            "sg": Decimal("0.615"),
+            "wi": Decimal("50.3"),
+            "co2": Decimal("1.85"),
+            "n2": Decimal("1.02"),
+        })
+    return records
+
+
+def _schema(**types):
+    """Build a stream schema with nullable properties of the given JSON types."""
+    properties = {}
+    for key, declared in types.items():
+        json_type, _, string_format = declared.partition(":")
+        properties[key] = {"type": [json_type, "null"]}
+        if string_format:
+            properties[key]["format"] = string_format
+    return {"type": "object", "properties": properties}
+
+
+# Schemas as declared by the taps
+SCHEMAS = {
+    "BOD": _schema(
+        timeFrom="string:date-time", timeTo="string:date-time",
+        settlementDate="string:date", settlementPeriod="integer",
+        bmUnit="string", nationalGridBmUnit="string", pairId="integer",
+        levelFrom="number", levelTo="number", bid="number", offer="number",
+    ),
+    "Physical": _schema(
+        dataset="string", timeFrom="string:date-time", timeTo="string:date-time",
+        settlementDate="string:date", settlementPeriod="integer",
+        bmUnit="string", nationalGridBmUnit="string",
+        levelFrom="number", levelTo="number",
+    ),
+    "B1610": _schema(
+        dataset="string", psrType="string", bmUnit="string",
+        nationalGridBmUnitId="string", settlementDate="string:date",
+        settlementPeriod="integer", halfHourEndTime="string:date-time",
+        quantity="number",
+    ),
+    "MIDP": _schema(
+        startTime="string:date-time", settlementDate="string:date",
+        settlementPeriod="integer", dataProvider="string",
+        price="number", volume="number",
+    ),
+    "DISEBSP": _schema(
+        settlementDate="string:date", startTime="string:date-time",
+        systemSellPrice="number", netImbalanceVolume="number",
+        totalAcceptedOfferVolume="number", totalAcceptedBidVolume="number",
+        totalAdjustmentSellVolume="number", totalAdjustmentBuyVolume="number",
+    ),
+    "BOALF": _schema(
+        timeFrom="string:date-time", timeTo="string:date-time",
+        settlementDate="string:date", settlementPeriodFrom="integer",
+        settlementPeriodTo="integer", bmUnit="string", nationalGridBmUnit="string",
+        acceptanceNumber="integer", acceptanceTime="string:date-time",
+        levelFrom="number", levelTo="number", deemedBoFlag="boolean",
+        soFlag="boolean", storFlag="boolean", rrFlag="boolean",
+    ),
+    "GasQual": _schema(
+        timestamp="string:date-time", siteId="integer", siteName="string",
+        areaName="string", cv24="number", sg24="number", cv="number",
+        sg="number", wi="number", co2="number", n2="number",
+    ),
+}
+
+GENERATORS = {
+    "BOD": make_bod_records,
+    "Physical": make_physical_records,
+    "B1610": make_b1610_records,
+    "MIDP": make_midp_records,
+    "DISEBSP": make_disebsp_records,
+    "BOALF": make_boalf_records,
+    "GasQual": make_gasqual_records,
+}
@@ -0,0 +1,376 @@
+"""Partitioned Parquet cold storage of mapped points.
+
+Historical analysis of BOD and B1610 reads whole days of points, which is
+slow and expensive through InfluxDB. The archive writes the same points the
+sink sends to InfluxDB (tags, fields and timestamp, as mapped) to
+compressed Parquet files partitioned by measurement and UTC day::
+
+    <directory>/measurement=BOD/date=2026-10-01/part-<id>.parquet
+
+so DuckDB, pandas or pyarrow datasets can read them directly.
+
+Points are buffered per partition and written a row group at a time. Each
+file is written under a temporary name and closed when it reaches
+``max_file_rows``, when more than ``max_open_partitions`` days are open (a
+backfill moving through days, say) or its schema changes. Files are only
+renamed into place by ``commit``, which the sink calls once every write
+before a STATE message has been acknowledged, so readers only ever see
+complete files and the archive never holds rows past the bookmark of a run
+that failed: their temporary files are left behind, the tap sends the rows
+again, and temporary files more than an hour old are removed when the
+archive is opened.
+
+Because every STATE message commits every open file, ``row_group_rows`` and
+``max_file_rows`` are upper bounds: a run that emits STATE every few minutes
+leaves a small file per day per STATE. ``compact`` merges the small files of
+the days a run committed to into files of up to ``max_file_rows`` rows. The
+merged file is renamed into place before its sources are deleted, with a
+``_compaction`` journal in the day's directory naming both, so a compaction
+interrupted in between is finished when the archive is next opened. Readers
+may see both copies of the rows in that moment.
+
+Requires pyarrow (``pip install target-influxdb[parquet]``).
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+TIME_COLUMN = "time"
+_TEMPORARY_SUFFIX = ".tmp"
+# Leading underscores are skipped by dataset readers
+_COMPACTION_JOURNAL = "_compaction"
+# Temporary files younger than this may belong to a concurrent run
+_STALE_SECONDS = 3600
+
+
+def _column_type(value: Any) -> str:
+    """Return the column type a value is stored as."""
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, (float, Decimal)):
+        return "float"
+    return "string"
+
+
+def _merge_types(current: Optional[str], new: str) -> str:
+    """Widen a column type to hold a value of another type."""
+    if current is None or current == new:
+        return new
+    if {current, new} == {"int", "float"}:
+        return "float"
+    return "string"
+
+
+def _arrow_type(column_type: str) -> "pa.DataType":
+    """Return the Arrow type of a column type."""
+    return {
+        "bool": pa.bool_(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "string": pa.string(),
+    }[column_type]
+
+
+def _convert(value: Any, column_type: str) -> Any:
+    """Convert a value to its column's type."""
+    if value is None:
+        return None
+    if column_type == "float":
+        return float(value)
+    if column_type == "string" and not isinstance(value, str):
+        return str(value)
+    return value
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Persist renamed directory entries, where supported."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class _Partition:
+    """Buffered rows and the open file of one measurement and day."""
+
+    def __init__(self, directory: Path):
+        """Initialize an empty partition stored in ``directory``."""
+        self.directory = directory
+        self.rows: List[Dict[str, Any]] = []
+        self.types: Dict[str, str] = {}
+        self.writer: Optional["pq.ParquetWriter"] = None
+        self.schema: Optional["pa.Schema"] = None
+        self.path: Optional[Path] = None
+        self.file_rows = 0
+
+
+class ParquetArchive:
+    """Write mapped points of one measurement to day-partitioned Parquet files."""
+
+    def __init__(
+        self,
+        directory: str,
+        measurement: str,
+        compression: str = "zstd",
+        row_group_rows: int = 100_000,
+        max_file_rows: int = 1_000_000,
+        max_open_partitions: int = 8,
+    ):
+        """Initialize the archive and remove stale temporary files of crashed runs.
+
+        Args:
+            directory: Root directory of the archive.
+            measurement: Measurement whose points are archived.
+            compression: Parquet compression codec.
+            row_group_rows: Rows buffered per partition before a row group is written.
+            max_file_rows: Rows after which a partition's file is closed and a new one started.
+            max_open_partitions: Days buffered at once; the least recently used is closed first.
+
+        Raises:
+            RuntimeError: If pyarrow is not installed.
+        """
+        if pa is None:
+            raise RuntimeError(
+                "archive_dir requires pyarrow; install it with `pip install target-influxdb[parquet]`"
+            )
+        self.root = Path(directory) / f"measurement={measurement}"
+        self.measurement = measurement
+        self.compression = compression
+        self.row_group_rows = max(1, int(row_group_rows))
+        self.max_file_rows = max(self.row_group_rows, int(max_file_rows))
+        self.max_open_partitions = max(1, int(max_open_partitions))
+        self.rows_written = 0
+        self.files_committed = 0
+        self._partitions: Dict[str, _Partition] = {}
+        # Closed files waiting for commit to rename them into place
+        self._closed: List[Path] = []
+        # Day directories this run committed files to, for compact
+        self._committed_directories: Set[Path] = set()
+        if self.root.exists():
+            for journal in self.root.glob(f"date=*/{_COMPACTION_JOURNAL}"):
+                self._finish_compaction(journal)
+            cutoff = time.time() - _STALE_SECONDS
+            for leftover in self.root.glob(f"date=*/*{_TEMPORARY_SUFFIX}"):
+                if leftover.stat().st_mtime > cutoff:
+                    continue
+                logger.warning(f"Removing incomplete archive file {leftover}")
+                leftover.unlink()
+
+    def add(
+        self,
+        tags: Iterable[Tuple[str, str]],
+        fields: Iterable[Tuple[str, Any]],
+        timestamp: Optional[datetime],
+    ) -> None:
+        """Buffer one point, writing a row group once its partition is full.
+
+        Args:
+            tags: Tag keys and rendered values of the point.
+            fields: Field keys and values of the point.
+            timestamp: Point timestamp; the time of writing when None, as in InfluxDB.
+        """
+        if timestamp is None:
+            timestamp = datetime.now(timezone.utc)
+        elif timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        else:
+            timestamp = timestamp.astimezone(timezone.utc)
+        day = timestamp.date().isoformat()
+        partition = self._partitions.pop(day, None)
+        if partition is None:
+            partition = _Partition(self.root / f"date={day}")
+            if len(self._partitions) >= self.max_open_partitions:
+                # Dicts keep insertion order, and partitions are re-inserted on use
+                oldest = self._partitions.pop(next(iter(self._partitions)))
+                self._write_row_group(oldest)
+                self._close_file(oldest)
+        self._partitions[day] = partition
+
+        row: Dict[str, Any] = {TIME_COLUMN: timestamp}
+        types = partition.types
+        for key, value in tags:
+            if value != "" and key != TIME_COLUMN:
+                row[key] = value
+                types[key] = _merge_types(types.get(key), "string")
+        for key, value in fields:
+            if value is None or key == TIME_COLUMN:
+                continue
+            row[key] = value
+            types[key] = _merge_types(types.get(key), _column_type(value))
+        partition.rows.append(row)
+        if len(partition.rows) >= self.row_group_rows:
+            self._write_row_group(partition)
+
+    def commit(self) -> None:
+        """Write every buffered row and rename every file written so far into place."""
+        for partition in self._partitions.values():
+            self._write_row_group(partition)
+            self._close_file(partition)
+        self._partitions.clear()
+        directories = set()
+        for path in self._closed:
+            os.replace(f"{path}{_TEMPORARY_SUFFIX}", path)
+            directories.add(path.parent)
+            self.files_committed += 1
+        self._closed = []
+        for directory in directories:
+            _fsync_directory(directory)
+        self._committed_directories.update(directories)
+
+    def close(self, compact: bool = True) -> None:
+        """Commit every buffered row, then compact the days this run committed to.
+
+        Args:
+            compact: Whether to merge the small files of those days.
+        """
+        self.commit()
+        if self.files_committed:
+            logger.info(
+                f"Archived {self.rows_written} {self.measurement} rows in "
+                f"{self.files_committed} Parquet files under {self.root}"
+            )
+        if compact:
+            self.compact()
+
+    def compact(self) -> None:
+        """Merge the small files of every day this run committed to.
+
+        Files with fewer than ``max_file_rows`` rows and the same schema are
+        packed into files of up to ``max_file_rows`` rows.
+        """
+        merged = replaced = 0
+        for directory in sorted(self._committed_directories):
+            groups: List[Tuple["pa.Schema", List[Tuple[Path, int]]]] = []
+            for path in sorted(directory.glob("*.parquet")):
+                metadata = pq.read_metadata(path)
+                if metadata.num_rows >= self.max_file_rows:
+                    continue
+                schema = metadata.schema.to_arrow_schema()
+                for group_schema, files in groups:
+                    if group_schema.equals(schema):
+                        files.append((path, metadata.num_rows))
+                        break
+                else:
+                    groups.append((schema, [(path, metadata.num_rows)]))
+            for schema, files in groups:
+                batch: List[Path] = []
+                batch_rows = 0
+                for path, rows in files + [(None, self.max_file_rows)]:
+                    if batch and batch_rows + rows > self.max_file_rows:
+                        if len(batch) > 1:
+                            self._merge(directory, schema, batch)
+                            merged += 1
+                            replaced += len(batch)
+                        batch, batch_rows = [], 0
+                    if path is not None:
+                        batch.append(path)
+                        batch_rows += rows
+        self._committed_directories.clear()
+        if merged:
+            logger.info(f"Compacted {replaced} {self.measurement} archive files into {merged}")
+
+    def _merge(self, directory: Path, schema: "pa.Schema", sources: List[Path]) -> None:
+        """Write the rows of ``sources`` to one new file, then delete them."""
+        path = directory / f"part-{uuid.uuid4().hex}.parquet"
+        temporary = Path(f"{path}{_TEMPORARY_SUFFIX}")
+        with pq.ParquetWriter(temporary, schema, compression=self.compression) as writer:
+            for source in sources:
+                writer.write_table(pq.read_table(source, schema=schema), row_group_size=self.row_group_rows)
+        with open(temporary, "rb") as f:
+            os.fsync(f.fileno())
+        journal = directory / _COMPACTION_JOURNAL
+        with open(journal, "w", encoding="utf-8") as f:
+            json.dump({"target": path.name, "sources": [source.name for source in sources]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        _fsync_directory(directory)
+        os.replace(temporary, path)
+        _fsync_directory(directory)
+        self._finish_compaction(journal)
+
+    def _finish_compaction(self, journal: Path) -> None:
+        """Delete the sources of a compaction whose merged file is in place, and its journal."""
+        try:
+            entry = json.loads(journal.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            entry = None
+        if entry is not None and (journal.parent / entry["target"]).exists():
+            for name in entry["sources"]:
+                (journal.parent / name).unlink(missing_ok=True)
+        # Without the merged file its temporary file is removed as stale
+        journal.unlink(missing_ok=True)
+        _fsync_directory(journal.parent)
+
+    def _write_row_group(self, partition: _Partition) -> None:
+        """Write a partition's buffered rows as a row group of its open file."""
+        if not partition.rows:
+            return
+        schema = pa.schema(
+            [pa.field(TIME_COLUMN, pa.timestamp("ns", tz="UTC"))]
+            + [
+                pa.field(name, _arrow_type(column_type))
+                for name, column_type in sorted(partition.types.items())
+            ]
+        )
+        if partition.writer is not None and not schema.equals(partition.schema):
+            # A file has one schema; new columns or widened types start a new file
+            self._close_file(partition)
+        columns = {
+            field.name: [
+                _convert(row.get(field.name), partition.types.get(field.name, "string"))
+                for row in partition.rows
+            ]
+            for field in schema
+        }
+        columns[TIME_COLUMN] = [row[TIME_COLUMN] for row in partition.rows]
+        table = pa.Table.from_pydict(columns, schema=schema)
+        if partition.writer is None:
+            partition.directory.mkdir(parents=True, exist_ok=True)
+            partition.path = partition.directory / f"part-{uuid.uuid4().hex}.parquet"
+            partition.schema = schema
+            partition.writer = pq.ParquetWriter(
+                f"{partition.path}{_TEMPORARY_SUFFIX}", schema, compression=self.compression
+            )
+        partition.writer.write_table(table, row_group_size=self.row_group_rows)
+        partition.file_rows += table.num_rows
+        self.rows_written += table.num_rows
+        partition.rows = []
+        if partition.file_rows >= self.max_file_rows:
+            self._close_file(partition)
+
+    def _close_file(self, partition: _Partition) -> None:
+        """Close and fsync a partition's open file, to be renamed into place by ``commit``."""
+        if partition.writer is None:
+            return
+        partition.writer.close()
+        with open(f"{partition.path}{_TEMPORARY_SUFFIX}", "rb") as f:
+            os.fsync(f.fileno())
+        self._closed.append(partition.path)
+        partition.writer = None
+        partition.schema = None
+        partition.path = None
+        partition.file_rows = 0
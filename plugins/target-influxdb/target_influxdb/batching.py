@@ -0,0 +1,104 @@
+"""Adaptive batch sizing for InfluxDB writes."""
+
+import math
+import threading
+from collections import deque
+from typing import Optional
+
+
+def _p95(samples) -> float:
+    """Return the nearest-rank 95th percentile of a non-empty sample."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(len(ordered) * 0.95) - 1)]
+
+
+class AdaptiveBatchSizer:
+    """Choose how many points to send per write from observed write latency.
+
+    The point limit grows multiplicatively while the p95 latency of recent
+    writes stays under the target, and is halved as soon as p95 exceeds the
+    target or InfluxDB answers with a 5xx/429 or times out. The latency
+    window is cleared after every resize so each decision reflects the
+    current batch size. The byte limit is fixed and always applies.
+    """
+
+    GROWTH_FACTOR = 1.25
+    SHRINK_FACTOR = 0.5
+    WINDOW_SIZE = 20
+    MIN_SAMPLES = 3
+
+    def __init__(
+        self,
+        initial_points: int = 1000,
+        min_points: int = 100,
+        max_points: int = 10000,
+        max_bytes: int = 5 * 1024 * 1024,
+        target_latency: float = 1.0,
+        adaptive: bool = True,
+    ):
+        """Initialize the sizer.
+
+        Args:
+            initial_points: Starting point limit.
+            min_points: Lower bound for the point limit.
+            max_points: Upper bound for the point limit.
+            max_bytes: Maximum encoded payload size per write.
+            target_latency: Write latency (seconds) the sizer aims to stay under.
+            adaptive: If False the point limit stays at ``initial_points``.
+        """
+        self.min_points = max(1, min_points)
+        self.max_points = max(self.min_points, max_points)
+        self.max_bytes = max_bytes
+        self.target_latency = target_latency
+        self.adaptive = adaptive
+        self._points = min(max(initial_points, self.min_points), self.max_points)
+        self._latencies: deque = deque(maxlen=self.WINDOW_SIZE)
+        self._lock = threading.Lock()
+
+    @property
+    def max_batch_points(self) -> int:
+        """Get the current point limit."""
+        return self._points
+
+    def is_full(self, point_count: int, byte_count: int) -> bool:
+        """Return True once a batch has reached either limit."""
+        return point_count >= self._points or byte_count >= self.max_bytes
+
+    def p95_latency(self) -> Optional[float]:
+        """Return the p95 of the recent latency window, if any."""
+        with self._lock:
+            if not self._latencies:
+                return None
+            return _p95(self._latencies)
+
+    def record_success(self, latency: float) -> None:
+        """Record a successful write and adjust the point limit."""
+        if not self.adaptive:
+            return
+        with self._lock:
+            self._latencies.append(latency)
+            if _p95(self._latencies) > self.target_latency:
+                self._resize(self.SHRINK_FACTOR)
+            elif len(self._latencies) >= self.MIN_SAMPLES:
+                self._resize(self.GROWTH_FACTOR)
+
+    def record_failure(self, status: Optional[int]) -> None:
+        """Record a failed write; back off on throttling and server errors.
+
+        Args:
+            status: HTTP status of the response, or None for timeouts and
+                connection errors.
+        """
+        if not self.adaptive:
+            return
+        if status is None or status == 429 or status >= 500:
+            with self._lock:
+                self._resize(self.SHRINK_FACTOR)
+
+    def _resize(self, factor: float) -> None:
+        """Scale the point limit within bounds. Caller holds the lock."""
+        self._points = min(
+            max(int(self._points * factor), self.min_points),
+            self.max_points,
+        )
+        self._latencies.clear()
@@ -0,0 +1,183 @@
+"""Series-cardinality estimates per measurement.
+
+Every distinct tag set of a measurement is a series in InfluxDB's index,
+and tagging records with fast-changing values (B1610's settlement date and
+period, say) grows the index without bound. The tracker keeps one
+HyperLogLog sketch per measurement and adds every series prefix the sink
+builds, so the number of distinct series is estimated in 16 KiB per
+measurement with about 1% error, however many series there are.
+
+Sketches are merged into a JSON state file at the end of each run, so the
+estimate covers every series written since tracking started rather than
+one run's worth.
+"""
+
+import base64
+import json
+import logging
+import math
+import os
+import threading
+import zlib
+from typing import Dict, Iterable, Optional
+
+from target_influxdb.dedup import hash64
+
+logger = logging.getLogger(__name__)
+
+_MASK64 = (1 << 64) - 1
+
+
+class HyperLogLog:
+    """HyperLogLog sketch over 64-bit hashes of strings."""
+
+    def __init__(self, precision: int = 14, registers: Optional[bytearray] = None):
+        """Initialize an empty sketch, or one with saved registers.
+
+        Args:
+            precision: log2 of the number of registers; the standard error is
+                about 1.04 / sqrt(2 ** precision).
+            registers: Saved registers, ``2 ** precision`` bytes.
+        """
+        self.precision = precision
+        self.size = 1 << precision
+        if registers is not None and len(registers) != self.size:
+            raise ValueError(f"Expected {self.size} registers, got {len(registers)}")
+        self.registers = registers if registers is not None else bytearray(self.size)
+        self._rest_bits = 64 - precision
+        self._rest_mask = (1 << self._rest_bits) - 1
+
+    def add(self, text: str) -> None:
+        """Add a string to the sketch."""
+        hashed = hash64(text) & _MASK64
+        index = hashed >> self._rest_bits
+        rank = self._rest_bits - (hashed & self._rest_mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Merge another sketch of the same precision into this one."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> float:
+        """Estimate the number of distinct strings added."""
+        size = self.size
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / math.fsum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            # Linear counting is more accurate while many registers are empty
+            estimate = size * math.log(size / zeros)
+        return estimate
+
+    def to_json(self) -> Dict[str, object]:
+        """Return the sketch as a JSON-serializable dict."""
+        return {
+            "precision": self.precision,
+            "registers": base64.b64encode(zlib.compress(bytes(self.registers))).decode("ascii"),
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, object]) -> "HyperLogLog":
+        """Load a sketch saved by ``to_json``."""
+        registers = bytearray(zlib.decompress(base64.b64decode(data["registers"])))
+        return cls(precision=int(data["precision"]), registers=registers)
+
+
+class CardinalityTracker:
+    """Estimate distinct series per measurement and compare them to thresholds.
+
+    Sinks may be drained in parallel, so every update takes the lock.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        default_threshold: int = 100_000,
+        thresholds: Optional[Dict[str, int]] = None,
+    ):
+        """Initialize the tracker, loading saved sketches from ``path``.
+
+        Args:
+            path: JSON state file; estimates only cover this run when None.
+            default_threshold: Series count above which a measurement is
+                reported as high-cardinality.
+            thresholds: Per-measurement overrides of ``default_threshold``.
+        """
+        self.path = path
+        self.default_threshold = default_threshold
+        self.thresholds = dict(thresholds or {})
+        self._sketches: Dict[str, HyperLogLog] = _load(path) if path else {}
+        self._lock = threading.Lock()
+
+    def observe(self, measurement: str, prefixes: Iterable[str]) -> None:
+        """Add series prefixes of a measurement."""
+        with self._lock:
+            sketch = self._sketches.get(measurement)
+            if sketch is None:
+                sketch = self._sketches[measurement] = HyperLogLog()
+            for prefix in prefixes:
+                sketch.add(prefix)
+
+    def estimate(self, measurement: str) -> int:
+        """Estimate the distinct series of a measurement."""
+        with self._lock:
+            sketch = self._sketches.get(measurement)
+            return round(sketch.estimate()) if sketch is not None else 0
+
+    def threshold(self, measurement: str) -> int:
+        """Get the warning threshold of a measurement."""
+        return int(self.thresholds.get(measurement, self.default_threshold))
+
+    def exceeds(self, measurement: str) -> bool:
+        """Return True if a measurement's estimate is above its threshold."""
+        return self.estimate(measurement) > self.threshold(measurement)
+
+    def estimates(self) -> Dict[str, int]:
+        """Estimate the distinct series of every tracked measurement."""
+        return {measurement: self.estimate(measurement) for measurement in sorted(self._sketches)}
+
+    def save(self) -> None:
+        """Merge the sketches into the state file, writing it under a temporary name first.
+
+        Sketches saved by a concurrent run since this one started are merged
+        rather than overwritten.
+        """
+        if not self.path:
+            return
+        saved = _load(self.path)
+        with self._lock:
+            for measurement, sketch in saved.items():
+                if measurement not in self._sketches:
+                    self._sketches[measurement] = sketch
+                elif sketch.precision == self._sketches[measurement].precision:
+                    self._sketches[measurement].merge(sketch)
+            state = {
+                "measurements": {
+                    measurement: sketch.to_json() for measurement, sketch in sorted(self._sketches.items())
+                }
+            }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temporary, self.path)
+
+
+def _load(path: str) -> Dict[str, HyperLogLog]:
+    """Load the sketches saved in a state file; none if it is missing or unreadable."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        return {
+            measurement: HyperLogLog.from_json(data)
+            for measurement, data in saved.get("measurements", {}).items()
+        }
+    except (OSError, ValueError, KeyError, zlib.error) as e:
+        logger.warning(f"Could not load cardinality state from {path}, starting afresh: {e}")
+        return {}
@@ -0,0 +1,115 @@
+"""Process-wide registry of pooled InfluxDB clients.
+
+Every sink of a target process writes to the same InfluxDB, so sinks share
+one ``InfluxDBClient`` per URL, org and token instead of each opening its own
+connection pool. The client's urllib3 pool keeps connections alive between
+writes, so streams reuse warm TCP/TLS connections. Clients are closed once,
+by ``close_all``, after every sink has finished writing.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+from influxdb_client import InfluxDBClient
+from influxdb_client.client.write_api import SYNCHRONOUS, WriteApi
+
+logger = logging.getLogger(__name__)
+
+
+class ClientKey(NamedTuple):
+    """Identity of a shared client."""
+
+    url: str
+    org: str
+    token: str
+
+
+class SharedClient(NamedTuple):
+    """A pooled client and its synchronous write API."""
+
+    client: InfluxDBClient
+    write_api: WriteApi
+
+
+class ClientRegistry:
+    """Create InfluxDB clients on first use and share them by URL, org and token."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._clients: Dict[ClientKey, SharedClient] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        url: str,
+        org: str,
+        token: str,
+        pool_size: Optional[int] = None,
+        timeout: Tuple[float, float] = (10.0, 10.0),
+    ) -> SharedClient:
+        """Get the shared client for a server, creating it on first use.
+
+        Pool size and timeouts apply when the client is created; later
+        callers with the same URL, org and token share it as it is.
+
+        Args:
+            url: InfluxDB server URL.
+            org: Organization name.
+            token: Authentication token.
+            pool_size: Maximum number of kept-alive connections; the
+                influxdb_client default when None.
+            timeout: Connect and read timeouts in seconds.
+
+        Returns:
+            The shared client and write API.
+        """
+        key = ClientKey(url, org, token)
+        with self._lock:
+            shared = self._clients.get(key)
+            if shared is None:
+                options = {}
+                if pool_size:
+                    options["connection_pool_maxsize"] = pool_size
+                client = InfluxDBClient(
+                    url=url,
+                    token=token,
+                    org=org,
+                    timeout=(int(timeout[0] * 1000), int(timeout[1] * 1000)),
+                    **options,
+                )
+                shared = SharedClient(client, client.write_api(write_options=SYNCHRONOUS))
+                self._clients[key] = shared
+                logger.debug(f"Opened InfluxDB client for {url} (org {org})")
+            return shared
+
+    def __len__(self) -> int:
+        """Return the number of open clients."""
+        return len(self._clients)
+
+    def close_all(self) -> None:
+        """Close every client. Sinks must have finished writing."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for shared in clients:
+            try:
+                shared.write_api.close()
+                shared.client.close()
+            except Exception as e:
+                logger.warning(f"Error closing InfluxDB client for {shared.client.url}: {e}")
+
+
+# Shared by every target instance in the process
+registry = ClientRegistry()
+
+
+def shared_client(config: Mapping[str, Any]) -> SharedClient:
+    """Get the shared client for a target configuration."""
+    return registry.get(
+        url=config["influxdb_url"],
+        org=config["influxdb_org"],
+        token=config["influxdb_token"],
+        pool_size=config.get("connection_pool_size"),
+        timeout=(config.get("connect_timeout", 10.0), config.get("read_timeout", 10.0)),
+    )
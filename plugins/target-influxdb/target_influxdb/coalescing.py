@@ -0,0 +1,223 @@
+"""Cross-stream coalescing of InfluxDB writes.
+
+Every stream has its own sink, so a tap with many small streams (the four
+tap-elexon-bm streams, say) issues many small writes into the same bucket.
+The coordinator collects the encoded batches of every sink and sends them
+as shared write requests: a request is sent once the pending batches reach
+``max_bytes``, or once the oldest of them has waited ``max_delay`` seconds.
+A write request has one timestamp precision, so batches are grouped by
+precision.
+
+Per-stream bookkeeping stays with the sinks: when a shared request is
+acknowledged each sink records its own metrics and dedup entries. When it
+fails, each batch is handed back to its sink and written on its own, with
+that sink's retries, bisection, dead-letter file and spool. A batch that
+still fails does not stop the others; its error is kept for its own sink
+and raised from that sink's next submit or flush. The target flushes the
+coordinator for every sink before emitting STATE, so STATE still only
+follows acknowledged writes.
+"""
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+from target_influxdb.dedup import DedupEntry
+
+if TYPE_CHECKING:
+    from target_influxdb.sinks import InfluxDBSink
+
+logger = logging.getLogger(__name__)
+
+
+class PendingBatch(NamedTuple):
+    """An encoded batch waiting to be sent in a shared request."""
+
+    sink: "InfluxDBSink"
+    payload: bytes
+    point_count: int
+    dedup_entries: List[DedupEntry]
+
+
+class WriteCoordinator:
+    """Merge the encoded batches of all sinks into shared write requests."""
+
+    def __init__(self, max_bytes: int = 5 * 1024 * 1024, max_delay: float = 1.0):
+        """Initialize the coordinator; the deadline thread starts on the first batch.
+
+        Args:
+            max_bytes: Send the pending batches of a precision once they reach this size.
+            max_delay: Send a batch at most this many seconds after it was submitted.
+        """
+        self.max_bytes = max_bytes
+        self.max_delay = float(max_delay)
+        self.batches_submitted = 0
+        self.requests_sent = 0
+        self._pending: Dict[str, List[PendingBatch]] = {}
+        self._pending_bytes: Dict[str, int] = {}
+        self._deadlines: Dict[str, float] = {}
+        # _lock guards the pending batches; _write_lock keeps requests in submission order
+        self._lock = threading.Condition()
+        self._write_lock = threading.Lock()
+        # First write error of each sink; set before _write_lock is released,
+        # so a flush that finds nothing pending still sees the errors of earlier sends
+        self._errors: Dict["InfluxDBSink", Exception] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def submit(
+        self,
+        sink: "InfluxDBSink",
+        payload: bytes,
+        point_count: int,
+        dedup_entries: List[DedupEntry],
+    ) -> None:
+        """Queue a sink's encoded batch, sending the shared request once it is full.
+
+        A request can exceed ``max_bytes`` by up to one batch.
+
+        Raises:
+            Exception: A write error of an earlier batch of this sink.
+        """
+        self._raise_error(sink)
+        precision = sink.write_precision
+        with self._lock:
+            self._pending.setdefault(precision, []).append(
+                PendingBatch(sink, payload, point_count, dedup_entries)
+            )
+            self._pending_bytes[precision] = self._pending_bytes.get(precision, 0) + len(payload) + 1
+            self._deadlines.setdefault(precision, time.monotonic() + self.max_delay)
+            self.batches_submitted += 1
+            full = self._pending_bytes[precision] >= self.max_bytes
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run_deadlines, name="influxdb-coalescer", daemon=True
+                )
+                self._thread.start()
+            self._lock.notify()
+        if full:
+            self._flush([precision])
+            self._raise_error(sink)
+
+    def flush(self, sink: Optional["InfluxDBSink"] = None) -> None:
+        """Send every pending batch and wait for the requests to be acknowledged.
+
+        Args:
+            sink: Sink whose write errors to raise; those of every sink when None.
+
+        Raises:
+            Exception: The first write error of the sink since its last flush.
+        """
+        self._flush()
+        self._raise_error(sink)
+
+    def close(self) -> None:
+        """Flush pending batches and stop the deadline thread."""
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._closed = True
+                self._lock.notify()
+            if self._thread is not None:
+                self._thread.join()
+                self._thread = None
+            if self.batches_submitted:
+                logger.info(
+                    f"Coalesced {self.batches_submitted} batches into "
+                    f"{self.requests_sent} write requests"
+                )
+
+    def _flush(self, precisions: Optional[List[str]] = None) -> None:
+        """Send the pending batches of some precisions, or all of them.
+
+        Batches are taken and sent under the write lock, so requests go out
+        in the order their batches were submitted, and their errors are
+        recorded before the lock is released.
+        """
+        with self._write_lock:
+            with self._lock:
+                if precisions is None:
+                    precisions = list(self._pending)
+                pending = [(precision, self._take(precision)) for precision in precisions]
+            for precision, batches in pending:
+                self._send(batches, precision)
+
+    def _take(self, precision: str) -> List[PendingBatch]:
+        """Remove and return the pending batches of a precision. Caller holds the lock."""
+        self._pending_bytes.pop(precision, None)
+        self._deadlines.pop(precision, None)
+        return self._pending.pop(precision, [])
+
+    def _run_deadlines(self) -> None:
+        """Send pending batches whose deadline has passed, until closed."""
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                expired = [p for p, deadline in self._deadlines.items() if deadline <= now]
+                if not expired:
+                    timeout = min(self._deadlines.values(), default=now + self.max_delay) - now
+                    self._lock.wait(timeout)
+                    continue
+            # Errors are raised on the main thread at the sink's next submit or flush
+            self._flush(expired)
+
+    def _send(self, batches: List[PendingBatch], precision: str) -> None:
+        """Send batches as one request, or hand each back to its sink if it fails.
+
+        Caller holds the write lock.
+        """
+        if len(batches) == 1:
+            self._write_batch(batches[0])
+            return
+
+        payload = b"\n".join(batch.payload for batch in batches)
+        first = batches[0].sink
+        started = time.monotonic()
+        try:
+            first.write_api.write(
+                bucket=first.config["influxdb_bucket"],
+                org=first.config["influxdb_org"],
+                record=payload,
+                write_precision=precision,
+            )
+        except Exception as e:
+            logger.warning(
+                f"Shared write of {len(batches)} batches failed ({e}); "
+                "writing each batch on its own"
+            )
+            for batch in batches:
+                self._write_batch(batch)
+            return
+        self.requests_sent += 1
+        latency = time.monotonic() - started
+        for batch in batches:
+            batch.sink.batch_sizer.record_success(latency)
+            batch.sink.record_acknowledged(batch.point_count, len(batch.payload), batch.dedup_entries, latency)
+
+    def _write_batch(self, batch: PendingBatch) -> None:
+        """Write a batch through its own sink, keeping its error for that sink.
+
+        Caller holds the write lock.
+        """
+        self.requests_sent += 1
+        try:
+            batch.sink.write_batch(batch.payload, batch.point_count, batch.dedup_entries)
+        except Exception as e:
+            with self._lock:
+                self._errors.setdefault(batch.sink, e)
+
+    def _raise_error(self, sink: Optional["InfluxDBSink"] = None) -> None:
+        """Raise, once, the first write error of a sink, or of any sink when None."""
+        with self._lock:
+            if sink is None:
+                errors = list(self._errors.values())
+                self._errors.clear()
+                error = errors[0] if errors else None
+            else:
+                error = self._errors.pop(sink, None)
+        if error is not None:
+            raise error
@@ -0,0 +1,396 @@
+"""Columnar encoding of same-shape record batches.
+
+For streams where every record has the same keys (BOD, Physical, B1610),
+the batch is transposed into one list per column and each step of the row
+mapping is applied to a whole column at once: timestamps are converted to an
+``array('q')`` of epochs, numeric columns are cast in a single pass, and tag
+values and series prefixes are computed once per distinct value. BOD, whose
+keys are fixed, skips the transpose and reads its values straight from the
+records through memos. The output is byte-identical to the row-by-row
+mapping of ``mappers.RecordMapper``.
+
+Any batch the columnar path cannot reproduce exactly (mixed key sets,
+columns the schema does not type, unparseable timestamps, records the row
+mapping would skip with a warning) raises ``ColumnarUnsupported`` before anything is
+written to the encoder, and the caller falls back to the row path.
+"""
+
+from array import array
+from datetime import date, datetime
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from target_influxdb.encoder import (
+    LineProtocolEncoder,
+    escape_key,
+    escape_measurement,
+    escape_tag_value,
+    format_field_value,
+    timestamp_to_int,
+)
+from target_influxdb.mappers import (
+    BOD_TAGS,
+    DEFAULT_TIME_KEYS,
+    FALLBACK_TIME_KEY,
+    RecordMapper,
+    field_value,
+)
+
+BOD_ZERO_FIELDS = "bidPrice_GBPMWh=0,offPrice_GBPMWh=0"
+
+# Receives the distinct series prefixes of each chunk
+SeriesObserver = Callable[[Iterable[str]], None]
+
+
+class ColumnarUnsupported(Exception):
+    """Raised when a batch must be encoded by the row path instead."""
+
+
+class Memo(dict):
+    """Dict that converts a missing key on first lookup and keeps the result.
+
+    Unlike ``distinct_map`` it needs no pass to collect the distinct values
+    first, so lookups can be chained with ``map`` over the records.
+    """
+
+    def __init__(self, convert: Callable[[Any], Any]):
+        super().__init__()
+        self.convert = convert
+
+    def __missing__(self, key: Any) -> Any:
+        value = self[key] = self.convert(key)
+        return value
+
+
+def to_columns(records: Sequence[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Transpose records with identical keys into a dict of columns."""
+    keys = tuple(records[0])
+    for record in records:
+        if tuple(record) != keys:
+            raise ColumnarUnsupported("records do not share one key set")
+    return {key: list(map(itemgetter(key), records)) for key in keys}
+
+
+def _parse_datetime(value: Any) -> datetime:
+    """Parse a timestamp value like ``mappers.parse_timestamp``, without the now() fallback."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError as e:
+            raise ColumnarUnsupported(f"unparseable timestamp {value!r}") from e
+    if not isinstance(value, datetime):
+        raise ColumnarUnsupported(f"unsupported timestamp {value!r}")
+    return value
+
+
+def distinct_map(values: List[Any], convert: Callable[[Any], Any]) -> List[Any]:
+    """Apply ``convert`` once per distinct value of a column and map it over the column.
+
+    Batches repeat the same half-hour boundaries, units and prices many
+    times, so most columns have far fewer distinct values than rows.
+    """
+    try:
+        converted = {value: convert(value) for value in set(values)}
+    except TypeError as e:
+        raise ColumnarUnsupported(f"unhashable value: {e}") from e
+    try:
+        return list(map(converted.__getitem__, values))
+    except KeyError:
+        # Values that are not equal to themselves (NaN) miss the lookup
+        return [convert(value) for value in values]
+
+
+def epoch_column(values: List[Any], precision: str) -> array:
+    """Convert a column of datetimes (or ISO strings) into an int64 array of epochs."""
+    return array(
+        "q",
+        distinct_map(values, lambda value: timestamp_to_int(_parse_datetime(value), precision)),
+    )
+
+
+def float_column(values: List[Any]) -> array:
+    """Cast a numeric column to a float64 array in one pass."""
+    try:
+        return array("d", map(float, values))
+    except (TypeError, ValueError) as e:
+        raise ColumnarUnsupported(f"column is not numeric: {e}") from e
+
+
+def field_column(key: str, values: Sequence[Any]) -> List[Optional[str]]:
+    """Encode every value of a field column as ``key=value``, or None to drop it."""
+    prefix = f"{escape_key(key)}="
+
+    def encode(value: Any) -> Optional[str]:
+        text = format_field_value(value)
+        return None if text is None else prefix + text
+
+    return distinct_map(values, encode)
+
+
+def demoted_column(key: str, values: List[Any]) -> List[Optional[str]]:
+    """Encode a column of demoted tag values as ``key=value`` fields."""
+    return field_column(key, distinct_map(values, lambda value: None if value is None else field_value(value)))
+
+
+def join_fields(columns: List[Tuple[str, List[Optional[str]]]]) -> List[str]:
+    """Join encoded field columns row by row in key order, leaving out dropped fields."""
+    ordered = [column for _, column in sorted(columns, key=itemgetter(0))]
+    return [",".join(filter(None, parts)) for parts in zip(*ordered)]
+
+
+def tag_part(key: str, convert: Callable[[Any], Optional[str]]) -> Callable[[Any], Optional[str]]:
+    """Return a function encoding a raw value of a tag as its ``key=value`` part, or None to omit it."""
+    tag_key = escape_key(key)
+
+    def part(value: Any) -> Optional[str]:
+        text = convert(value)
+        if text is None:
+            return None
+        tag_value = escape_tag_value(text)
+        return f"{tag_key}={tag_value}" if tag_value != "" else None
+
+    return part
+
+
+def prefix_column(
+    measurement: str,
+    tag_columns: Dict[str, List[Any]],
+    size: int,
+    convert: Callable[[Any], Optional[str]],
+) -> List[str]:
+    """Build the series prefix of every row from raw tag columns.
+
+    Each column is converted and escaped once per distinct value into a
+    ``key=value`` part (None for an omitted tag), and each row's prefix is
+    a join of its parts in key order, matching ``series_prefix``.
+
+    Args:
+        measurement: Measurement name.
+        tag_columns: Raw tag values by tag key.
+        size: Number of rows.
+        convert: Renders a raw value as tag text, or None to omit the tag.
+    """
+    part_columns = [
+        distinct_map(tag_columns[key], tag_part(key, convert))
+        for key in sorted(tag_columns)
+        if escape_key(key) != ""
+    ]
+
+    head = escape_measurement(measurement)
+    if not part_columns:
+        return [head] * size
+    return [",".join([head, *filter(None, row)]) for row in zip(*part_columns)]
+
+
+def _bod_tag(value: Any) -> Optional[str]:
+    """Render a BOD tag like ``str(record.get(key, ""))``; empty strings are dropped."""
+    return str(value) or None
+
+
+def _tag(value: Any) -> Optional[str]:
+    """Render a B1610/default tag: dates as ISO strings, None omitted."""
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _bod_prices(prices: Tuple[Any, Any]) -> str:
+    """Encode a (bid, offer) pair as the price fields of a BOD point, leaving out non-finite prices."""
+    bid, offer = (format_field_value(float(price)) for price in prices)
+    return ",".join(filter(None, (
+        bid and f"bidPrice_GBPMWh={bid}",
+        offer and f"offPrice_GBPMWh={offer}",
+    )))
+
+
+def encode_bod(
+    records: Sequence[Dict[str, Any]],
+    encoder: LineProtocolEncoder,
+    observe: Optional[SeriesObserver] = None,
+) -> int:
+    """Encode BOD records as a timeFrom point with prices and a zero timeTo point.
+
+    BOD has a fixed set of keys, so instead of transposing every column
+    the values are read with one ``itemgetter`` per group and looked up in
+    memos: each record's tags as one tuple, whose series prefix is built
+    once per series, its (bid, offer) pair, formatted once per distinct
+    pair from the parsed values, and its timestamps, converted once per
+    distinct time.
+
+    Args:
+        records: Records with the BOD keys of the first record.
+        encoder: Encoder to add the points to.
+        observe: Called with the distinct series prefixes.
+    """
+    size = len(records)
+    present = records[0].keys()
+    # Keys are only read where the first record has them
+    for key in ("timeFrom", "timeTo", "bid", "offer", *BOD_TAGS):
+        if key not in present and any(key in record for record in records):
+            raise ColumnarUnsupported(f"{key} is missing in some records")
+    if "timeFrom" not in present or "timeTo" not in present:
+        raise ColumnarUnsupported("timeFrom or timeTo is missing")
+
+    # A missing tag renders as "" and is dropped; a null one renders as "None"
+    tag_keys = [key for key in BOD_TAGS if key in present and escape_key(key) != ""]
+    parts = [Memo(tag_part(key, _bod_tag)) for key in tag_keys]
+    head = escape_measurement("BOD")
+    prefix_memo = Memo(
+        lambda tags: ",".join([head, *filter(None, map(dict.__getitem__, parts, tags))])
+    )
+    epoch_memo = Memo(lambda value: timestamp_to_int(_parse_datetime(value), encoder.precision))
+    price_memo = Memo(_bod_prices)
+
+    # A missing price is 0; a null one cannot be cast
+    price_keys = ["bid" if "bid" in present else None, "offer" if "offer" in present else None]
+    if None in price_keys:
+        price_rows = [tuple(record.get(key, 0) if key else 0 for key in price_keys) for record in records]
+    else:
+        price_rows = map(itemgetter(*price_keys), records)
+    if len(tag_keys) > 1:
+        tag_rows = map(itemgetter(*tag_keys), records)
+    else:
+        # itemgetter of one key returns the bare value
+        tag_rows = map(lambda record: tuple(record[key] for key in tag_keys), records)
+    try:
+        prefixes = list(map(prefix_memo.__getitem__, tag_rows))
+        price_fields = list(map(price_memo.__getitem__, price_rows))
+        time_from = list(map(epoch_memo.__getitem__, map(itemgetter("timeFrom"), records)))
+        time_to = list(map(epoch_memo.__getitem__, map(itemgetter("timeTo"), records)))
+    except KeyError as e:
+        raise ColumnarUnsupported(f"{e} is missing in some records") from e
+    except (TypeError, ValueError) as e:
+        raise ColumnarUnsupported(f"cannot encode value: {e}") from e
+    if observe is not None:
+        observe(set(prefix_memo.values()))
+
+    point_count = 2 * size
+
+    # Each record becomes its price point followed by its zero point
+    if encoder.dedup is not None:
+        encoder.extend_encoded(
+            [p for prefix in prefixes for p in (prefix, prefix)],
+            [f for price in price_fields for f in (price, BOD_ZERO_FIELDS)],
+            [e for pair in zip(time_from, time_to) for e in pair],
+        )
+        return point_count
+    lines = [
+        f"{prefix} {price} {start}\n{prefix} {BOD_ZERO_FIELDS} {end}" if price
+        else f"\n{prefix} {BOD_ZERO_FIELDS} {end}"
+        for prefix, price, start, end in zip(prefixes, price_fields, time_from, time_to)
+    ]
+    encoder.extend_lines(lines, point_count)
+    return point_count
+
+
+def encode_b1610(
+    records: Sequence[Dict[str, Any]],
+    encoder: LineProtocolEncoder,
+    demoted: Sequence[str] = (),
+    observe: Optional[SeriesObserver] = None,
+) -> int:
+    """Encode B1610 records as a single Gen_MV_MW field with every other column as a tag.
+
+    Args:
+        records: Records with one key set.
+        encoder: Encoder to add the points to.
+        demoted: Columns written as fields instead of tags.
+        observe: Called with the distinct series prefixes.
+    """
+    columns = to_columns(records)
+    times = columns.get("halfHourEndTime")
+    if times is None:
+        raise ColumnarUnsupported("halfHourEndTime is missing")
+    epochs = epoch_column(times, encoder.precision)
+
+    values = columns.get("Gen_MV_MW", [None] * len(records))
+    if "quantity" in columns:
+        values = [q if v is None else v for v, q in zip(values, columns["quantity"])]
+
+    tag_keys = sorted(
+        key for key in columns
+        if not key.startswith("_sdc_")
+        and key not in ("halfHourEndTime", "Gen_MV_MW", "quantity")
+        and key not in demoted
+    )
+    tag_columns = {key: columns[key] for key in tag_keys}
+    prefixes = prefix_column("B1610", tag_columns, len(records), _tag)
+    if observe is not None:
+        observe(set(prefixes))
+
+    # Records without a value are skipped, as in the row path
+    present = [value is not None for value in values]
+    gen_fields = field_column("Gen_MV_MW", float_column([v for v in values if v is not None]))
+    gen_iter = iter(gen_fields)
+    gen_column = [next(gen_iter) if keep else None for keep in present]
+    demoted_columns = [(key, demoted_column(key, columns[key])) for key in demoted if key in columns]
+    if demoted_columns:
+        joined = join_fields([("Gen_MV_MW", gen_column), *demoted_columns])
+        field_sets = [fields if keep else None for keep, fields in zip(present, joined)]
+    else:
+        field_sets = [(gen or "") if keep else None for keep, gen in zip(present, gen_column)]
+    return encoder.extend_encoded(prefixes, field_sets, epochs)
+
+
+def encode_default(
+    records: Sequence[Dict[str, Any]],
+    mapper: RecordMapper,
+    encoder: LineProtocolEncoder,
+    observe: Optional[SeriesObserver] = None,
+) -> int:
+    """Encode records with the stream's compiled default mapping.
+
+    Args:
+        records: Records with one key set.
+        mapper: The stream's compiled mapper.
+        encoder: Encoder to add the points to.
+        observe: Called with the distinct series prefixes.
+    """
+    columns = to_columns(records)
+    if mapper.spec.fields is not None or mapper.spec.tags is not None:
+        raise ColumnarUnsupported("stream does not use the default mapping")
+    if mapper.dynamic or not columns.keys() <= mapper.known_keys:
+        raise ColumnarUnsupported("schema does not fix the type of every column")
+
+    times = None
+    for key in DEFAULT_TIME_KEYS:
+        column = columns.get(key)
+        if column is None or all(value is None for value in column):
+            continue
+        if any(value is None for value in column):
+            raise ColumnarUnsupported(f"{key} is null in some records")
+        times = column
+        break
+    if times is None and FALLBACK_TIME_KEY in columns:
+        times = columns[FALLBACK_TIME_KEY]
+    epochs = epoch_column(times, encoder.precision) if times is not None else [None] * len(records)
+
+    field_columns: List[Tuple[str, List[Optional[str]]]] = []
+    for key, caster in mapper.fields:
+        column = columns.get(key)
+        if column is None:
+            continue
+        if caster is not None:
+            try:
+                column = distinct_map(column, lambda value: None if value is None else caster(value))
+            except ValueError as e:
+                raise ColumnarUnsupported(f"{key} cannot be cast: {e}") from e
+        field_columns.append((key, field_column(key, column)))
+    for key in mapper.demoted:
+        if key in columns:
+            field_columns.append((key, demoted_column(key, columns[key])))
+    if not field_columns:
+        raise ColumnarUnsupported("records have no fields")
+
+    field_sets = join_fields(field_columns)
+    if not all(field_sets):
+        # The row path logs a warning for each of these; let it
+        raise ColumnarUnsupported("a record has no fields")
+
+    tag_columns = {key: columns[key] for key in mapper.tags if key in columns}
+    prefixes = prefix_column(mapper.measurement, tag_columns, len(records), _tag)
+    if observe is not None:
+        observe(set(prefixes))
+    return encoder.extend_encoded(prefixes, field_sets, epochs)
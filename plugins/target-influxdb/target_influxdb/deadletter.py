@@ -0,0 +1,62 @@
+"""Dead-letter file for points InfluxDB rejects.
+
+Points isolated by bisecting a rejected batch are appended to one JSON Lines
+file per stream, with the status and message InfluxDB returned, so they can
+be inspected, fixed and written by hand. Every append is flushed and fsynced.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, TextIO
+
+
+class DeadLetterFile:
+    """Append-only JSON Lines file of rejected points for one stream."""
+
+    def __init__(self, directory: str, stream_name: str):
+        """Initialize the file; it is created on the first append.
+
+        Args:
+            directory: Dead-letter directory, created if missing.
+            stream_name: Stream whose points are quarantined here.
+        """
+        self.directory = Path(directory)
+        self.path = self.directory / f"{stream_name}.jsonl"
+        self.stream_name = stream_name
+        self._file: Optional[TextIO] = None
+        self._lock = threading.Lock()
+
+    def append(self, line: bytes, precision: str, status: Optional[int], message: str) -> None:
+        """Quarantine one rejected point.
+
+        Args:
+            line: The point, as line protocol.
+            precision: Write precision of the point's timestamp.
+            status: HTTP status InfluxDB answered with.
+            message: Error message InfluxDB answered with.
+        """
+        entry = {
+            "quarantined_at": datetime.now(timezone.utc).isoformat(),
+            "stream": self.stream_name,
+            "status": status,
+            "error": message,
+            "precision": precision,
+            "line": line.decode("utf-8", errors="replace"),
+        }
+        with self._lock:
+            if self._file is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Close the file if it was opened."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
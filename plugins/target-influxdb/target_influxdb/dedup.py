@@ -0,0 +1,100 @@
+"""Persistent content-hash index of points already written to InfluxDB.
+
+Taps such as tap-elexon-b1610 re-fetch a long lookback window on every run,
+and almost every point in it is unchanged. The index remembers, for each
+series and timestamp, a hash of the encoded field set that was last written
+successfully, so unchanged points can be dropped before they are sent.
+
+The index is a SQLite file keyed by a 64-bit hash of the series prefix
+(``measurement,tagset``) and the point timestamp in nanoseconds. Entries
+older than the retention window are evicted when the index is opened. The
+target opens one index and shares it between its sinks, so the file has one
+connection and is evicted once per run.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Iterable, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    series INTEGER NOT NULL,
+    ts_ns INTEGER NOT NULL,
+    value_hash INTEGER NOT NULL,
+    PRIMARY KEY (series, ts_ns)
+) WITHOUT ROWID
+"""
+
+_NS_PER_DAY = 86400 * 10 ** 9
+
+# Multipliers to bring a timestamp at each write precision to nanoseconds
+NS_MULTIPLIER = {"ns": 1, "us": 10 ** 3, "ms": 10 ** 6, "s": 10 ** 9}
+
+DedupEntry = Tuple[int, int, int]
+
+
+def hash64(text: str) -> int:
+    """Return a signed 64-bit hash of a string, suitable for SQLite INTEGER."""
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class DedupIndex:
+    """Look up and record the last written value hash of each point."""
+
+    def __init__(self, path: str, retention_days: int = 400):
+        """Open (or create) the index and evict expired entries.
+
+        Args:
+            path: Path of the SQLite file.
+            retention_days: Entries whose timestamp is older than this are evicted.
+        """
+        self.path = path
+        self.retention_days = retention_days
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(_SCHEMA)
+        self.evict()
+
+    def evict(self) -> int:
+        """Delete entries older than the retention window.
+
+        Returns:
+            The number of entries removed.
+        """
+        cutoff = time.time_ns() - self.retention_days * _NS_PER_DAY
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM points WHERE ts_ns < ?", (cutoff,)
+            )
+        return cursor.rowcount
+
+    def check(self, series: int, ts_ns: int, value_hash: int) -> bool:
+        """Return True if this exact value was already written for the point."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value_hash FROM points WHERE series = ? AND ts_ns = ?",
+                (series, ts_ns),
+            ).fetchone()
+            if row is not None and row[0] == value_hash:
+                self.skipped += 1
+                return True
+        return False
+
+    def record(self, entries: Iterable[DedupEntry]) -> None:
+        """Remember points whose write has been acknowledged by InfluxDB."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO points (series, ts_ns, value_hash) VALUES (?, ?, ?)",
+                entries,
+            )
+
+    def close(self) -> None:
+        """Close the index."""
+        with self._lock:
+            self._connection.close()
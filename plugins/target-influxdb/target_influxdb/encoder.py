@@ -0,0 +1,299 @@
+"""Line protocol encoder for InfluxDB writes.
+
+Builds escaped line protocol directly into a reusable byte buffer instead of
+going through ``influxdb_client.Point``. The output is byte-identical to what
+``Point.to_line_protocol()`` produces for the same measurement, tags, fields
+and timestamp, so the two paths can be swapped freely.
+"""
+
+import math
+from datetime import datetime, timezone
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from influxdb_client import WritePrecision
+
+from target_influxdb.dedup import NS_MULTIPLIER, DedupEntry, DedupIndex, hash64
+
+EPOCH = datetime.fromtimestamp(0, tz=timezone.utc)
+
+_ESCAPE_MEASUREMENT = str.maketrans({
+    ",": r"\,",
+    " ": r"\ ",
+    "\n": r"\n",
+    "\t": r"\t",
+    "\r": r"\r",
+})
+
+_ESCAPE_KEY = str.maketrans({
+    ",": r"\,",
+    "=": r"\=",
+    " ": r"\ ",
+    "\n": r"\n",
+    "\t": r"\t",
+    "\r": r"\r",
+})
+
+_ESCAPE_STRING = str.maketrans({
+    '"': r"\"",
+    "\\": r"\\",
+})
+
+_NS_PER_DAY = 86400 * 10 ** 9
+_NS_PER_SECOND = 10 ** 9
+
+
+def escape_measurement(name: Any) -> str:
+    """Escape a measurement name."""
+    return str(name).translate(_ESCAPE_MEASUREMENT)
+
+
+@lru_cache(maxsize=1024)
+def escape_key(key: str) -> str:
+    """Escape a tag or field key.
+
+    Keys come from a small fixed set per stream, so results are cached.
+    """
+    return str(key).translate(_ESCAPE_KEY)
+
+
+def escape_tag_value(value: Any) -> str:
+    """Escape a tag value, guarding against a trailing backslash."""
+    escaped = str(value).translate(_ESCAPE_KEY)
+    if escaped.endswith("\\"):
+        escaped += " "
+    return escaped
+
+
+def format_field_value(value: Any) -> Optional[str]:
+    """Format a field value as line protocol.
+
+    Returns:
+        The encoded value, or None when the value would be dropped
+        (None, NaN or infinite floats).
+    """
+    if isinstance(value, (float, Decimal)):
+        if not math.isfinite(value):
+            return None
+        text = str(value)
+        # Match Point: whole floats are written without the trailing ".0"
+        if text.endswith(".0"):
+            text = text[:-2]
+        return text
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return f"{value}i"
+    if isinstance(value, str):
+        return f'"{value.translate(_ESCAPE_STRING)}"'
+    raise ValueError(f'Type: "{type(value)}" is not supported as a field value.')
+
+
+def timestamp_to_int(timestamp: datetime, precision: str = WritePrecision.NS) -> int:
+    """Convert a datetime to an integer epoch at the given precision.
+
+    Naive datetimes are treated as UTC. Coarser precisions truncate the same
+    way ``Point`` does, so sub-unit values round identically.
+    """
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    delta = timestamp - EPOCH
+    ns = (
+        delta.days * _NS_PER_DAY
+        + delta.seconds * _NS_PER_SECOND
+        + delta.microseconds * 1000
+    )
+    if precision == WritePrecision.NS:
+        return ns
+    if precision == WritePrecision.US:
+        return int(ns / 1e3)
+    if precision == WritePrecision.MS:
+        return int(ns / 1e6)
+    if precision == WritePrecision.S:
+        return int(ns / 1e9)
+    raise ValueError(f"Unsupported write precision: {precision}")
+
+
+def series_prefix(measurement: str, tags: Iterable[Tuple[str, Any]]) -> str:
+    """Build the ``measurement,tag=value,...`` prefix of a line.
+
+    Tags are sorted by key; None values and tags whose escaped key or value
+    is empty are skipped.
+    """
+    parts = [escape_measurement(measurement)]
+    for key, value in sorted(tags):
+        if value is None:
+            continue
+        tag_key = escape_key(key)
+        tag_value = escape_tag_value(value)
+        if tag_key != "" and tag_value != "":
+            parts.append(f"{tag_key}={tag_value}")
+    return ",".join(parts)
+
+
+class LineProtocolEncoder:
+    """Accumulate line protocol for a single write request.
+
+    The buffer is reused between batches: call ``reset()`` after the payload
+    has been handed to the write API.
+
+    With a ``DedupIndex``, points whose series, timestamp and field values
+    were already written are dropped, and the entries for the points that
+    were encoded are collected in ``dedup_entries`` so they can be recorded
+    once the write is acknowledged. A point whose series and timestamp are
+    already in the buffer is compared with the queued value instead of the
+    index: InfluxDB keeps the last value written, so it is only dropped if
+    it repeats the queued one.
+    """
+
+    def __init__(
+        self,
+        precision: str = WritePrecision.NS,
+        dedup: Optional[DedupIndex] = None,
+    ):
+        """Initialize the encoder.
+
+        Args:
+            precision: Write precision used for all timestamps in the buffer.
+            dedup: Optional index used to drop unchanged points.
+        """
+        self.precision = precision
+        self.dedup = dedup
+        self._buffer = bytearray()
+        self.point_count = 0
+        self.skipped = 0
+        self.dedup_entries: List[DedupEntry] = []
+        # Value hash of each (series, timestamp) in the buffer, last one queued
+        self._queued: Dict[Tuple[int, int], int] = {}
+
+    def __len__(self) -> int:
+        """Return the number of encoded bytes."""
+        return len(self._buffer)
+
+    def add(
+        self,
+        measurement: str,
+        tags: Iterable[Tuple[str, Any]],
+        fields: Iterable[Tuple[str, Any]],
+        timestamp: Optional[datetime] = None,
+    ) -> None:
+        """Encode a point from its measurement, tags, fields and timestamp."""
+        self.add_line(series_prefix(measurement, tags), fields, timestamp)
+
+    def add_line(
+        self,
+        prefix: str,
+        fields: Iterable[Tuple[str, Any]],
+        timestamp: Optional[datetime] = None,
+    ) -> None:
+        """Encode a point whose series prefix has already been built.
+
+        Like ``Point``, a point without any writable field is encoded as an
+        empty line. Points the dedup index has already seen are skipped.
+        """
+        encoded_fields = []
+        for key, value in sorted(fields):
+            text = format_field_value(value)
+            if text is not None:
+                encoded_fields.append(f"{escape_key(key)}={text}")
+
+        epoch = None
+        if encoded_fields and timestamp is not None:
+            epoch = timestamp_to_int(timestamp, self.precision)
+        self.add_encoded(prefix, ",".join(encoded_fields), epoch)
+
+    def add_encoded(self, prefix: str, field_set: str, epoch: Optional[int]) -> None:
+        """Append a point from its already-encoded parts.
+
+        Args:
+            prefix: Series prefix from ``series_prefix``.
+            field_set: Encoded ``key=value,...`` fields; empty for an empty line.
+            epoch: Timestamp at the encoder's precision, or None.
+        """
+        line = ""
+        if field_set:
+            line = f"{prefix} {field_set}"
+            if epoch is not None:
+                line = f"{line} {epoch}"
+                if self.dedup is not None:
+                    entry = (
+                        hash64(prefix),
+                        epoch * NS_MULTIPLIER[self.precision],
+                        hash64(field_set),
+                    )
+                    queued = self._queued.get(entry[:2])
+                    if queued is None:
+                        unchanged = self.dedup.check(*entry)
+                    else:
+                        unchanged = queued == entry[2]
+                    if unchanged:
+                        self.skipped += 1
+                        return
+                    self._queued[entry[:2]] = entry[2]
+                    self.dedup_entries.append(entry)
+
+        if self.point_count:
+            self._buffer += b"\n"
+        self._buffer += line.encode("utf-8")
+        self.point_count += 1
+
+    def extend_encoded(
+        self,
+        prefixes: Iterable[str],
+        field_sets: Iterable[Optional[str]],
+        epochs: Iterable[Optional[int]],
+    ) -> int:
+        """Append many points from already-encoded parts in one buffer write.
+
+        Rows whose field set is None are skipped. With a dedup index each
+        point is checked individually through ``add_encoded``.
+
+        Returns:
+            The number of points appended or skipped as unchanged.
+        """
+        rows = zip(prefixes, field_sets, epochs)
+        if self.dedup is not None:
+            count = 0
+            for prefix, field_set, epoch in rows:
+                if field_set is not None:
+                    self.add_encoded(prefix, field_set, epoch)
+                    count += 1
+            return count
+
+        lines = [
+            f"{prefix} {field_set} {epoch}" if field_set and epoch is not None
+            else f"{prefix} {field_set}" if field_set
+            else ""
+            for prefix, field_set, epoch in rows
+            if field_set is not None
+        ]
+        self.extend_lines(lines, len(lines))
+        return len(lines)
+
+    def extend_lines(self, lines: List[str], point_count: int) -> None:
+        """Append already-built lines, bypassing the dedup index.
+
+        Args:
+            lines: Encoded lines; an entry may hold several newline-separated points.
+            point_count: Number of points in ``lines``.
+        """
+        if not lines:
+            return
+        if self.point_count:
+            self._buffer += b"\n"
+        self._buffer += "\n".join(lines).encode("utf-8")
+        self.point_count += point_count
+
+    def getvalue(self) -> bytes:
+        """Return the encoded payload."""
+        return bytes(self._buffer)
+
+    def reset(self) -> None:
+        """Clear the buffer for reuse."""
+        del self._buffer[:]
+        self.point_count = 0
+        self.dedup_entries = []
+        self._queued = {}
@@ -0,0 +1,383 @@
+"""Record mappers compiled from the stream schema.
+
+Each sink compiles one mapper from its SCHEMA message: the tag columns, the
+field columns with their casters and the timestamp column are worked out
+once from the declared property types, so encoding a record does no type
+inspection. Streams that need a different shape (BOD, B1610) are described
+declaratively in ``MAPPINGS``; every other stream uses the default mapping,
+where numbers and booleans are fields and strings and dates are tags.
+
+Properties whose type the schema leaves open (several non-null types, no
+type at all), and keys a record carries that the schema does not declare,
+are classified per value as before. Keys named for demotion are written as
+fields even where they would be tags, to bound the number of series.
+"""
+
+import logging
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from target_influxdb.encoder import LineProtocolEncoder
+from target_influxdb.series import SeriesKeyCache, tag_text
+
+# BOD tags, in key order
+BOD_TAGS = (
+    "bmUnit",
+    "levelFrom",
+    "levelTo",
+    "nationalGridBmUnit",
+    "pairId",
+    "settlementDate",
+    "settlementPeriod",
+)
+
+# Candidate timestamp columns of the default mapping, in priority order
+DEFAULT_TIME_KEYS = ("startTime", "halfHourEndTime", "timestamp")
+FALLBACK_TIME_KEY = "_sdc_extracted_at"
+
+
+class FieldRule(NamedTuple):
+    """A field taken from the first non-null of one or more record keys."""
+
+    name: str
+    sources: Tuple[str, ...]
+    # Value used when no source key is present; None skips the record
+    default: Optional[float] = None
+
+
+class MappingSpec(NamedTuple):
+    """Declarative description of how a stream's records become points."""
+
+    # Fixed timestamp column; None picks the first non-null of DEFAULT_TIME_KEYS
+    time_key: Optional[str] = None
+    # Fixed fields cast to float; None takes numeric and boolean properties
+    fields: Optional[Tuple[FieldRule, ...]] = None
+    # Fixed tags rendered with str(), missing keys omitted; None derives them
+    tags: Optional[Tuple[str, ...]] = None
+    # Derive tags from every remaining property rather than only strings and dates
+    remaining_as_tags: bool = False
+    # Also write a point at this time with every field set to zero
+    end_time_key: Optional[str] = None
+
+
+MAPPINGS: Dict[str, MappingSpec] = {
+    # Bid-offer levels: prices at timeFrom, back to zero at timeTo
+    "BOD": MappingSpec(
+        time_key="timeFrom",
+        fields=(
+            FieldRule("bidPrice_GBPMWh", ("bid",), default=0),
+            FieldRule("offPrice_GBPMWh", ("offer",), default=0),
+        ),
+        tags=BOD_TAGS,
+        end_time_key="timeTo",
+    ),
+    # Generation per unit: the quantity is the only field, everything else is a tag
+    "B1610": MappingSpec(
+        time_key="halfHourEndTime",
+        fields=(FieldRule("Gen_MV_MW", ("Gen_MV_MW", "quantity")),),
+        remaining_as_tags=True,
+    ),
+}
+DEFAULT_MAPPING = MappingSpec()
+
+
+def parse_timestamp(timestamp_value: Any) -> datetime:
+    """Parse a timestamp value to datetime.
+
+    Args:
+        timestamp_value: The timestamp value (string or datetime).
+
+    Returns:
+        A datetime object with timezone info; the current time if the
+        value cannot be parsed.
+    """
+    if isinstance(timestamp_value, datetime):
+        # Ensure timezone aware
+        if timestamp_value.tzinfo is None:
+            return timestamp_value.replace(tzinfo=timezone.utc)
+        return timestamp_value
+
+    if isinstance(timestamp_value, str):
+        try:
+            # Try parsing ISO format
+            dt = datetime.fromisoformat(timestamp_value.replace("Z", "+00:00"))
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return dt
+        except ValueError:
+            pass
+
+    # Default to current time
+    return datetime.now(timezone.utc)
+
+
+def field_value(value: Any) -> Any:
+    """Render a demoted tag value as a field: numbers, booleans and strings as they are, anything else as text."""
+    if isinstance(value, (bool, int, float, Decimal, str)):
+        return value
+    return tag_text(value)
+
+
+def _property_types(prop: Dict[str, Any]) -> frozenset:
+    """Return the non-null JSON types a property schema allows."""
+    types = set()
+    for option in [prop, *prop.get("anyOf", [])]:
+        declared = option.get("type", [])
+        types.update([declared] if isinstance(declared, str) else declared)
+    types.discard("null")
+    return frozenset(types)
+
+
+def _number(value: Any) -> Any:
+    """Cast a "number" value the way undeclared numbers are written: ints as they are, the rest as floats."""
+    if isinstance(value, int):
+        return value
+    return float(value)
+
+
+class RecordMapper:
+    """Encode the records of one stream into points."""
+
+    def __init__(
+        self,
+        measurement: str,
+        schema: Dict[str, Any],
+        spec: MappingSpec = DEFAULT_MAPPING,
+        logger: Optional[logging.Logger] = None,
+        demote: Iterable[str] = (),
+        float_numbers: bool = False,
+    ):
+        """Compile the mapper.
+
+        Args:
+            measurement: Measurement name, the stream name.
+            schema: JSON schema from the stream's SCHEMA message.
+            spec: Mapping to compile.
+            logger: Logger for records that are skipped.
+            demote: Keys to write as fields where they would otherwise be tags.
+            float_numbers: Write every value of a "number" property as a float,
+                including whole values, which are otherwise written as integers.
+        """
+        self.measurement = measurement
+        self.spec = spec
+        self.logger = logger or logging.getLogger(__name__)
+
+        properties = schema.get("properties", {})
+        self.known_keys = frozenset(properties)
+        # Keys that never become tags or schema-derived fields
+        reserved = set()
+
+        if spec.time_key is not None:
+            self.time_keys: Tuple[str, ...] = ()
+            reserved.add(spec.time_key)
+        else:
+            self.time_keys = DEFAULT_TIME_KEYS
+            reserved.update(DEFAULT_TIME_KEYS)
+        if spec.end_time_key is not None:
+            reserved.add(spec.end_time_key)
+        for rule in spec.fields or ():
+            reserved.update(rule.sources)
+
+        # Casters for fields; None means the validated value is written as is
+        self.fields: List[Tuple[str, Optional[Callable[[Any], Any]]]] = []
+        self.tags: List[str] = []
+        self.dynamic: List[str] = []
+        for key, prop in properties.items():
+            if key.startswith("_sdc_") or key in reserved:
+                continue
+            if spec.remaining_as_tags:
+                self.tags.append(key)
+                continue
+            # Date and date-time strings are parsed by the SDK and written as ISO tags
+            types = _property_types(prop)
+            if types == {"number"} or types == {"integer", "number"}:
+                self.fields.append((key, float if float_numbers else _number))
+            elif types == {"integer"} or types == {"boolean"}:
+                self.fields.append((key, None))
+            elif types == {"string"}:
+                self.tags.append(key)
+            else:
+                self.dynamic.append(key)
+        # Fields in key order, the order they are written in
+        self.fields.sort(key=lambda field: field[0])
+        if spec.tags is not None:
+            self.fields, self.tags, self.dynamic = [], list(spec.tags), []
+
+        # Demoted keys keep the series count down; undeclared keys can be demoted too
+        field_keys = {key for key, _ in self.fields}
+        self.demoted: Tuple[str, ...] = tuple(sorted(
+            key for key in set(demote)
+            if key in self.tags
+            or (
+                spec.tags is None
+                and key not in field_keys
+                and key not in reserved
+                and not key.startswith("_sdc_")
+            )
+        ))
+        self.tags = [key for key in self.tags if key not in self.demoted]
+        self.dynamic = [key for key in self.dynamic if key not in self.demoted]
+        reserved.update(self.demoted)
+        self.reserved = frozenset(reserved)
+        # Fixed tags are rendered with str(), like the original BOD mapping
+        self.tag_render: Callable[[Any], str] = str if spec.tags is not None else tag_text
+
+    @property
+    def points_per_record(self) -> int:
+        """Get the number of points written for each record that is not skipped."""
+        return 1 if self.spec.end_time_key is None else 2
+
+    def point(
+        self, record: Dict[str, Any]
+    ) -> Optional[Tuple[List[Tuple[str, Any]], List[Tuple[str, Any]], Optional[datetime]]]:
+        """Map a record to the raw tags, fields and timestamp of its point.
+
+        Tag values are rendered with ``tag_render``.
+
+        Returns:
+            The tags, fields and timestamp, or None if the record is skipped.
+        """
+        spec = self.spec
+        fields: List[Tuple[str, Any]] = []
+        if spec.fields is not None:
+            rule_fields = self._rule_fields(record)
+            if rule_fields is None:
+                return None
+            fields.extend(rule_fields)
+        for key in self.demoted:
+            value = record.get(key)
+            if value is not None:
+                fields.append((key, field_value(value)))
+
+        if spec.tags is not None:
+            # A missing key renders as "" and is dropped; a null one renders as "None"
+            tags = [(key, record.get(key, "")) for key in self.tags]
+        else:
+            tags = []
+            for key in self.tags:
+                value = record.get(key)
+                if value is not None:
+                    tags.append((key, value))
+            for key, caster in self.fields:
+                value = record.get(key)
+                if value is not None:
+                    fields.append((key, value if caster is None else caster(value)))
+
+            dynamic = self.dynamic
+            if not record.keys() <= self.known_keys:
+                dynamic = dynamic + [
+                    key for key in record
+                    if key not in self.known_keys
+                    and key not in self.reserved
+                    and not key.startswith("_sdc_")
+                ]
+            if dynamic:
+                self._classify(record, dynamic, tags, fields)
+
+            if not fields:
+                self.logger.warning(f"Record has no valid fields, skipping: {record}")
+                return None
+        return tags, fields, self._timestamp(record)
+
+    def encode(
+        self,
+        record: Dict[str, Any],
+        encoder: LineProtocolEncoder,
+        series_cache: SeriesKeyCache,
+    ) -> int:
+        """Encode a record into the encoder.
+
+        Args:
+            record: The record.
+            encoder: Encoder to add the points to.
+            series_cache: Cache of series prefixes.
+
+        Returns:
+            The number of points added (0 if the record was skipped).
+        """
+        point = self.point(record)
+        if point is None:
+            return 0
+        tags, fields, timestamp = point
+        prefix = series_cache.prefix(self.measurement, tags, render=self.tag_render)
+
+        encoder.add_line(prefix, fields, timestamp)
+        if self.spec.end_time_key is None:
+            return 1
+        # Demoted tags keep their value at the end point
+        encoder.add_line(
+            prefix,
+            [(name, value if name in self.demoted else 0.0) for name, value in fields],
+            parse_timestamp(record.get(self.spec.end_time_key)),
+        )
+        return 2
+
+    def _rule_fields(self, record: Dict[str, Any]) -> Optional[List[Tuple[str, float]]]:
+        """Take the fixed fields of the spec from a record, or None to skip it."""
+        fields = []
+        for rule in self.spec.fields:
+            for source in rule.sources:
+                value = record.get(source)
+                if value is not None:
+                    break
+            else:
+                if rule.default is None or any(source in record for source in rule.sources):
+                    # API returns some records without a value
+                    self.logger.error(f"Record has no value for {rule.name}, skipping: {record}")
+                    return None
+                value = rule.default
+            fields.append((rule.name, float(value)))
+        return fields
+
+    def _timestamp(self, record: Dict[str, Any]) -> Optional[datetime]:
+        """Extract the point timestamp from a record."""
+        if self.spec.time_key is not None:
+            return parse_timestamp(record.get(self.spec.time_key))
+        for key in self.time_keys:
+            value = record.get(key)
+            if value is not None:
+                return parse_timestamp(value)
+        if FALLBACK_TIME_KEY in record:
+            return parse_timestamp(record[FALLBACK_TIME_KEY])
+        return None
+
+    def _classify(
+        self,
+        record: Dict[str, Any],
+        keys: List[str],
+        tags: List[Tuple[str, Any]],
+        fields: List[Tuple[str, Any]],
+    ) -> None:
+        """Sort values whose type the schema does not pin down into tags and fields."""
+        for key in keys:
+            value = record.get(key)
+            if value is None:
+                continue
+            if self.spec.remaining_as_tags:
+                tags.append((key, value))
+            # Numbers and booleans are fields
+            elif isinstance(value, (int, float)):
+                fields.append((key, value))
+            # Strings, dates and datetimes are tags
+            elif isinstance(value, (str, datetime, date)):
+                tags.append((key, value))
+            else:
+                # Fallback: try to convert to float, otherwise skip
+                try:
+                    fields.append((key, float(value)))
+                except (ValueError, TypeError):
+                    self.logger.warning(f"Skipping field {key} with unsupported type: {type(value)}")
+
+
+def compile_mapper(
+    stream_name: str,
+    schema: Dict[str, Any],
+    logger: Optional[logging.Logger] = None,
+    demote: Iterable[str] = (),
+    float_numbers: bool = False,
+) -> RecordMapper:
+    """Compile the mapper registered for a stream, or the default mapping."""
+    return RecordMapper(
+        stream_name, schema, MAPPINGS.get(stream_name, DEFAULT_MAPPING), logger, demote, float_numbers
+    )
@@ -0,0 +1,270 @@
+"""Write-path metrics for the InfluxDB target.
+
+Each stream gets counters and histograms for encoding, writes and batch
+sizes. At the end of a run they are written as a Prometheus textfile (for
+the node_exporter textfile collector) and as a JSON summary. Both files are
+written to a temporary name and renamed into place, so a collector never
+reads a partial file.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+PREFIX = "target_influxdb"
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+POINTS_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)
+BYTES_BUCKETS = tuple(2 ** power for power in range(10, 25))  # 1 KiB to 16 MiB
+
+# Name, help text and buckets of each per-stream histogram
+HISTOGRAMS = {
+    "encode_seconds": ("Time spent encoding each batch", SECONDS_BUCKETS),
+    "write_seconds": ("HTTP write latency", SECONDS_BUCKETS),
+    "batch_points": ("Points per written batch", POINTS_BUCKETS),
+    "batch_bytes": ("Encoded bytes per written batch", BYTES_BUCKETS),
+}
+
+# Name and help text of each per-stream counter
+COUNTERS = {
+    "records_received": "Records received from the tap",
+    "records_dropped": "Records that produced no points",
+    "points_encoded": "Points encoded",
+    "points_written": "Points acknowledged by InfluxDB",
+    "points_unchanged": "Points skipped because the dedup index had them",
+    "bytes_sent": "Encoded bytes acknowledged by InfluxDB",
+    "batches_written": "Batches acknowledged by InfluxDB",
+    "write_failures": "Failed write attempts",
+    "retries": "Write attempts that were retried",
+    "points_quarantined": "Rejected points written to the dead-letter file",
+    "rollup_windows_written": "Rollup windows recomputed and acknowledged by InfluxDB",
+    "batches_spooled": "Batches appended to the on-disk spool after a failure",
+    "series_cache_hits": "Series prefix cache hits",
+    "series_cache_misses": "Series prefix cache misses",
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram with sum, min and max."""
+
+    def __init__(self, buckets: Sequence[float]):
+        """Initialize the histogram.
+
+        Args:
+            buckets: Upper bounds of the buckets, ascending.
+        """
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        """Record one value."""
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.bucket_counts):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Return ``(le, count)`` pairs including ``+Inf``, as Prometheus expects."""
+        pairs = []
+        running = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            running += count
+            pairs.append((_format_number(bound), running))
+        pairs.append(("+Inf", self.count))
+        return pairs
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket holding it, capped at max."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        running = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            running += count
+            if running >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the histogram as a JSON-serializable summary."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class StreamMetrics:
+    """Counters and histograms for one stream.
+
+    Writes are observed from pipelined writer threads, so every update
+    takes the lock.
+    """
+
+    def __init__(self, stream_name: str):
+        """Initialize empty metrics for a stream."""
+        self.stream_name = stream_name
+        self.counters = {name: 0 for name in COUNTERS}
+        self.histograms = {
+            name: Histogram(buckets) for name, (_, buckets) in HISTOGRAMS.items()
+        }
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Add to a counter."""
+        with self._lock:
+            self.counters[name] += value
+
+    def record_encoded(self, records: int, dropped: int, points: int, seconds: float) -> None:
+        """Record the encoding of one batch."""
+        with self._lock:
+            self.counters["records_received"] += records
+            self.counters["records_dropped"] += dropped
+            self.counters["points_encoded"] += points
+            self.histograms["encode_seconds"].observe(seconds)
+
+    def record_write(self, points: int, size: int, seconds: float) -> None:
+        """Record a write acknowledged by InfluxDB."""
+        with self._lock:
+            self.counters["points_written"] += points
+            self.counters["bytes_sent"] += size
+            self.counters["batches_written"] += 1
+            self.histograms["write_seconds"].observe(seconds)
+            self.histograms["batch_points"].observe(points)
+            self.histograms["batch_bytes"].observe(size)
+
+    def summary(self, duration: float) -> Dict[str, Any]:
+        """Return the stream's metrics as a JSON-serializable summary."""
+        with self._lock:
+            write_seconds = self.histograms["write_seconds"].sum
+            points = self.counters["points_written"]
+            return {
+                "counters": dict(self.counters),
+                "points_per_second": points / duration if duration else 0.0,
+                "points_per_write_second": points / write_seconds if write_seconds else 0.0,
+                "histograms": {
+                    name: histogram.summary() for name, histogram in self.histograms.items()
+                },
+            }
+
+
+class MetricsRegistry:
+    """Per-stream metrics for one run of the target."""
+
+    def __init__(self):
+        """Start timing the run."""
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.monotonic()
+        self._streams: Dict[str, StreamMetrics] = {}
+        self._lock = threading.Lock()
+
+    def stream(self, stream_name: str) -> StreamMetrics:
+        """Get the metrics of a stream, shared by every sink created for it."""
+        with self._lock:
+            if stream_name not in self._streams:
+                self._streams[stream_name] = StreamMetrics(stream_name)
+            return self._streams[stream_name]
+
+    @property
+    def duration(self) -> float:
+        """Get the seconds elapsed since the run started."""
+        return time.monotonic() - self._started
+
+    def summary(self) -> Dict[str, Any]:
+        """Return a JSON-serializable summary of the run."""
+        duration = self.duration
+        return {
+            "started_at": self.started_at.isoformat(),
+            "duration_seconds": duration,
+            "streams": {
+                name: metrics.summary(duration) for name, metrics in sorted(self._streams.items())
+            },
+        }
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        duration = self.duration
+        streams = sorted(self._streams.items())
+        lines = [
+            f"# HELP {PREFIX}_run_duration_seconds Duration of the run",
+            f"# TYPE {PREFIX}_run_duration_seconds gauge",
+            f"{PREFIX}_run_duration_seconds {_format_number(duration)}",
+            f"# HELP {PREFIX}_last_run_timestamp_seconds Start time of the run",
+            f"# TYPE {PREFIX}_last_run_timestamp_seconds gauge",
+            f"{PREFIX}_last_run_timestamp_seconds {_format_number(self.started_at.timestamp())}",
+        ]
+
+        for name, help_text in COUNTERS.items():
+            metric = f"{PREFIX}_{name}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for stream_name, metrics in streams:
+                lines.append(f"{metric}{_labels(stream_name)} {metrics.counters[name]}")
+
+        metric = f"{PREFIX}_points_per_second"
+        lines.append(f"# HELP {metric} Points written per second of the run")
+        lines.append(f"# TYPE {metric} gauge")
+        for stream_name, metrics in streams:
+            rate = metrics.counters["points_written"] / duration if duration else 0.0
+            lines.append(f"{metric}{_labels(stream_name)} {_format_number(rate)}")
+
+        for name, (help_text, _) in HISTOGRAMS.items():
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for stream_name, metrics in streams:
+                histogram = metrics.histograms[name]
+                for bound, count in histogram.cumulative():
+                    lines.append(f"{metric}_bucket{_labels(stream_name, le=bound)} {count}")
+                lines.append(f"{metric}_sum{_labels(stream_name)} {_format_number(histogram.sum)}")
+                lines.append(f"{metric}_count{_labels(stream_name)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, prometheus_path: Optional[str] = None, json_path: Optional[str] = None) -> None:
+        """Write the Prometheus textfile and/or the JSON summary."""
+        if prometheus_path:
+            _write_atomic(prometheus_path, self.to_prometheus())
+        if json_path:
+            _write_atomic(json_path, json.dumps(self.summary(), indent=2) + "\n")
+
+
+def _labels(stream_name: str, **extra: str) -> str:
+    """Render a Prometheus label set for a stream."""
+    labels = {"stream": stream_name, **extra}
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape_label(value: str) -> str:
+    """Escape a label value: backslash, double quote and newline."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_number(value: float) -> str:
+    """Format a number for the exposition format without a trailing ``.0``."""
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _write_atomic(path: str, text: str) -> None:
+    """Write a file under a temporary name and rename it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temporary, path)
@@ -0,0 +1,129 @@
+"""Retry and partial-batch recovery policy for InfluxDB writes.
+
+Throttling (429), server errors (5xx), timeouts and dropped connections are
+transient: the same payload is sent again after an exponential backoff with
+full jitter, honouring ``Retry-After`` when InfluxDB sends one.
+
+A 400, 413 or 422 response rejects something in the payload itself, so
+sending it again cannot help. Those batches are bisected instead: each half
+is written on its own, recursively, until the rejected points are isolated
+and can be quarantined while every other point is written.
+"""
+
+import logging
+import random
+import time
+from typing import Callable, Optional
+
+from urllib3.exceptions import HTTPError
+
+# Statuses that reject the content of a batch rather than the request
+SPLITTABLE_STATUSES = frozenset({400, 413, 422})
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """Return the HTTP status of a write error, or None if there was no response."""
+    return getattr(error, "status", None)
+
+
+def error_message(error: Exception) -> str:
+    """Return InfluxDB's error message if it sent one, else the error text."""
+    message = getattr(error, "message", None)
+    if isinstance(message, bytes):
+        message = message.decode("utf-8", errors="replace")
+    return message or str(error)
+
+
+def is_transient(error: Exception) -> bool:
+    """Return True for errors worth retrying with the same payload."""
+    status = error_status(error)
+    if status:
+        return status == 429 or status >= 500
+    # No response: the client reports SSL and connection errors as status 0,
+    # urllib3 and the socket layer raise their own (requests' are OSErrors)
+    return status == 0 or isinstance(error, (HTTPError, OSError))
+
+
+def is_splittable(error: Exception) -> bool:
+    """Return True for errors caused by some of the points in a batch."""
+    return error_status(error) in SPLITTABLE_STATUSES
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient write errors."""
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ):
+        """Initialize the policy.
+
+        Args:
+            max_retries: Retries after the first attempt; 0 disables retrying.
+            initial_backoff: Upper bound of the first delay, in seconds.
+            max_backoff: Upper bound of any delay, in seconds.
+        """
+        self.max_retries = max(0, max_retries)
+        self.initial_backoff = float(initial_backoff)
+        self.max_backoff = float(max_backoff)
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        """Return True if a failed attempt (counting from 0) should be retried."""
+        return attempt < self.max_retries and is_transient(error)
+
+    def delay(self, error: Exception, attempt: int) -> float:
+        """Return the seconds to wait before retrying a failed attempt.
+
+        ``Retry-After`` is honoured up to ``max_backoff``; otherwise the delay
+        is drawn uniformly between 0 and the exponential cap, so writers that
+        failed together do not retry together.
+        """
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                # An HTTP date; fall back to the computed backoff
+                pass
+        cap = min(self.max_backoff, self.initial_backoff * 2 ** attempt)
+        return random.uniform(0, cap)
+
+    def call(
+        self,
+        send: Callable[[], None],
+        logger: logging.Logger,
+        on_failure: Optional[Callable[[Exception], None]] = None,
+        on_retry: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Call ``send`` until it succeeds, retrying transient errors with backoff.
+
+        Args:
+            send: Sends the write; raises on failure.
+            logger: Logger for the retries.
+            on_failure: Called with every error, retried or not.
+            on_retry: Called before every retry.
+
+        Raises:
+            Exception: The last error, once it is not transient or retries are exhausted.
+        """
+        attempt = 0
+        while True:
+            try:
+                send()
+                return
+            except Exception as e:
+                if on_failure is not None:
+                    on_failure(e)
+                if not self.should_retry(e, attempt):
+                    raise
+                delay = self.delay(e, attempt)
+                attempt += 1
+                if on_retry is not None:
+                    on_retry()
+                logger.warning(
+                    f"Error writing to InfluxDB: {error_message(e)}; retry {attempt} of "
+                    f"{self.max_retries} in {delay:.1f}s"
+                )
+                time.sleep(delay)
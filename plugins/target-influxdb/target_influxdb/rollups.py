@@ -0,0 +1,310 @@
+"""Incrementally maintained rollups of stream points.
+
+Dashboards that show half-hourly data by day or week make InfluxDB scan
+every raw point on each refresh. A rollup keeps, for each window and tag
+set, the sum, mean, min, max and count of chosen fields and writes them to
+a separate measurement (and optionally bucket), so those queries read one
+point per window instead.
+
+Rollups are exact and idempotent. The field values of every point are kept
+in a SQLite index keyed by rollup, window, the point's full series and its
+timestamp, so a point that is sent again (a restated B1610 half hour, say)
+replaces its previous value instead of being counted twice, while points of
+different series merged by ``group_by`` are all counted. A window touched by a batch
+is marked dirty; its aggregates are recomputed from the index and written,
+and it stays dirty until InfluxDB acknowledges the write, so a failed
+rollup write is retried by the next batch or run. Points older than the
+retention period are evicted when the index is opened.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from target_influxdb.encoder import escape_key, escape_measurement, escape_tag_value, format_field_value
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS rollup_values (
+        rollup TEXT NOT NULL,
+        series TEXT NOT NULL,
+        window_start INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        ts_ns INTEGER NOT NULL,
+        field TEXT NOT NULL,
+        value REAL NOT NULL,
+        PRIMARY KEY (rollup, series, window_start, source, ts_ns, field)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dirty_windows (
+        rollup TEXT NOT NULL,
+        series TEXT NOT NULL,
+        window_start INTEGER NOT NULL,
+        PRIMARY KEY (rollup, series, window_start)
+    ) WITHOUT ROWID
+    """,
+)
+
+AGGREGATES = ("sum", "mean", "min", "max", "count")
+
+_WINDOW_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+_WEEK = 7 * 86400
+# 1970-01-01 was a Thursday; weekly windows start on Monday
+_MONDAY_OFFSET = 4 * 86400
+
+
+class RollupSpec(NamedTuple):
+    """A configured rollup of one stream."""
+
+    stream: str
+    # Window length in seconds
+    window: int
+    # Measurement the rollup is written to
+    measurement: str
+    # Tags kept in the rollup's tag set; None keeps every tag
+    group_by: Optional[Tuple[str, ...]]
+    # Fields rolled up; None takes every numeric field
+    fields: Optional[Tuple[str, ...]]
+    aggregates: Tuple[str, ...]
+    # Bucket the rollup is written to; None uses the target's bucket
+    bucket: Optional[str]
+
+
+def parse_window(text: Any) -> int:
+    """Parse a window such as ``30m``, ``1h``, ``1d`` or ``1w`` (or a number of seconds)."""
+    if isinstance(text, (int, Decimal)):
+        seconds = int(text)
+    else:
+        match = re.fullmatch(r"\s*(\d+)\s*([mhdw])\s*", str(text))
+        if match is None:
+            raise ValueError(f"Invalid rollup window {text!r}; use e.g. 30m, 1h, 1d or 1w")
+        seconds = int(match.group(1)) * _WINDOW_UNITS[match.group(2)]
+    if seconds <= 0:
+        raise ValueError(f"Rollup window must be positive, got {text!r}")
+    return seconds
+
+
+def parse_rollups(config: Iterable[Dict[str, Any]]) -> List[RollupSpec]:
+    """Build rollup specs from the ``rollups`` setting."""
+    specs = []
+    for entry in config or ():
+        window = str(entry.get("window", "1d"))
+        aggregates = tuple(entry.get("aggregates") or AGGREGATES)
+        unknown = set(aggregates) - set(AGGREGATES)
+        if unknown:
+            raise ValueError(f"Unknown rollup aggregates {sorted(unknown)}; use {list(AGGREGATES)}")
+        specs.append(RollupSpec(
+            stream=entry["stream"],
+            window=parse_window(window),
+            measurement=entry.get("measurement") or f"{entry['stream']}_{window.strip()}",
+            group_by=tuple(entry["group_by"]) if entry.get("group_by") is not None else None,
+            fields=tuple(entry["fields"]) if entry.get("fields") is not None else None,
+            aggregates=aggregates,
+            bucket=entry.get("bucket"),
+        ))
+    return specs
+
+
+def window_start(timestamp: datetime, window: int) -> int:
+    """Return the epoch second at which the window holding a timestamp starts.
+
+    Windows are aligned to midnight UTC, and weekly windows to Monday.
+    """
+    offset = _MONDAY_OFFSET if window % _WEEK == 0 else 0
+    seconds = int(timestamp.timestamp())
+    return (seconds - offset) // window * window + offset
+
+
+class RollupIndex:
+    """Field values of rolled-up points and the windows waiting to be written."""
+
+    def __init__(self, path: str, retention_days: int = 400):
+        """Open (or create) the index and evict expired points.
+
+        Args:
+            path: Path of the SQLite file.
+            retention_days: Points in windows that started longer ago than this are evicted.
+        """
+        self.path = path
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._connection.execute(statement)
+        self._migrate()
+        self.evict()
+
+    def _migrate(self) -> None:
+        """Move values from the index layout keyed by rollup tag set alone.
+
+        That layout kept one value per rollup series and timestamp, so the
+        values it holds are carried over as they are, each as its own source.
+        """
+        with self._lock, self._connection:
+            exists = self._connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollup_points'"
+            ).fetchone()
+            if exists is None:
+                return
+            self._connection.execute(
+                "INSERT OR IGNORE INTO rollup_values "
+                "SELECT rollup, series, window_start, series, ts_ns, field, value FROM rollup_points"
+            )
+            self._connection.execute("DROP TABLE rollup_points")
+
+    def evict(self) -> int:
+        """Delete points in windows older than the retention period.
+
+        Returns:
+            The number of values removed.
+        """
+        cutoff = int(time.time()) - self.retention_days * 86400
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM rollup_values WHERE window_start < ?", (cutoff,)
+            )
+        return cursor.rowcount
+
+    def add(self, rows: Sequence[Tuple[str, str, int, str, int, str, float]]) -> None:
+        """Store point values and mark their windows dirty.
+
+        Args:
+            rows: ``(rollup, series, window_start, source, ts_ns, field, value)``
+                tuples, where ``series`` is the rollup's tag set and ``source``
+                the full series of the point.
+        """
+        if not rows:
+            return
+        windows = {(rollup, series, start) for rollup, series, start, _, _, _, _ in rows}
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO rollup_values "
+                "(rollup, series, window_start, source, ts_ns, field, value) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO dirty_windows (rollup, series, window_start) VALUES (?, ?, ?)",
+                windows,
+            )
+
+    def dirty(self, rollup: str) -> List[Tuple[str, int, str, float, float, float, float, int]]:
+        """Aggregate the values of every dirty window of a rollup.
+
+        Returns:
+            ``(series, window_start, field, sum, mean, min, max, count)`` rows.
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT p.series, p.window_start, p.field, "
+                "SUM(p.value), AVG(p.value), MIN(p.value), MAX(p.value), COUNT(*) "
+                "FROM dirty_windows d JOIN rollup_values p "
+                "ON p.rollup = d.rollup AND p.series = d.series AND p.window_start = d.window_start "
+                "WHERE d.rollup = ? "
+                "GROUP BY p.series, p.window_start, p.field "
+                "ORDER BY p.series, p.window_start, p.field",
+                (rollup,),
+            ).fetchall()
+
+    def mark_clean(self, rollup: str, windows: Iterable[Tuple[str, int]]) -> None:
+        """Forget dirty windows whose aggregates InfluxDB has acknowledged."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "DELETE FROM dirty_windows WHERE rollup = ? AND series = ? AND window_start = ?",
+                [(rollup, series, start) for series, start in windows],
+            )
+
+    def close(self) -> None:
+        """Close the index."""
+        with self._lock:
+            self._connection.close()
+
+
+class Rollup:
+    """Collect the values of one rollup from mapped points and encode its dirty windows."""
+
+    def __init__(self, spec: RollupSpec, index: RollupIndex):
+        """Initialize the rollup.
+
+        Args:
+            spec: Rollup configuration.
+            index: Index the values and dirty windows are kept in.
+        """
+        self.spec = spec
+        self.index = index
+        # Unique per stream, measurement and window, so several rollups share one index
+        self.name = f"{spec.stream}/{spec.measurement}/{spec.window}"
+        self._rows: List[Tuple[str, str, int, str, int, str, float]] = []
+
+    def add(
+        self,
+        tags: Iterable[Tuple[str, str]],
+        fields: Iterable[Tuple[str, Any]],
+        timestamp: Optional[datetime],
+    ) -> None:
+        """Collect the rolled-up fields of one point.
+
+        Args:
+            tags: Tag keys and rendered values of the point.
+            fields: Field keys and values of the point.
+            timestamp: Point timestamp; points without one are not rolled up.
+        """
+        if timestamp is None:
+            return
+        spec = self.spec
+        group_by = spec.group_by
+        tag_set = [
+            (key, f",{escape_key(key)}={escape_tag_value(value)}")
+            for key, value in sorted(tags)
+            if value != "" and escape_key(key) != ""
+        ]
+        # The point's own series tells apart the points group_by merges
+        source = "".join(text for _, text in tag_set)
+        if group_by is None:
+            series = source
+        else:
+            series = "".join(text for key, text in tag_set if key in group_by)
+        start = window_start(timestamp, spec.window)
+        ts_ns = int(timestamp.timestamp()) * 10 ** 9 + timestamp.microsecond * 1000
+        for key, value in fields:
+            if spec.fields is not None and key not in spec.fields:
+                continue
+            # Booleans and strings are not rolled up; nor are NaN and infinities
+            if isinstance(value, bool) or not isinstance(value, (int, float, Decimal)):
+                continue
+            value = float(value)
+            if format_field_value(value) is None:
+                continue
+            self._rows.append((self.name, series, start, source, ts_ns, key, value))
+
+    def flush(self) -> None:
+        """Store the collected values and mark their windows dirty."""
+        rows, self._rows = self._rows, []
+        self.index.add(rows)
+
+    def encode(self) -> Tuple[bytes, List[Tuple[str, int]]]:
+        """Encode the aggregates of every dirty window as line protocol at second precision.
+
+        Returns:
+            The payload and the windows it covers.
+        """
+        spec = self.spec
+        measurement = escape_measurement(spec.measurement)
+        points: Dict[Tuple[str, int], List[str]] = {}
+        for series, start, field, total, mean, low, high, count in self.index.dirty(self.name):
+            values = {"sum": total, "mean": mean, "min": low, "max": high, "count": count}
+            key = escape_key(field)
+            parts = points.setdefault((series, start), [])
+            for aggregate in spec.aggregates:
+                parts.append(f"{key}_{aggregate}={format_field_value(values[aggregate])}")
+        lines = [
+            f"{measurement}{series} {','.join(sorted(parts))} {start}"
+            for (series, start), parts in points.items()
+        ]
+        return "\n".join(lines).encode("utf-8"), list(points)
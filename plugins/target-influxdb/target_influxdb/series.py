@@ -0,0 +1,194 @@
+"""LRU cache of serialized series prefixes.
+
+Most records in a stream belong to a small set of series: the same units,
+datasets and PSR types recur every half hour. The cache maps the raw tag
+values of a record to its escaped, sorted ``measurement,tag=value,...``
+prefix so the prefix is built once per series instead of once per point.
+
+Series that are only seen once (B1610 and Physical tag every record with
+its settlement period) still repeat most of their tags, so a prefix that
+misses is assembled from cached ``tag=value`` parts. Parts and the strings
+in their keys are interned, so a tag shared by many series is escaped and
+stored once.
+
+Memory use is estimated from the sizes of the cached keys, prefixes and
+parts and bounded by ``max_bytes``; least recently used prefixes are evicted
+first, then parts.
+"""
+
+import sys
+from collections import OrderedDict
+from datetime import date, datetime
+from operator import itemgetter
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from target_influxdb.encoder import escape_key, escape_measurement, escape_tag_value
+
+# Raw tag values whose equality implies identical tag text. Anything else is
+# keyed by its rendered text instead: Decimal("49.5") == Decimal("49.50"),
+# True == 1 and equal instants in different timezones all render differently.
+_RAW_KEY_TYPES = (str, int, date)
+
+# Approximate bytes per entry for the OrderedDict slot, its link and a key pair
+_ENTRY_OVERHEAD = 160
+
+_by_key = itemgetter(0)
+
+TagKey = Tuple[str, Hashable]
+
+
+def tag_text(value: Any) -> str:
+    """Render a tag value as text: dates and datetimes as ISO strings."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def key_value(value: Any, render: Callable[[Any], str] = tag_text) -> Hashable:
+    """Return the form of a tag value used in a cache key.
+
+    Args:
+        value: Raw tag value.
+        render: How values that are not keyed raw are rendered as text.
+    """
+    if type(value) in _RAW_KEY_TYPES:
+        return value
+    return render(value)
+
+
+class SeriesKeyCache:
+    """Map raw tag tuples to pre-serialized series prefixes.
+
+    A cache belongs to one sink and is not thread-safe.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 16 * 1024 * 1024,
+        observe: Optional[Callable[[Iterable[str]], None]] = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Approximate memory cap; 0 disables caching.
+            observe: Called with every prefix built on a miss, e.g. to
+                track series cardinality.
+        """
+        self.max_bytes = max_bytes
+        self.observe = observe
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        self._prefixes: "OrderedDict[Hashable, Tuple[str, int]]" = OrderedDict()
+        self._parts: "OrderedDict[TagKey, Tuple[Optional[str], int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of cached series."""
+        return len(self._prefixes)
+
+    def prefix(
+        self,
+        measurement: str,
+        tags: Iterable[Tuple[str, Any]],
+        render: Callable[[Any], str] = tag_text,
+    ) -> str:
+        """Return the series prefix for a measurement and its raw tags.
+
+        Tags are sorted by key; tags whose escaped key or value is empty are
+        skipped, as in ``series_prefix``.
+
+        Args:
+            measurement: Measurement name.
+            tags: Tag keys and raw values. Callers drop the None values they
+                do not want written.
+            render: Renders a raw value as tag text.
+        """
+        key_tags = tuple([(tag, key_value(value, render)) for tag, value in tags])
+        key = (measurement, key_tags)
+        try:
+            prefix, _ = self._prefixes[key]
+        except KeyError:
+            self.misses += 1
+        except TypeError:
+            # Unhashable tag values cannot be cached
+            self.misses += 1
+            prefix = self._build(measurement, key_tags)
+            if self.observe is not None:
+                self.observe((prefix,))
+            return prefix
+        else:
+            self.hits += 1
+            self._prefixes.move_to_end(key)
+            return prefix
+
+        prefix = self._build(measurement, key_tags)
+        if self.observe is not None:
+            self.observe((prefix,))
+        if self.max_bytes > 0:
+            size = sys.getsizeof(prefix) + sys.getsizeof(key_tags) + _ENTRY_OVERHEAD
+            self._store(self._prefixes, key, prefix, size)
+        return prefix
+
+    def _build(self, measurement: str, key_tags: Tuple[TagKey, ...]) -> str:
+        """Join the ``tag=value`` parts of a series in key order."""
+        parts = [escape_measurement(measurement)]
+        for tag_key in sorted(key_tags, key=_by_key):
+            part = self._part(tag_key)
+            if part is not None:
+                parts.append(part)
+        return ",".join(parts)
+
+    def _part(self, tag_key: TagKey) -> Optional[str]:
+        """Return the escaped ``tag=value`` part of a tag, or None to omit it."""
+        try:
+            part, _ = self._parts[tag_key]
+        except KeyError:
+            pass
+        except TypeError:
+            return _escape(tag_key)
+        else:
+            self._parts.move_to_end(tag_key)
+            return part
+
+        part = _escape(tag_key)
+        if self.max_bytes > 0:
+            tag, value = tag_key
+            tag_key = (sys.intern(tag), sys.intern(value) if type(value) is str else value)
+            if part is not None:
+                part = sys.intern(part)
+            self._store(self._parts, tag_key, part, sys.getsizeof(part) + _ENTRY_OVERHEAD)
+        return part
+
+    def _store(self, entries: OrderedDict, key: Hashable, value: Any, size: int) -> None:
+        """Add an entry and evict least recently used entries over the cap."""
+        entries[key] = (value, size)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            evict_from = self._prefixes or self._parts
+            _, (_, evicted) = evict_from.popitem(last=False)
+            self.size_bytes -= evicted
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "series": len(self._prefixes),
+            "tag_parts": len(self._parts),
+            "size_bytes": self.size_bytes,
+        }
+
+
+def _escape(tag_key: TagKey) -> Optional[str]:
+    """Escape one tag; a str key value is already the tag text."""
+    tag, value = tag_key
+    escaped_key = escape_key(tag)
+    escaped_value = escape_tag_value(value if type(value) is str else str(value))
+    if escaped_key == "" or escaped_value == "":
+        return None
+    return f"{escaped_key}={escaped_value}"
@@ -1,322 +1,605 @@
 """InfluxDB target sink class."""
 
-from typing import Any, Dict, List, Optional
-from datetime import datetime, date, timezone
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, List, Optional
 
-from influxdb_client import InfluxDBClient, Point, WritePrecision
-from influxdb_client.client.write_api import SYNCHRONOUS
+from influxdb_client import InfluxDBClient, WritePrecision
+from influxdb_client.client.write_api import WriteApi
 from singer_sdk.sinks import BatchSink
 
+from target_influxdb import columnar, retry
+from target_influxdb.archive import ParquetArchive
+from target_influxdb.batching import AdaptiveBatchSizer
+from target_influxdb.clients import SharedClient, shared_client
+from target_influxdb.coalescing import WriteCoordinator
+from target_influxdb.deadletter import DeadLetterFile
+from target_influxdb.dedup import DedupEntry, DedupIndex
+from target_influxdb.encoder import LineProtocolEncoder
+from target_influxdb.mappers import RecordMapper, compile_mapper
+from target_influxdb.rollups import Rollup, RollupIndex
+from target_influxdb.series import SeriesKeyCache
+from target_influxdb.spool import WriteSpool
+
+# Streams whose records all share one shape and benefit from columnar encoding
+DEFAULT_COLUMNAR_STREAMS = ["BOD", "Physical", "B1610"]
+
 
 class InfluxDBSink(BatchSink):
     """InfluxDB target sink class."""
 
-    max_size = 1000  # Maximum records to write per batch
-
-    def __init__(self, *args, **kwargs):
+    def __init__(self, target, *args, **kwargs):
         """Initialize the sink."""
-        super().__init__(*args, **kwargs)
-        self._client: Optional[InfluxDBClient] = None
-        self._write_api = None
+        super().__init__(target, *args, **kwargs)
+        self.metrics = target.metrics.stream(self.stream_name)
+        # Shared by every sink when writes are coalesced across streams
+        self.coordinator: Optional[WriteCoordinator] = (
+            target.write_coordinator if self.config.get("coalesce_writes", False) else None
+        )
+        self._batch_records = 0
+        self._batch_dropped = 0
+        self._batch_encode_seconds = 0.0
+        self._shared_client: Optional[SharedClient] = None
+        self._encoder: Optional[LineProtocolEncoder] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight: Deque[Future] = deque()
+        self._pending_records: List[Dict[str, Any]] = []
+        self._mapper: Optional[RecordMapper] = None
+        self._spool: Optional[WriteSpool] = None
+        # Shared by every sink; the target closes it
+        self._dedup_index: Optional[DedupIndex] = target.dedup_index
+        self._spool_holds_failures = False
+        self._dead_letter: Optional[DeadLetterFile] = None
+        self._rollup_specs = [spec for spec in target.rollups if spec.stream == self.stream_name]
+        self._rollups: Optional[List[Rollup]] = None
+        self._rollup_index: Optional[RollupIndex] = None
+        self._archive: Optional[ParquetArchive] = None
+        self.retry_policy = retry.RetryPolicy(
+            max_retries=self.config.get("max_retries", 5),
+            initial_backoff=self.config.get("retry_initial_backoff", 0.5),
+            max_backoff=self.config.get("retry_max_backoff", 30.0),
+        )
+        self.batch_sizer = AdaptiveBatchSizer(
+            initial_points=self.config.get("batch_size", 1000),
+            min_points=self.config.get("min_batch_points", 100),
+            max_points=self.config.get("max_batch_points", 10000),
+            max_bytes=self.config.get("max_batch_bytes", 5 * 1024 * 1024),
+            target_latency=self.config.get("target_write_latency", 1.0),
+            adaptive=self.config.get("adaptive_batching", True),
+        )
+        self.cardinality = target.cardinality
+        self._cardinality_warned = False
+        self.series_cache = SeriesKeyCache(
+            max_bytes=self.config.get("series_cache_bytes", 16 * 1024 * 1024),
+            observe=self._observe_series,
+        )
 
     @property
     def client(self) -> InfluxDBClient:
-        """Get or create InfluxDB client."""
-        if self._client is None:
-            self._client = InfluxDBClient(
-                url=self.config["influxdb_url"],
-                token=self.config["influxdb_token"],
-                org=self.config["influxdb_org"],
+        """Get the InfluxDB client shared by every sink writing to the same server."""
+        if self._shared_client is None:
+            self._shared_client = shared_client(self.config)
+        return self._shared_client.client
+
+    @property
+    def write_api(self) -> WriteApi:
+        """Get the shared synchronous write API."""
+        if self._shared_client is None:
+            self._shared_client = shared_client(self.config)
+        return self._shared_client.write_api
+
+    @property
+    def encoder(self) -> LineProtocolEncoder:
+        """Get the reusable line protocol encoder for this stream."""
+        if self._encoder is None:
+            self._encoder = LineProtocolEncoder(
+                precision=self.write_precision,
+                dedup=self.dedup_index,
             )
-            self._write_api = self._client.write_api(write_options=SYNCHRONOUS)
-        return self._client
+        return self._encoder
 
     @property
-    def write_api(self):
-        """Get write API."""
-        if self._write_api is None:
-            _ = self.client  # Initialize client which also initializes write_api
-        return self._write_api
+    def write_precision(self) -> str:
+        """Get the timestamp precision used by this stream's points."""
+        if self.stream_name in ("BOD", "B1610"):
+            return WritePrecision.S
+        return WritePrecision.NS
 
-    def process_batch(self, context: dict) -> None:
-        """Write a batch of records to InfluxDB.
+    @property
+    def pipelined(self) -> bool:
+        """Whether writes are sent in the background while encoding continues."""
+        return self.config.get("write_mode", "synchronous") == "pipelined"
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Get or create the pool that runs pipelined writes."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_in_flight_batches,
+                thread_name_prefix=f"influxdb-{self.stream_name}",
+            )
+        return self._executor
+
+    @property
+    def max_in_flight_batches(self) -> int:
+        """Get the maximum number of unacknowledged writes.
+
+        With one, each write is sent only after the previous one has been
+        acknowledged. More than one lets requests overlap, and they may be
+        applied out of order, so a later write of a point can be overwritten
+        by an earlier one.
+        """
+        return max(1, int(self.config.get("max_in_flight_batches", 1)))
+
+    @property
+    def is_full(self) -> bool:
+        """Check whether the encoded batch has reached its point or byte limit."""
+        encoder = self.encoder
+        return self.batch_sizer.is_full(encoder.point_count, len(encoder))
+
+    @property
+    def columnar(self) -> bool:
+        """Whether this stream is encoded column-wise in chunks of records."""
+        streams = self.config.get("columnar_streams", DEFAULT_COLUMNAR_STREAMS)
+        return self.stream_name in streams
+
+    def process_record(self, record: dict, context: dict) -> None:
+        """Encode a record into the pending batch.
+        
+        Records are encoded as they arrive rather than at drain time, so the
+        batch can be bounded by encoded points and bytes. Columnar streams
+        collect records into chunks first, so a batch may exceed its limits
+        by up to one chunk.
         
         Args:
+            record: Individual record in the stream.
             context: Stream partition or context dictionary.
         """
-        records = context["records"]
-        points = []
-
-        for record in records:
+        started = time.perf_counter()
+        self._batch_records += 1
+        if self._rollup_specs or self.archived:
+            self._collect_point(record)
+        if self.columnar:
+            self._pending_records.append(record)
+            if len(self._pending_records) >= self.config.get("columnar_chunk_records", 5000):
+                self._encode_pending_records()
+        else:
             # Some streams create multiple points per record
-            stream_points = self._record_to_points(record)
-            if stream_points:
-                points.extend(stream_points)
+            self._record_to_points(record)
+        self._batch_encode_seconds += time.perf_counter() - started
 
-        if points:
-            try:
-                self.write_api.write(
-                    bucket=self.config["influxdb_bucket"],
-                    org=self.config["influxdb_org"],
-                    record=points,
-                )
-                self.logger.info(f"Successfully wrote {len(points)} points to InfluxDB")
-            except Exception as e:
-                self.logger.error(f"Error writing to InfluxDB: {e}")
-                raise
+    def _encode_pending_records(self) -> None:
+        """Encode the buffered chunk column-wise, or row by row if it has no uniform shape."""
+        records = self._pending_records
+        if not records:
+            return
+        self._pending_records = []
+        observe = self._observe_series
+        try:
+            if self.stream_name == "BOD":
+                if self.mapper.demoted:
+                    raise columnar.ColumnarUnsupported("BOD has demoted tags")
+                points = columnar.encode_bod(records, self.encoder, observe)
+            elif self.stream_name == "B1610":
+                points = columnar.encode_b1610(records, self.encoder, self.mapper.demoted, observe)
+            else:
+                points = columnar.encode_default(records, self.mapper, self.encoder, observe)
+            self._batch_dropped += len(records) - points // self.mapper.points_per_record
+        except columnar.ColumnarUnsupported as e:
+            self.logger.debug(f"Encoding chunk row by row: {e}")
+            for record in records:
+                self._record_to_points(record)
+
+    @property
+    def dedup_index(self) -> Optional[DedupIndex]:
+        """Get the target's index of already-written points, if dedup is configured."""
+        return self._dedup_index
 
-    def _record_to_points(self, record: Dict[str, Any]) -> List[Point]:
-        """Convert a record to one or more InfluxDB Points.
+    @property
+    def spool(self) -> Optional[WriteSpool]:
+        """Get the on-disk spool for this stream, if spooling is configured."""
+        if self._spool is None and self.config.get("spool_dir"):
+            self._spool = WriteSpool(
+                self.config["spool_dir"],
+                name=self.stream_name,
+                max_segment_bytes=self.config.get("spool_segment_bytes", 64 * 1024 * 1024),
+            )
+        return self._spool
+
+    @property
+    def spool_all(self) -> bool:
+        """Whether every batch is spooled before it is sent, not only failed ones."""
+        return self.config.get("spool_mode", "failed") == "all"
+
+    @property
+    def dead_letter(self) -> Optional[DeadLetterFile]:
+        """Get the dead-letter file for rejected points, if one is configured."""
+        if self._dead_letter is None and self.config.get("dead_letter_dir"):
+            self._dead_letter = DeadLetterFile(self.config["dead_letter_dir"], self.stream_name)
+        return self._dead_letter
+
+    def process_batch(self, context: dict) -> None:
+        """Write the encoded batch to InfluxDB.
         
-        Different stream types require different handling:
-        - BOD: Creates 2 points (timeFrom with values, timeTo with zeros)
-        - B1610: Uses special tag handling (all fields except Gen_MV_MW are tags)
-        - Others: Creates 1 point using default logic
+        In pipelined mode the encoded batch is handed to a background writer
+        and this method returns as soon as there is room for it, so the next
+        batch can be encoded while this one is on the wire. With write
+        coalescing it is handed to the target's write coordinator instead.
         
         Args:
-            record: The record dictionary.
-            
-        Returns:
-            A list of InfluxDB Point objects.
+            context: Stream partition or context dictionary.
         """
-        stream_name = self.stream_name
-        
-        # Handle BOD stream specially
-        if stream_name == "BOD":
-            return self._bod_to_points(record)
-        # Handle B1610 stream specially
-        elif stream_name == "B1610":
-            return self._b1610_to_point(record)
-        # Default handling for other streams
-        else:
-            point = self._default_record_to_point(record)
-            return [point] if point else []
-    
-    def _bod_to_points(self, record: Dict[str, Any]) -> List[Point]:
-        """Convert BOD record to 2 points (one at timeFrom, one at timeTo with zeros).
+        started = time.perf_counter()
+        self._encode_pending_records()
+        encoder = self.encoder
+        self.metrics.record_encoded(
+            records=self._batch_records,
+            dropped=self._batch_dropped,
+            points=encoder.point_count,
+            seconds=self._batch_encode_seconds + time.perf_counter() - started,
+        )
+        self._batch_records = self._batch_dropped = 0
+        self._batch_encode_seconds = 0.0
+        self._check_cardinality()
+        if self._rollup_specs:
+            self._write_rollups()
+        if not encoder.point_count:
+            return
+
+        payload = encoder.getvalue()
+        point_count = encoder.point_count
+        dedup_entries = encoder.dedup_entries
+        encoder.reset()
+
+        spool = self.spool
+        if spool is not None and self.spool_all:
+            spool.append(payload, self.write_precision)
+
+        if self.coordinator is not None:
+            _ = self.write_api
+            self.coordinator.submit(self, payload, point_count, dedup_entries)
+            return
+
+        if not self.pipelined:
+            self.write_batch(payload, point_count, dedup_entries)
+            return
+
+        # Create the client here so worker threads never race to initialize it
+        _ = self.write_api
+        # Backpressure: block until the oldest write completes if we are at the cap
+        while len(self._in_flight) >= self.max_in_flight_batches:
+            self._in_flight.popleft().result()
+        self._in_flight.append(
+            self.executor.submit(self.write_batch, payload, point_count, dedup_entries)
+        )
+
+    def write_batch(
+        self,
+        payload: bytes,
+        point_count: int,
+        dedup_entries: List[DedupEntry],
+    ) -> None:
+        """Send an encoded batch to InfluxDB.
         
-        Tags: settlementDate, settlementPeriod, nationalGridBmUnit, bmUnit, levelFrom, levelTo, pairId
-        Fields: bidPrice_GBPMWh, offPrice_GBPMWh
+        Args:
+            payload: Line protocol for the batch.
+            point_count: Number of points in the payload, for logging.
+            dedup_entries: Dedup index entries to record once the write succeeds.
         """
+        spool = self.spool
+        started = time.monotonic()
         try:
-            time_from = self._parse_timestamp(record.get("timeFrom"))
-            time_to = self._parse_timestamp(record.get("timeTo"))
-            bid = float(record.get("bid", 0))
-            offer = float(record.get("offer", 0))
-            
-            # Build tags
-            tags = {
-                "settlementDate": str(record.get("settlementDate", "")),
-                "settlementPeriod": str(record.get("settlementPeriod", "")),
-                "nationalGridBmUnit": str(record.get("nationalGridBmUnit", "")),
-                "bmUnit": str(record.get("bmUnit", "")),
-                "levelFrom": str(record.get("levelFrom", "")),
-                "levelTo": str(record.get("levelTo", "")),
-                "pairId": str(record.get("pairId", "")),
-            }
-            
-            # Point 1: at timeFrom with actual values
-            p1 = Point("BOD").time(time_from, WritePrecision.S)
-            p1.field("bidPrice_GBPMWh", bid)
-            p1.field("offPrice_GBPMWh", offer)
-            for k, v in tags.items():
-                if v:  # Only add non-empty tags
-                    p1.tag(k, v)
-            
-            # Point 2: at timeTo with zero values
-            p2 = Point("BOD").time(time_to, WritePrecision.S)
-            p2.field("bidPrice_GBPMWh", 0.0)
-            p2.field("offPrice_GBPMWh", 0.0)
-            for k, v in tags.items():
-                if v:  # Only add non-empty tags
-                    p2.tag(k, v)
-            
-            return [p1, p2]
+            quarantined = self._send(payload)
+            self.record_acknowledged(
+                point_count, len(payload), dedup_entries, time.monotonic() - started, quarantined
+            )
         except Exception as e:
-            self.logger.error(f"Error converting BOD record to points: {e}, record: {record}")
-            return []
-    
-    def _b1610_to_point(self, record: Dict[str, Any]) -> List[Point]:
-        """Convert B1610 record to a single point.
-        
-        All fields are tags except:
-        - halfHourEndTime: used as timestamp
-        - quantity: renamed to Gen_MV_MW as the only field (measurement value)
-        
+            if spool is None:
+                self.logger.error(f"Error writing to InfluxDB: {e}")
+                raise
+            if not self.spool_all:
+                spool.append(payload, self.write_precision)
+            self._spool_holds_failures = True
+            self.metrics.increment("batches_spooled")
+            self.logger.warning(
+                f"Error writing to InfluxDB: {e}; spooled {point_count} points "
+                f"to {spool.directory} for replay"
+            )
+
+    def record_acknowledged(
+        self,
+        point_count: int,
+        size: int,
+        dedup_entries: List[DedupEntry],
+        latency: float,
+        quarantined: int = 0,
+    ) -> None:
+        """Record a batch InfluxDB has acknowledged, on its own or in a shared request.
+
         Args:
-            record: The record dictionary.
-            
+            point_count: Number of points in the batch.
+            size: Encoded size of the batch.
+            dedup_entries: Dedup index entries of the batch.
+            latency: Seconds the write took.
+            quarantined: Points of the batch that went to the dead-letter file.
+        """
+        self.metrics.record_write(point_count - quarantined, size, latency)
+        if quarantined:
+            # Only the points that were written may be skipped next time;
+            # leave the whole batch out of the index rather than parse it
+            self.logger.warning(
+                f"InfluxDB rejected {quarantined} of {point_count} points; "
+                f"quarantined them in {self.dead_letter.path}"
+            )
+        elif self._dedup_index is not None:
+            self._dedup_index.record(dedup_entries)
+        self.logger.info(f"Successfully wrote {point_count - quarantined} points to InfluxDB")
+
+    def _send(self, payload: bytes) -> int:
+        """Write a payload, bisecting it around points InfluxDB rejects.
+
+        Without a dead-letter directory a rejected batch fails as a whole.
+
+        Args:
+            payload: Line protocol to write.
+
         Returns:
-            A list containing a single InfluxDB Point.
+            The number of points quarantined in the dead-letter file.
         """
         try:
-            # Get timestamp from halfHourEndTime
-            timestamp = self._parse_timestamp(record.get("halfHourEndTime"))
-            
-            # Get the measurement field - check both names  
-            gen_mw = record.get("Gen_MV_MW")
-            if gen_mw is None:
-                gen_mw = record.get("quantity")
-            
-            # If still no value, skip this record (API returns some records without quantity)
-            if gen_mw is None:
-                # Don't log as error - API legitimately returns records without quantity sometimes
-                return []
-            
-            # Create point
-            point = Point("B1610").time(timestamp, WritePrecision.S)
-            
-            # Add the single field with the correct name
-            point.field("Gen_MV_MW", float(gen_mw))
-            
-            # All other fields become tags
-            for key, value in record.items():
-                # Skip metadata fields
-                if key.startswith("_sdc_"):
-                    continue
-                # Skip the timestamp field (already used)
-                if key == "halfHourEndTime":
-                    continue
-                # Skip the measurement fields (already added)
-                if key in ("Gen_MV_MW", "quantity"):
-                    continue
-                # Skip None values
-                if value is None:
-                    continue
-                
-                # Convert all other fields to string tags
-                if isinstance(value, (datetime, date)):
-                    point.tag(key, value.isoformat())
-                else:
-                    point.tag(key, str(value))
-            
-            return [point]
+            self._write_with_retry(payload)
+            return 0
         except Exception as e:
-            self.logger.error(f"Error converting B1610 record to point: {e}, record: {record}")
-            return []
+            if self.dead_letter is None or not retry.is_splittable(e):
+                raise
+            lines = [line for line in payload.split(b"\n") if line]
+            if len(lines) > 1:
+                middle = len(lines) // 2
+                return self._send(b"\n".join(lines[:middle])) + self._send(b"\n".join(lines[middle:]))
+            for line in lines:
+                self.dead_letter.append(line, self.write_precision, retry.error_status(e), retry.error_message(e))
+            self.metrics.increment("points_quarantined", len(lines))
+            return len(lines)
+
+    def _write_with_retry(
+        self,
+        payload: bytes,
+        bucket: Optional[str] = None,
+        precision: Optional[str] = None,
+    ) -> None:
+        """Write a payload, retrying transient errors with backoff and jitter.
+
+        Args:
+            payload: Line protocol to write.
+            bucket: Bucket to write to, if not the configured one.
+            precision: Timestamp precision of the payload, if not the stream's.
+
+        Raises:
+            Exception: The last error, once it is not transient or retries are exhausted.
+        """
+        def send() -> None:
+            started = time.monotonic()
+            self.write_api.write(
+                bucket=bucket or self.config["influxdb_bucket"],
+                org=self.config["influxdb_org"],
+                record=payload,
+                write_precision=precision or self.write_precision,
+            )
+            self.batch_sizer.record_success(time.monotonic() - started)
+
+        def on_failure(error: Exception) -> None:
+            self.batch_sizer.record_failure(retry.error_status(error))
+            self.metrics.increment("write_failures")
+
+        self.retry_policy.call(
+            send, self.logger, on_failure, on_retry=lambda: self.metrics.increment("retries")
+        )
 
-    def _default_record_to_point(self, record: Dict[str, Any]) -> Optional[Point]:
-        """Convert a record to an InfluxDB Point using default logic.
+    def flush_writes(self) -> None:
+        """Wait for every in-flight write to be acknowledged, then commit the archive.
+
+        The target calls this before every STATE message, so archive files
+        are committed exactly when the bookmark moves past their rows.
         
-        Default behavior:
-        - Numeric values become fields
-        - Strings and dates become tags
+        Raises:
+            Exception: The first write error, after all other writes have settled.
+        """
+        error = None
+        if self.coordinator is not None:
+            try:
+                self.coordinator.flush(self)
+            except Exception as e:
+                error = e
+        while self._in_flight:
+            try:
+                self._in_flight.popleft().result()
+            except Exception as e:
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
+        if self._archive:
+            self._archive.commit()
+
+    @property
+    def mapper(self) -> RecordMapper:
+        """Get the record mapper compiled from this stream's schema.
+
+        Under the ``demote`` cardinality policy, the stream's named tags are
+        demoted to fields if its series estimate is over the threshold when
+        the mapper is compiled.
+        """
+        if self._mapper is None:
+            demote = []
+            if (
+                self.config.get("cardinality_policy", "warn") == "demote"
+                and self.cardinality.exceeds(self.stream_name)
+            ):
+                demote = (self.config.get("demote_tags") or {}).get(self.stream_name, [])
+                if demote:
+                    self.logger.warning(
+                        f"{self.stream_name} has about {self.cardinality.estimate(self.stream_name)} "
+                        f"series; writing {', '.join(demote)} as fields instead of tags"
+                    )
+            self._mapper = compile_mapper(
+                self.stream_name,
+                self.schema,
+                self.logger,
+                demote,
+                self.config.get("float_number_fields", False),
+            )
+        return self._mapper
+
+    @property
+    def rollups(self) -> List[Rollup]:
+        """Get the rollups configured for this stream, opening the rollup index."""
+        if self._rollups is None:
+            self._rollup_index = RollupIndex(
+                self.config["rollup_index_path"],
+                retention_days=self.config.get("rollup_retention_days", 400),
+            )
+            self._rollups = [Rollup(spec, self._rollup_index) for spec in self._rollup_specs]
+        return self._rollups
+
+    @property
+    def archived(self) -> bool:
+        """Whether this stream's points are also written to Parquet cold storage."""
+        streams = self.config.get("archive_streams")
+        return bool(self.config.get("archive_dir")) and (streams is None or self.stream_name in streams)
+
+    @property
+    def archive(self) -> ParquetArchive:
+        """Get the Parquet archive of this stream's points."""
+        if self._archive is None:
+            self._archive = ParquetArchive(
+                self.config["archive_dir"],
+                self.stream_name,
+                compression=self.config.get("archive_compression", "zstd"),
+                row_group_rows=self.config.get("archive_row_group_rows", 100_000),
+                max_file_rows=self.config.get("archive_max_file_rows", 1_000_000),
+                max_open_partitions=self.config.get("archive_max_open_days", 8),
+            )
+        return self._archive
+
+    def _collect_point(self, record: Dict[str, Any]) -> None:
+        """Add a record's mapped point to this stream's rollups and archive."""
+        try:
+            point = self.mapper.point(record)
+        except Exception:
+            # Reported when the record itself is encoded
+            return
+        if point is None:
+            return
+        tags, fields, timestamp = point
+        render = self.mapper.tag_render
+        tags = [(key, render(value)) for key, value in tags]
+        for rollup in self.rollups if self._rollup_specs else ():
+            rollup.add(tags, fields, timestamp)
+        if self.archived:
+            self.archive.add(tags, fields, timestamp)
+
+    def _write_rollups(self) -> None:
+        """Recompute and write the rollup windows touched since the last batch.
+
+        A window whose write fails stays dirty and is written again with the
+        next batch, or the next run.
+        """
+        for rollup in self.rollups:
+            rollup.flush()
+            payload, windows = rollup.encode()
+            if not windows:
+                continue
+            try:
+                self._write_with_retry(payload, rollup.spec.bucket, WritePrecision.S)
+            except Exception as e:
+                self.logger.warning(
+                    f"Error writing rollup {rollup.spec.measurement}: {retry.error_message(e)}; "
+                    f"{len(windows)} windows will be written again with the next batch"
+                )
+                continue
+            rollup.index.mark_clean(rollup.name, windows)
+            self.metrics.increment("rollup_windows_written", len(windows))
+            self.logger.info(f"Wrote {len(windows)} windows of rollup {rollup.spec.measurement}")
+
+    def _observe_series(self, prefixes: Iterable[str]) -> None:
+        """Add series prefixes to this stream's cardinality estimate."""
+        self.cardinality.observe(self.stream_name, prefixes)
+
+    def _check_cardinality(self) -> None:
+        """Warn once when the stream's series estimate crosses its threshold."""
+        if self._cardinality_warned or not self.cardinality.exceeds(self.stream_name):
+            return
+        self._cardinality_warned = True
+        self.logger.warning(
+            f"{self.stream_name} has about {self.cardinality.estimate(self.stream_name)} series, "
+            f"over the threshold of {self.cardinality.threshold(self.stream_name)}"
+        )
+
+    def _record_to_points(self, record: Dict[str, Any]) -> int:
+        """Encode a record as one or more line protocol points.
+        
+        The stream's compiled mapper decides the shape:
+        - BOD: Creates 2 points (timeFrom with values, timeTo with zeros)
+        - B1610: Every property except the quantity is a tag
+        - Others: Creates 1 point, numbers are fields and strings are tags
         
         Args:
             record: The record dictionary.
             
         Returns:
-            An InfluxDB Point object, or None if no valid timestamp.
+            The number of points added to the encoder.
         """
         try:
-            # Use stream name as measurement
-            measurement = self.stream_name
-            
-            # Create point
-            point = Point(measurement)
-            
-            # Add timestamp - prioritize startTime for DISEBSP, halfHourEndTime for B1610, then timestamp, then _sdc_extracted_at
-            timestamp = None
-            if "startTime" in record and record["startTime"] is not None:
-                timestamp = self._parse_timestamp(record["startTime"])
-            elif "halfHourEndTime" in record and record["halfHourEndTime"] is not None:
-                timestamp = self._parse_timestamp(record["halfHourEndTime"])
-            elif "timestamp" in record and record["timestamp"] is not None:
-                timestamp = self._parse_timestamp(record["timestamp"])
-            elif "_sdc_extracted_at" in record:
-                timestamp = self._parse_timestamp(record["_sdc_extracted_at"])
-            
-            if timestamp:
-                point.time(timestamp, WritePrecision.NS)
-            
-            # Process fields: separate tags from fields
-            tags = {}
-            fields = {}
-            
-            for key, value in record.items():
-                # Skip metadata fields
-                if key.startswith("_sdc_"):
-                    continue
-                    
-                # Skip timestamp fields as they're already handled
-                if key in ("timestamp", "startTime", "halfHourEndTime"):
-                    continue
-                
-                # Skip None values
-                if value is None:
-                    continue
-                
-                # Numeric values (int/float) are fields
-                if isinstance(value, (int, float)) and not isinstance(value, bool):
-                    fields[key] = value
-                # Boolean values are fields
-                elif isinstance(value, bool):
-                    fields[key] = value
-                # Date and datetime objects -> convert to ISO string tags
-                elif isinstance(value, (datetime, date)):
-                    # Convert datetime/date to ISO format string and store as tag
-                    tags[key] = value.isoformat()
-                # String values are tags (for indexing and filtering)
-                elif isinstance(value, str):
-                    tags[key] = value
-                else:
-                    # Fallback: try to convert to float, otherwise skip
-                    try:
-                        fields[key] = float(value)
-                    except (ValueError, TypeError):
-                        self.logger.warning(f"Skipping field {key} with unsupported type: {type(value)}")
-            
-            # Add tags to point
-            for tag_key, tag_value in tags.items():
-                point.tag(tag_key, tag_value)
-            
-            # Add fields to point
-            for field_key, field_value in fields.items():
-                point.field(field_key, field_value)
-            
-            # Ensure we have at least one field
-            if not fields:
-                self.logger.warning(f"Record has no valid fields, skipping: {record}")
-                return None
-            
-            return point
-            
+            points = self.mapper.encode(record, self.encoder, self.series_cache)
         except Exception as e:
-            self.logger.error(f"Error converting record to Point: {e}, record: {record}")
-            return None
+            self.logger.error(f"Error converting {self.stream_name} record to points: {e}, record: {record}")
+            points = 0
+        if not points:
+            self._batch_dropped += 1
+        return points
 
-    def _parse_timestamp(self, timestamp_value: Any) -> datetime:
-        """Parse a timestamp value to datetime.
+    def clean_up(self) -> None:
+        """Clean up resources.
         
-        Args:
-            timestamp_value: The timestamp value (string or datetime).
-            
-        Returns:
-            A datetime object with timezone info.
+        Pending pipelined writes are awaited first; a failed write is raised
+        here so the target does not emit STATE for unwritten data.
         """
-        if isinstance(timestamp_value, datetime):
-            # Ensure timezone aware
-            if timestamp_value.tzinfo is None:
-                return timestamp_value.replace(tzinfo=timezone.utc)
-            return timestamp_value
-        
-        if isinstance(timestamp_value, str):
-            try:
-                # Try parsing ISO format
-                dt = datetime.fromisoformat(timestamp_value.replace('Z', '+00:00'))
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                return dt
-            except ValueError:
-                pass
-        
-        # Default to current time
-        return datetime.now(timezone.utc)
-
-    def clean_up(self) -> None:
-        """Clean up resources."""
-        if self._write_api:
-            self._write_api.close()
-        if self._client:
-            self._client.close()
-        self.logger.info("Closed InfluxDB connection")
+        try:
+            self.flush_writes()
+        finally:
+            if self._executor:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        if self._spool:
+            if self.spool_all and not self._spool_holds_failures:
+                # Every spooled batch was acknowledged, so the write-ahead copy can go
+                self._spool.discard_written()
+            self._spool.close()
+        if self._dead_letter:
+            self._dead_letter.close()
+        if self._rollup_index:
+            self._rollup_index.close()
+        if self._archive:
+            self._archive.close(compact=self.config.get("archive_compact", True))
+        counters = self.metrics.counters
+        if counters["retries"] or counters["points_quarantined"]:
+            self.logger.warning(
+                f"Write retries: {counters['retries']}, quarantined points: "
+                f"{counters['points_quarantined']}"
+            )
+        stats = self.series_cache.stats()
+        self.metrics.increment("series_cache_hits", stats["hits"])
+        self.metrics.increment("series_cache_misses", stats["misses"])
+        self.logger.info(
+            f"Series key cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.1%} hit rate), {stats['evictions']} evictions, "
+            f"{stats['series']} series and {stats['tag_parts']} tags in {stats['size_bytes'] / 1024:.0f} KiB"
+        )
+        if self._dedup_index and self._encoder:
+            self.metrics.increment("points_unchanged", self._encoder.skipped)
+            self.logger.info(
+                f"Skipped {self._encoder.skipped} unchanged points already in InfluxDB"
+            )
+        # The shared client stays open for other sinks; the target closes it at the end
+        self._shared_client = None
@@ -0,0 +1,281 @@
+"""Durable on-disk spool for InfluxDB write payloads.
+
+Encoded batches are appended to segment files in a spool directory so that
+an InfluxDB outage does not force the tap to re-extract data. Each entry is
+framed with a magic number, its length and a CRC32 checksum and is fsynced
+before ``append`` returns. Segments are replayed in name order; a torn or
+corrupt tail stops the read of that segment and is kept aside with a
+``.corrupt`` suffix. Entries whose content InfluxDB rejects are moved to a
+segment of the same name in ``rejected/``, so they cannot hold up the rest
+of their segment or the segments after it. Writers hold an exclusive
+``flock`` on their open segment, and replay skips any segment it cannot
+lock, so a spool directory can be shared by concurrent runs.
+"""
+
+import fcntl
+import logging
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".seg"
+REJECTED_DIR = "rejected"
+_MAGIC = b"ISP1"
+_HEADER = struct.Struct("<4sII")  # magic, body length, crc32 of body
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Persist directory entries (new or renamed segments), where supported."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _frame(payload: bytes, precision: str) -> bytes:
+    """Frame a payload as a segment entry."""
+    body = precision.encode("ascii") + b"\n" + payload
+    return _HEADER.pack(_MAGIC, len(body), zlib.crc32(body)) + body
+
+
+class SpoolCorruptionError(Exception):
+    """Raised when a segment contains a torn or corrupt entry."""
+
+
+def read_segment(f: BinaryIO) -> Iterator[Tuple[str, bytes]]:
+    """Yield ``(precision, payload)`` entries from an open segment file.
+
+    Raises:
+        SpoolCorruptionError: At the first truncated or corrupt entry, after
+            every intact entry before it has been yielded.
+    """
+    while True:
+        header = f.read(_HEADER.size)
+        if not header:
+            return
+        if len(header) < _HEADER.size:
+            raise SpoolCorruptionError(f"Truncated entry header in {f.name}")
+        magic, length, checksum = _HEADER.unpack(header)
+        if magic != _MAGIC:
+            raise SpoolCorruptionError(f"Bad entry magic in {f.name}")
+        body = f.read(length)
+        if len(body) < length or zlib.crc32(body) != checksum:
+            raise SpoolCorruptionError(f"Truncated or corrupt entry in {f.name}")
+        precision, _, payload = body.partition(b"\n")
+        yield precision.decode("ascii"), payload
+
+
+class WriteSpool:
+    """Append-only segment files holding encoded write payloads.
+
+    One instance writes its own segments (named after the stream and a
+    unique run id) so sinks never share an open file; any instance can
+    replay every segment in the directory.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        name: str = "spool",
+        max_segment_bytes: int = 64 * 1024 * 1024,
+    ):
+        """Initialize the spool.
+
+        Args:
+            directory: Spool directory, created if missing.
+            name: Prefix for segments written by this instance.
+            max_segment_bytes: Size at which a new segment is started.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.max_segment_bytes = max_segment_bytes
+        self._run_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+        self._sequence = 0
+        self._file = None
+        self._written: List[Path] = []
+        self._lock = threading.Lock()
+
+    @property
+    def written_segments(self) -> List[Path]:
+        """Get the segments written by this instance."""
+        return list(self._written)
+
+    def append(self, payload: bytes, precision: str) -> None:
+        """Durably append an encoded payload.
+
+        Args:
+            payload: Line protocol for one batch.
+            precision: Write precision of the payload's timestamps.
+        """
+        entry = _frame(payload, precision)
+        with self._lock:
+            f = self._segment_for(len(entry))
+            f.write(entry)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _segment_for(self, entry_size: int):
+        """Return the open segment, rotating if the entry would overflow it."""
+        if self._file is not None and self._file.tell() + entry_size > self.max_segment_bytes:
+            self._file.close()
+            self._file = None
+        if self._file is None:
+            self._sequence += 1
+            path = self.directory / (
+                f"{self._run_id}-{self.name}-{self._sequence:06d}{SEGMENT_SUFFIX}"
+            )
+            self._file = open(path, "ab")
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self._written.append(path)
+            _fsync_directory(self.directory)
+        return self._file
+
+    def close(self) -> None:
+        """Close the open segment."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def discard_written(self) -> None:
+        """Delete the segments written by this instance once their writes are acknowledged."""
+        self.close()
+        for path in self._written:
+            path.unlink(missing_ok=True)
+        self._written = []
+        _fsync_directory(self.directory)
+
+    def segments(self) -> List[Path]:
+        """List all segments in the spool directory, oldest first."""
+        return sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def replay(
+        self,
+        write,
+        max_bytes: int = 5 * 1024 * 1024,
+        is_rejected: Optional[Callable[[Exception], bool]] = None,
+    ) -> int:
+        """Replay every closed segment in the directory, deleting each one once written.
+
+        Consecutive entries with the same precision are coalesced into writes
+        of up to ``max_bytes``. A segment is only deleted after all of its
+        entries have been written, so a failure leaves it in place for the
+        next attempt; InfluxDB writes are idempotent, so re-sending the
+        entries that did succeed is harmless.
+
+        A write error for which ``is_rejected`` is true (InfluxDB refusing
+        the content, which no retry can fix) sends the coalesced entries
+        again one at a time. Entries that are rejected on their own are
+        moved to a segment of the same name in ``rejected/``, with their
+        errors in a ``.error`` file beside it, and replay carries on with
+        the rest. Any other error stops the replay and is raised.
+
+        Args:
+            write: Callable taking ``(payload, precision)``.
+            max_bytes: Maximum size of a coalesced write.
+            is_rejected: Tells a rejected entry from a failed write; none are rejected by default.
+
+        Returns:
+            The number of entries replayed.
+        """
+        replayed = 0
+        for path in self.segments():
+            if path in self._written:
+                continue
+            with open(path, "rb") as f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    logger.info(f"Skipping spool segment {path.name}, still being written")
+                    continue
+                replayed += self._replay_segment(f, write, max_bytes, is_rejected)
+        return replayed
+
+    def _reject(self, path: Path, entries: List[Tuple[str, bytes, Exception]]) -> None:
+        """Keep the rejected entries of a segment in ``rejected/``, out of the replay queue."""
+        rejected = self.directory / REJECTED_DIR
+        rejected.mkdir(exist_ok=True)
+        target = rejected / path.name
+        with open(target, "ab") as f:
+            for precision, payload, _ in entries:
+                f.write(_frame(payload, precision))
+            f.flush()
+            os.fsync(f.fileno())
+        with open(target.with_name(target.name + ".error"), "a", encoding="utf-8") as f:
+            for _, _, error in entries:
+                f.write(f"{error}\n")
+        _fsync_directory(rejected)
+        logger.warning(
+            f"InfluxDB rejected {len(entries)} entries of spool segment {path.name} "
+            f"({entries[0][2]}); moved them to {target} and replayed the rest"
+        )
+
+    def _replay_segment(
+        self,
+        f: BinaryIO,
+        write,
+        max_bytes: int,
+        is_rejected: Optional[Callable[[Exception], bool]],
+    ) -> int:
+        """Replay one locked segment and remove it once every entry is written or set aside."""
+        path = Path(f.name)
+        replayed = 0
+        rejected: List[Tuple[str, bytes, Exception]] = []
+        pending: List[bytes] = []
+        pending_bytes = 0
+        pending_precision: Optional[str] = None
+        corrupt = False
+
+        def send(payloads: List[bytes], precision: str) -> int:
+            """Write entries as one request, or one by one if their content is rejected."""
+            try:
+                write(b"\n".join(payloads), precision)
+                return len(payloads)
+            except Exception as e:
+                if is_rejected is None or not is_rejected(e):
+                    raise
+                if len(payloads) == 1:
+                    rejected.append((precision, payloads[0], e))
+                    return 0
+            return sum(send([payload], precision) for payload in payloads)
+
+        try:
+            for precision, payload in read_segment(f):
+                if pending and (
+                    precision != pending_precision
+                    or pending_bytes + len(payload) > max_bytes
+                ):
+                    replayed += send(pending, pending_precision)
+                    pending, pending_bytes = [], 0
+                pending.append(payload)
+                pending_bytes += len(payload) + 1
+                pending_precision = precision
+        except SpoolCorruptionError as e:
+            logger.warning(f"{e}; replaying the entries before it")
+            corrupt = True
+        if pending:
+            replayed += send(pending, pending_precision)
+
+        if rejected:
+            self._reject(path, rejected)
+        if corrupt:
+            path.rename(path.with_name(path.name + ".corrupt"))
+        else:
+            path.unlink()
+        _fsync_directory(self.directory)
+        logger.info(f"Replayed {replayed} batches from spool segment {path.name}")
+        return replayed
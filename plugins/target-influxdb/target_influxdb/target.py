@@ -1,9 +1,20 @@
 """InfluxDB target class."""
 
+import typing as t
+
+import click
 from singer_sdk import typing as th
 from singer_sdk.target_base import Target
 
+from target_influxdb import retry
+from target_influxdb.cardinality import CardinalityTracker
+from target_influxdb.clients import registry, shared_client
+from target_influxdb.coalescing import WriteCoordinator
+from target_influxdb.dedup import DedupIndex
+from target_influxdb.metrics import MetricsRegistry
+from target_influxdb.rollups import RollupSpec, parse_rollups
 from target_influxdb.sinks import InfluxDBSink
+from target_influxdb.spool import WriteSpool
 
 
 class TargetInfluxDB(Target):
@@ -41,12 +52,591 @@ class TargetInfluxDB(Target):
             "batch_size",
             th.IntegerType,
             default=1000,
-            description="Maximum number of records to write in a single batch",
+            description="Initial number of points to write in a single batch",
+        ),
+        th.Property(
+            "min_batch_points",
+            th.IntegerType,
+            default=100,
+            description="Lower bound on points per batch when adaptive batching shrinks batches",
+        ),
+        th.Property(
+            "max_batch_points",
+            th.IntegerType,
+            default=10000,
+            description="Upper bound on points per batch when adaptive batching grows batches",
+        ),
+        th.Property(
+            "max_batch_bytes",
+            th.IntegerType,
+            default=5 * 1024 * 1024,
+            description="Maximum encoded line protocol size of a single batch, in bytes",
+        ),
+        th.Property(
+            "adaptive_batching",
+            th.BooleanType,
+            default=True,
+            description=(
+                "Grow batches while writes stay under target_write_latency and shrink them "
+                "when p95 latency rises or InfluxDB returns 5xx/429"
+            ),
+        ),
+        th.Property(
+            "target_write_latency",
+            th.NumberType,
+            default=1.0,
+            description="Target p95 write latency in seconds for adaptive batching",
+        ),
+        th.Property(
+            "columnar_streams",
+            th.ArrayType(th.StringType),
+            default=["BOD", "Physical", "B1610"],
+            description=(
+                "Streams whose records are buffered into chunks and encoded column-wise. "
+                "Output is identical to row-by-row encoding"
+            ),
+        ),
+        th.Property(
+            "columnar_chunk_records",
+            th.IntegerType,
+            default=5000,
+            description="Number of records per columnar encoding chunk",
+        ),
+        th.Property(
+            "float_number_fields",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Write whole values of properties declared as number as floats instead of integers. "
+                "Fields already stored as integers reject float writes, see the README before enabling"
+            ),
+        ),
+        th.Property(
+            "series_cache_bytes",
+            th.IntegerType,
+            default=16 * 1024 * 1024,
+            description=(
+                "Approximate memory cap of each stream's cache of serialized series "
+                "prefixes and tags (0 disables it)"
+            ),
+        ),
+        th.Property(
+            "write_mode",
+            th.StringType,
+            default="synchronous",
+            allowed_values=["synchronous", "pipelined"],
+            description=(
+                "'synchronous' waits for each write before reading more records; "
+                "'pipelined' encodes the next batch while previous writes are in flight"
+            ),
+        ),
+        th.Property(
+            "max_in_flight_batches",
+            th.IntegerType,
+            default=1,
+            description=(
+                "Maximum number of unacknowledged writes per stream in pipelined mode. Above 1, "
+                "writes of the same series and timestamp may be applied out of order"
+            ),
+        ),
+        th.Property(
+            "coalesce_writes",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Merge the encoded batches of all streams into shared write requests, "
+                "sent once they reach coalesce_max_bytes or coalesce_max_delay"
+            ),
+        ),
+        th.Property(
+            "coalesce_max_bytes",
+            th.IntegerType,
+            description="Size at which a shared write request is sent (default: max_batch_bytes)",
+        ),
+        th.Property(
+            "coalesce_max_delay",
+            th.NumberType,
+            default=1.0,
+            description="Seconds a batch may wait for other streams before it is sent",
+        ),
+        th.Property(
+            "dedup_index_path",
+            th.StringType,
+            description=(
+                "Path of a SQLite file remembering the value hash of every written point. "
+                "When set, points whose value has not changed since they were last written are skipped"
+            ),
+        ),
+        th.Property(
+            "dedup_retention_days",
+            th.IntegerType,
+            default=400,
+            description="Dedup index entries with timestamps older than this many days are evicted",
+        ),
+        th.Property(
+            "max_retries",
+            th.IntegerType,
+            default=5,
+            description="Retries of a write that failed with a 5xx/429, a timeout or a connection error",
+        ),
+        th.Property(
+            "retry_initial_backoff",
+            th.NumberType,
+            default=0.5,
+            description="Upper bound in seconds of the first jittered retry delay; it doubles per retry",
+        ),
+        th.Property(
+            "retry_max_backoff",
+            th.NumberType,
+            default=30.0,
+            description="Upper bound in seconds of any retry delay, including Retry-After",
+        ),
+        th.Property(
+            "dead_letter_dir",
+            th.StringType,
+            description=(
+                "Directory for points InfluxDB rejects with a 400/413/422. When set, a rejected "
+                "batch is bisected until the offending points are isolated; they are appended "
+                "to <stream>.jsonl here and every other point is written"
+            ),
+        ),
+        th.Property(
+            "archive_dir",
+            th.StringType,
+            description=(
+                "Root directory of Parquet cold storage. When set, the mapped points of "
+                "archive_streams are also written to measurement=<stream>/date=<day>/ "
+                "partitions here. Requires pyarrow"
+            ),
+        ),
+        th.Property(
+            "archive_streams",
+            th.ArrayType(th.StringType),
+            description="Streams written to the archive; every stream when unset",
+        ),
+        th.Property(
+            "archive_compression",
+            th.StringType,
+            default="zstd",
+            allowed_values=["zstd", "snappy", "gzip", "brotli", "lz4", "none"],
+            description="Compression codec of archive files",
+        ),
+        th.Property(
+            "archive_row_group_rows",
+            th.IntegerType,
+            default=100_000,
+            description=(
+                "Rows per Parquet row group, at most; each day buffers up to this many rows, "
+                "and every STATE message writes what is buffered"
+            ),
+        ),
+        th.Property(
+            "archive_max_file_rows",
+            th.IntegerType,
+            default=1_000_000,
+            description=(
+                "Rows after which an archive file is closed and a new one started, at most; "
+                "every STATE message also closes the open files"
+            ),
+        ),
+        th.Property(
+            "archive_compact",
+            th.BooleanType,
+            default=True,
+            description=(
+                "At the end of the run, merge the small archive files of each day written to "
+                "into files of up to archive_max_file_rows rows"
+            ),
+        ),
+        th.Property(
+            "archive_max_open_days",
+            th.IntegerType,
+            default=8,
+            description="Days buffered per stream at once; the least recently used is committed first",
+        ),
+        th.Property(
+            "spool_dir",
+            th.StringType,
+            description=(
+                "Directory for the on-disk write spool. When set, batches that fail to "
+                "write are kept on disk and replayed on the next run instead of failing the job"
+            ),
+        ),
+        th.Property(
+            "spool_mode",
+            th.StringType,
+            default="failed",
+            allowed_values=["failed", "all"],
+            description=(
+                "'failed' spools only batches whose write failed; 'all' spools every batch "
+                "before it is sent and discards the spool once all writes are acknowledged"
+            ),
+        ),
+        th.Property(
+            "spool_segment_bytes",
+            th.IntegerType,
+            default=64 * 1024 * 1024,
+            description="Size at which a new spool segment file is started",
+        ),
+        th.Property(
+            "replay_spool",
+            th.BooleanType,
+            default=True,
+            description="Replay spooled batches into InfluxDB before processing new input",
+        ),
+        th.Property(
+            "connection_pool_size",
+            th.IntegerType,
+            description=(
+                "Maximum number of kept-alive connections in the InfluxDB client pool shared "
+                "by all streams (default: the influxdb_client default)"
+            ),
+        ),
+        th.Property(
+            "connect_timeout",
+            th.NumberType,
+            default=10.0,
+            description="Seconds to wait for a connection to InfluxDB",
+        ),
+        th.Property(
+            "read_timeout",
+            th.NumberType,
+            default=10.0,
+            description="Seconds to wait for InfluxDB to answer a write",
+        ),
+        th.Property(
+            "cardinality_state_path",
+            th.StringType,
+            description=(
+                "Path of a JSON file keeping the HyperLogLog series sketch of each "
+                "measurement between runs (estimates cover one run when unset)"
+            ),
+        ),
+        th.Property(
+            "cardinality_warning_series",
+            th.IntegerType,
+            default=100000,
+            description="Estimated series count above which a measurement is reported",
+        ),
+        th.Property(
+            "cardinality_thresholds",
+            th.ObjectType(additional_properties=th.IntegerType),
+            description="Per-measurement overrides of cardinality_warning_series",
+        ),
+        th.Property(
+            "cardinality_policy",
+            th.StringType,
+            default="warn",
+            allowed_values=["warn", "demote"],
+            description=(
+                "'warn' only reports measurements over their threshold; 'demote' also writes "
+                "the measurement's demote_tags as fields when its stream starts over the threshold"
+            ),
+        ),
+        th.Property(
+            "demote_tags",
+            th.ObjectType(additional_properties=th.ArrayType(th.StringType)),
+            description="Tags to demote to fields per measurement under the 'demote' policy",
+        ),
+        th.Property(
+            "rollups",
+            th.ArrayType(
+                th.ObjectType(
+                    th.Property("stream", th.StringType, required=True),
+                    th.Property(
+                        "window",
+                        th.StringType,
+                        default="1d",
+                        description="Window length: minutes, hours, days or weeks, e.g. 30m, 1h, 1d, 1w",
+                    ),
+                    th.Property(
+                        "group_by",
+                        th.ArrayType(th.StringType),
+                        description="Tags kept in the rollup's tag set; all of the point's tags when unset",
+                    ),
+                    th.Property(
+                        "fields",
+                        th.ArrayType(th.StringType),
+                        description="Fields to roll up; every numeric field when unset",
+                    ),
+                    th.Property(
+                        "aggregates",
+                        th.ArrayType(th.StringType),
+                        description="Any of sum, mean, min, max and count; all of them when unset",
+                    ),
+                    th.Property(
+                        "measurement",
+                        th.StringType,
+                        description="Measurement to write the rollup to; <stream>_<window> when unset",
+                    ),
+                    th.Property(
+                        "bucket",
+                        th.StringType,
+                        description="Bucket to write the rollup to; influxdb_bucket when unset",
+                    ),
+                )
+            ),
+            description=(
+                "Per-window aggregates of streams, kept up to date as points arrive. "
+                "Requires rollup_index_path"
+            ),
+        ),
+        th.Property(
+            "rollup_index_path",
+            th.StringType,
+            description=(
+                "Path of a SQLite file holding the values behind each rollup window, so "
+                "restated points replace their earlier value instead of being counted twice"
+            ),
+        ),
+        th.Property(
+            "rollup_retention_days",
+            th.IntegerType,
+            default=400,
+            description="Rollup values in windows older than this many days are evicted",
+        ),
+        th.Property(
+            "metrics_prometheus_path",
+            th.StringType,
+            description=(
+                "Path of a Prometheus textfile with per-stream write metrics, "
+                "written at the end of the run"
+            ),
+        ),
+        th.Property(
+            "metrics_json_path",
+            th.StringType,
+            description="Path of a JSON summary of per-stream write metrics, written at the end of the run",
         ),
     ).to_dict()
 
     default_sink_class = InfluxDBSink
 
+    _metrics: t.Optional[MetricsRegistry] = None
+    _write_coordinator: t.Optional[WriteCoordinator] = None
+    _dedup_index: t.Optional[DedupIndex] = None
+    _cardinality: t.Optional[CardinalityTracker] = None
+    _rollups: t.Optional[t.List[RollupSpec]] = None
+
+    @property
+    def metrics(self) -> MetricsRegistry:
+        """Get the write-path metrics of this run."""
+        if self._metrics is None:
+            self._metrics = MetricsRegistry()
+        return self._metrics
+
+    @property
+    def write_coordinator(self) -> WriteCoordinator:
+        """Get the coordinator that merges the writes of all streams."""
+        if self._write_coordinator is None:
+            self._write_coordinator = WriteCoordinator(
+                max_bytes=self.config.get(
+                    "coalesce_max_bytes", self.config.get("max_batch_bytes", 5 * 1024 * 1024)
+                ),
+                max_delay=self.config.get("coalesce_max_delay", 1.0),
+            )
+        return self._write_coordinator
+
+    @property
+    def dedup_index(self) -> t.Optional[DedupIndex]:
+        """Get the index of already-written points shared by every sink, if dedup is configured."""
+        if self._dedup_index is None and self.config.get("dedup_index_path"):
+            self._dedup_index = DedupIndex(
+                self.config["dedup_index_path"],
+                retention_days=self.config.get("dedup_retention_days", 400),
+            )
+        return self._dedup_index
+
+    @property
+    def cardinality(self) -> CardinalityTracker:
+        """Get the series-cardinality estimates of every measurement."""
+        if self._cardinality is None:
+            self._cardinality = CardinalityTracker(
+                path=self.config.get("cardinality_state_path"),
+                default_threshold=self.config.get("cardinality_warning_series", 100_000),
+                thresholds=self.config.get("cardinality_thresholds"),
+            )
+        return self._cardinality
+
+    @property
+    def rollups(self) -> t.List[RollupSpec]:
+        """Get the configured rollups of every stream."""
+        if self._rollups is None:
+            self._rollups = parse_rollups(self.config.get("rollups") or [])
+            if self._rollups and not self.config.get("rollup_index_path"):
+                raise ValueError("rollups require rollup_index_path")
+        return self._rollups
+
+    def report_cardinality(self) -> None:
+        """Log each measurement's series estimate and save the sketches."""
+        if self._cardinality is None:
+            return
+        for measurement, estimate in self._cardinality.estimates().items():
+            threshold = self._cardinality.threshold(measurement)
+            if estimate > threshold:
+                self.logger.warning(
+                    f"Measurement {measurement} has about {estimate} series, over the "
+                    f"threshold of {threshold}; consider demoting tags to fields"
+                )
+            else:
+                self.logger.info(f"Measurement {measurement} has about {estimate} series")
+        try:
+            self._cardinality.save()
+        except OSError as e:
+            self.logger.warning(f"Could not save cardinality state: {e}")
+
+    def _write_state_message(self, state: dict) -> None:
+        """Emit state only once every preceding write has been acknowledged.
+
+        Args:
+            state: The latest state received from the tap.
+        """
+        for sink in [*self._sinks_to_clear, *self._sinks_active.values()]:
+            sink.flush_writes()
+        super()._write_state_message(state)
+
+    def _process_lines(self, file_input: t.IO[str]) -> t.Counter[str]:
+        """Replay any spooled batches before reading new input.
+
+        Args:
+            file_input: Readable stream of messages, each on a separate line.
+            
+        Returns:
+            A counter object for the processed lines.
+        """
+        if self.config.get("spool_dir") and self.config.get("replay_spool", True):
+            try:
+                self.drain_spool()
+            except Exception as e:
+                self.logger.warning(f"Could not replay spool, will retry next run: {e}")
+        return super()._process_lines(file_input)
+
+    def _process_endofpipe(self) -> None:
+        """Drain all sinks, then write the metrics files and close the shared clients.
+
+        Both happen even if draining failed.
+        """
+        try:
+            super()._process_endofpipe()
+        finally:
+            try:
+                if self._write_coordinator is not None:
+                    self._write_coordinator.close()
+            finally:
+                self.write_metrics()
+                self.report_cardinality()
+                registry.close_all()
+                if self._dedup_index is not None:
+                    self._dedup_index.close()
+            self.logger.info("Closed InfluxDB connections")
+
+    def write_metrics(self) -> None:
+        """Write the configured Prometheus textfile and JSON summary."""
+        prometheus_path = self.config.get("metrics_prometheus_path")
+        json_path = self.config.get("metrics_json_path")
+        if not prometheus_path and not json_path:
+            return
+        try:
+            self.metrics.write(prometheus_path=prometheus_path, json_path=json_path)
+        except OSError as e:
+            self.logger.warning(f"Could not write metrics: {e}")
+            return
+        self.logger.info(
+            "Wrote metrics to " + ", ".join(path for path in (prometheus_path, json_path) if path)
+        )
+
+    def drain_spool(self) -> int:
+        """Replay every spooled batch into InfluxDB and remove it from the spool.
+        
+        Returns:
+            The number of spooled batches written.
+        """
+        spool_dir = self.config.get("spool_dir")
+        if not spool_dir:
+            self.logger.warning("No spool_dir configured, nothing to drain")
+            return 0
+
+        spool = WriteSpool(spool_dir, name="replay")
+        if not spool.segments():
+            return 0
+
+        write_api = shared_client(self.config).write_api
+        retry_policy = retry.RetryPolicy(
+            max_retries=self.config.get("max_retries", 5),
+            initial_backoff=self.config.get("retry_initial_backoff", 0.5),
+            max_backoff=self.config.get("retry_max_backoff", 30.0),
+        )
+
+        def write(payload: bytes, precision: str) -> None:
+            retry_policy.call(
+                lambda: write_api.write(
+                    bucket=self.config["influxdb_bucket"],
+                    org=self.config["influxdb_org"],
+                    record=payload,
+                    write_precision=precision,
+                ),
+                self.logger,
+            )
+
+        # Transient errors are retried as the sinks retry them. A batch
+        # InfluxDB rejects for its content (400/413/422) fails on every
+        # replay, so it is set aside; errors that outlast the retries, and
+        # rejected credentials or buckets, stop the replay until the next run
+        replayed = spool.replay(
+            write,
+            max_bytes=self.config.get("max_batch_bytes", 5 * 1024 * 1024),
+            is_rejected=retry.is_splittable,
+        )
+        self.logger.info(f"Replayed {replayed} spooled batches into InfluxDB")
+        return replayed
+
+    @classmethod
+    def invoke(  # type: ignore[override]
+        cls,
+        *,
+        drain_spool: bool = False,
+        config: t.Tuple[str, ...] = (),
+        **kwargs: t.Any,
+    ) -> None:
+        """Invoke the target, or only drain the spool with ``--drain-spool``.
+
+        Args:
+            drain_spool: Replay the spool into InfluxDB and exit.
+            config: Configuration file locations or 'ENV'.
+            kwargs: Remaining CLI arguments for the standard target invocation.
+        """
+        if not drain_spool:
+            super().invoke(config=config, **kwargs)
+            return
+
+        config_files, parse_env_config = cls.config_from_cli_args(*config)
+        target = cls(
+            config=config_files,  # type: ignore[arg-type]
+            validate_config=True,
+            parse_env_config=parse_env_config,
+        )
+        try:
+            target.drain_spool()
+        finally:
+            registry.close_all()
+
+    @classmethod
+    def get_singer_command(cls) -> click.Command:
+        """Add the ``--drain-spool`` option to the standard target command.
+
+        Returns:
+            A click.Command object.
+        """
+        command = super().get_singer_command()
+        command.params.append(
+            click.Option(
+                ["--drain-spool"],
+                is_flag=True,
+                help="Replay spooled batches into InfluxDB and exit without reading input.",
+            ),
+        )
+        return command
+
 
 if __name__ == "__main__":
     TargetInfluxDB.cli()
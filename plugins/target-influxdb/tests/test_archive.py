@@ -0,0 +1,78 @@
+"""Tests of the Parquet archive."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from target_influxdb.archive import ParquetArchive  # noqa: E402
+
+START = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+
+def add_points(archive, count, start=START):
+    for index in range(count):
+        archive.add([("bmUnit", "T_A-1")], [("quantity", float(index))], start + timedelta(minutes=30 * index))
+
+
+def test_rows_are_only_visible_once_committed(tmp_path):
+    archive = ParquetArchive(str(tmp_path), "B1610", row_group_rows=10, max_file_rows=10, max_open_partitions=1)
+    # Fills and closes several files over two days, none committed yet
+    add_points(archive, 96)
+    assert not list(tmp_path.rglob("*.parquet"))
+
+    archive.commit()
+
+    files = sorted(tmp_path.rglob("*.parquet"))
+    assert not list(tmp_path.rglob("*.tmp"))
+    assert sum(pq.read_metadata(path).num_rows for path in files) == 96
+    assert {path.parent.name for path in files} == {"date=2024-03-01", "date=2024-03-02"}
+
+
+def test_uncommitted_rows_of_a_failed_run_are_not_archived(tmp_path):
+    archive = ParquetArchive(str(tmp_path), "B1610", row_group_rows=10)
+    add_points(archive, 20)
+    archive.commit()
+    # The run fails before the next STATE message: nothing more is committed
+    add_points(archive, 20, START + timedelta(days=10))
+
+    files = list(tmp_path.rglob("*.parquet"))
+    assert sum(pq.read_metadata(path).num_rows for path in files) == 20
+
+
+def test_small_files_of_each_state_are_compacted(tmp_path):
+    archive = ParquetArchive(str(tmp_path), "B1610", row_group_rows=10, max_file_rows=25)
+    # One STATE message per 10 points of one day: a small file each
+    for batch in range(4):
+        add_points(archive, 10, START + timedelta(hours=5 * batch))
+        archive.commit()
+    assert len(list(tmp_path.rglob("*.parquet"))) == 4
+
+    archive.close()
+
+    files = sorted(tmp_path.rglob("*.parquet"))
+    assert [pq.read_metadata(path).num_rows for path in files] == [20, 20]
+    assert not list(tmp_path.rglob("_compaction"))
+    times = sorted(t for path in files for t in pq.read_table(path).column("time").to_pylist())
+    assert times == [START + timedelta(minutes=30 * index) for index in range(40)]
+
+
+def test_interrupted_compaction_is_finished_on_open(tmp_path):
+    archive = ParquetArchive(str(tmp_path), "B1610", max_file_rows=100)
+    for batch in range(2):
+        add_points(archive, 10, START + timedelta(hours=5 * batch))
+        archive.commit()
+    sources = sorted(tmp_path.rglob("*.parquet"))
+    day = sources[0].parent
+    # The merged file was renamed into place, its sources not yet deleted
+    merged = day / "part-merged.parquet"
+    pq.write_table(pq.read_table(sources[0]), merged)
+    (day / "_compaction").write_text(
+        '{"target": "part-merged.parquet", "sources": ["%s", "%s"]}' % (sources[0].name, sources[1].name)
+    )
+
+    ParquetArchive(str(tmp_path), "B1610")
+
+    assert sorted(tmp_path.rglob("*.parquet")) == [merged]
+    assert not (day / "_compaction").exists()
@@ -0,0 +1,63 @@
+"""Tests of write error handling in the cross-stream write coordinator."""
+
+import time
+
+import pytest
+
+from target_influxdb.coalescing import WriteCoordinator
+
+
+class FailingWriteApi:
+    def write(self, **kwargs):
+        raise ConnectionError("shared write failed")
+
+
+class FakeSink:
+    write_precision = "s"
+    config = {"influxdb_bucket": "bucket", "influxdb_org": "org"}
+    write_api = FailingWriteApi()
+
+    def __init__(self, fails=False):
+        self.fails = fails
+        self.written = []
+
+    def write_batch(self, payload, point_count, dedup_entries):
+        if self.fails:
+            raise ValueError(f"cannot write {payload!r}")
+        self.written.append(payload)
+
+
+def test_failed_batch_does_not_stop_the_others():
+    coordinator = WriteCoordinator(max_delay=60)
+    bad, good = FakeSink(fails=True), FakeSink()
+    coordinator.submit(bad, b"a", 1, [])
+    coordinator.submit(good, b"b", 1, [])
+
+    coordinator.flush(good)
+    assert good.written == [b"b"]
+    with pytest.raises(ValueError):
+        coordinator.flush(bad)
+    coordinator.close()
+
+
+def test_deadline_error_is_raised_by_the_next_flush():
+    coordinator = WriteCoordinator(max_delay=0.01)
+    bad = FakeSink(fails=True)
+    coordinator.submit(bad, b"a", 1, [])
+    while coordinator.requests_sent == 0:
+        time.sleep(0.01)
+
+    with pytest.raises(ValueError):
+        coordinator.flush(bad)
+    coordinator.close()
+
+
+def test_error_raised_only_from_its_own_sink():
+    coordinator = WriteCoordinator(max_delay=60)
+    bad, other = FakeSink(fails=True), FakeSink()
+    coordinator.submit(bad, b"a", 1, [])
+    coordinator.flush(other)
+
+    coordinator.submit(other, b"b", 1, [])
+    with pytest.raises(ValueError):
+        coordinator.close()
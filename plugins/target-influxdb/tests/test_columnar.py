@@ -0,0 +1,82 @@
+"""Tests of columnar BOD encoding against the row mapping."""
+
+import logging
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from target_influxdb import columnar
+from target_influxdb.encoder import LineProtocolEncoder
+from target_influxdb.mappers import MAPPINGS, RecordMapper
+from target_influxdb.series import SeriesKeyCache
+
+
+def bod(period, **overrides):
+    record = {
+        "timeFrom": datetime(2024, 3, 1, period - 1, tzinfo=timezone.utc),
+        "timeTo": datetime(2024, 3, 1, period, tzinfo=timezone.utc),
+        "settlementDate": date(2024, 3, 1),
+        "settlementPeriod": period,
+        "bmUnit": "T_A-1",
+        "nationalGridBmUnit": "A-1",
+        "pairId": period % 2,
+        "levelFrom": Decimal("49.5"),
+        "levelTo": 50,
+        "bid": Decimal("-120.25"),
+        "offer": Decimal("150"),
+    }
+    record.update(overrides)
+    return {key: value for key, value in record.items() if value is not ...}
+
+
+def row_payload(records):
+    mapper = RecordMapper("BOD", {"properties": {}}, MAPPINGS["BOD"])
+    encoder, cache = LineProtocolEncoder(), SeriesKeyCache()
+    for record in records:
+        mapper.encode(record, encoder, cache)
+    return encoder.getvalue()
+
+
+def columnar_payload(records):
+    encoder = LineProtocolEncoder()
+    columnar.encode_bod(records, encoder)
+    return encoder.getvalue()
+
+
+@pytest.mark.parametrize(
+    "records",
+    [
+        [bod(1), bod(2), bod(3, bid=Decimal("62.5"))],
+        [bod(1, bid=float("nan")), bod(2, offer=Decimal("NaN"))],
+        [bod(1, bid=float("nan"), offer=float("inf")), bod(2)],
+        [bod(1, pairId=None, bmUnit=""), bod(2)],
+        [bod(1, nationalGridBmUnit=...), bod(2, nationalGridBmUnit=...)],
+        [bod(1, offer=...), bod(2, offer=...)],
+    ],
+)
+def test_matches_row_mapping(records):
+    assert columnar_payload(records) == row_payload(records)
+
+
+@pytest.mark.parametrize(
+    "records",
+    [
+        [bod(1), bod(2, nationalGridBmUnit=...)],
+        [bod(1, nationalGridBmUnit=...), bod(2)],
+        [bod(1), bod(2, bid=None)],
+    ],
+)
+def test_unsupported_chunks_fall_back(records):
+    with pytest.raises(columnar.ColumnarUnsupported):
+        columnar_payload(records)
+
+
+def test_null_price_is_logged_and_skipped(caplog):
+    mapper = RecordMapper("BOD", {"properties": {}}, MAPPINGS["BOD"], logging.getLogger("test"))
+
+    with caplog.at_level(logging.ERROR):
+        points = mapper.encode(bod(1, bid=None), LineProtocolEncoder(), SeriesKeyCache())
+
+    assert points == 0
+    assert "no value for bidPrice_GBPMWh" in caplog.text
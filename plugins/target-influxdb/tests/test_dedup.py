@@ -0,0 +1,31 @@
+"""Tests of skipping unchanged points with the dedup index."""
+
+from target_influxdb.dedup import DedupIndex
+from target_influxdb.encoder import LineProtocolEncoder
+
+
+def write(index, points):
+    encoder = LineProtocolEncoder(precision="s", dedup=index)
+    for field_set, epoch in points:
+        encoder.add_encoded("BOD,bmUnit=A", field_set, epoch)
+    index.record(encoder.dedup_entries)
+    return encoder.getvalue().decode().splitlines()
+
+
+def test_unchanged_point_is_skipped(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite"))
+    write(index, [("level=1", 10)])
+
+    assert write(index, [("level=1", 10), ("level=2", 20)]) == ["BOD,bmUnit=A level=2 20"]
+
+
+def test_point_after_another_value_in_the_batch_is_kept(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite"))
+    write(index, [("level=100", 10)])
+
+    # Skipping the second point would leave level=0, the last value written
+    assert write(index, [("level=0", 10), ("level=100", 10), ("level=100", 10)]) == [
+        "BOD,bmUnit=A level=0 10",
+        "BOD,bmUnit=A level=100 10",
+    ]
+    assert write(index, [("level=100", 10)]) == []
@@ -0,0 +1,28 @@
+"""Tests of the field casters compiled from a stream's schema."""
+
+from decimal import Decimal
+
+from target_influxdb.mappers import RecordMapper
+
+SCHEMA = {
+    "properties": {
+        "timestamp": {"type": ["string", "null"], "format": "date-time"},
+        "price": {"type": ["number", "null"]},
+    }
+}
+
+
+def fields(record, **kwargs):
+    return RecordMapper("MIDP", SCHEMA, **kwargs).point(record)[1]
+
+
+def test_whole_numbers_stay_integers_by_default():
+    [(key, value)] = fields({"timestamp": "2024-03-01T00:00:00Z", "price": 250})
+    assert key == "price" and type(value) is int and value == 250
+    assert fields({"timestamp": "2024-03-01T00:00:00Z", "price": Decimal("62.5")}) == [("price", 62.5)]
+
+
+def test_float_numbers_writes_whole_numbers_as_floats():
+    [(key, value)] = fields({"timestamp": "2024-03-01T00:00:00Z", "price": 250}, float_numbers=True)
+
+    assert key == "price" and isinstance(value, float) and value == 250.0
@@ -0,0 +1,35 @@
+"""Tests of the write retry policy."""
+
+import pytest
+import requests
+from influxdb_client.rest import ApiException
+from urllib3.exceptions import NewConnectionError, ProtocolError, SSLError
+
+from target_influxdb import retry
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        ApiException(status=429),
+        ApiException(status=503),
+        # The client reports SSL and connection failures without a response
+        ApiException(status=0, reason="SSLError"),
+        SSLError("handshake failed"),
+        NewConnectionError(None, "connection refused"),
+        ProtocolError("connection aborted"),
+        requests.ConnectionError("connection reset"),
+        requests.Timeout("read timed out"),
+        ConnectionResetError(),
+    ],
+)
+def test_transient_errors(error):
+    assert retry.is_transient(error)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [ApiException(status=400), ApiException(status=401), ApiException(status=413), ValueError("bad value")],
+)
+def test_permanent_errors(error):
+    assert not retry.is_transient(error)
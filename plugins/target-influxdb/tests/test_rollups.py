@@ -0,0 +1,57 @@
+"""Tests of incremental rollups."""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from target_influxdb.rollups import Rollup, RollupIndex, RollupSpec
+
+HALF_HOUR = datetime(2024, 3, 1, 12, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = RollupIndex(str(tmp_path / "rollups.sqlite"))
+    yield index
+    index.close()
+
+
+def rollup(index, group_by, fields=None):
+    spec = RollupSpec("B1610", 86400, "B1610_1d", group_by, fields, ("sum", "count"), None)
+    return Rollup(spec, index)
+
+
+def b1610_tags(unit):
+    return [("bmUnit", unit), ("psrType", "Generation"), ("settlementPeriod", "26")]
+
+
+def lines(rollup):
+    rollup.flush()
+    payload, _ = rollup.encode()
+    return payload.decode().splitlines()
+
+
+def test_group_by_sums_every_series_in_the_group(index):
+    daily = rollup(index, ("psrType",))
+    for unit, quantity in (("T_A-1", 10), ("T_B-2", 20), ("T_C-3", 30)):
+        daily.add(b1610_tags(unit), [("quantity", quantity)], HALF_HOUR)
+
+    assert lines(daily) == ["B1610_1d,psrType=Generation quantity_count=3i,quantity_sum=60 1709251200"]
+
+
+def test_group_by_counts_points_merged_from_other_tags(index):
+    daily = rollup(index, ("bmUnit",), fields=("bid",))
+    for pair, bid in ((-1, 40.0), (1, 50.0), (2, 60.0)):
+        daily.add([("bmUnit", "T_A-1"), ("pairId", str(pair))], [("bid", bid)], HALF_HOUR)
+
+    assert lines(daily) == ["B1610_1d,bmUnit=T_A-1 bid_count=3i,bid_sum=150 1709251200"]
+
+
+def test_restated_point_replaces_its_value(index):
+    daily = rollup(index, ("psrType",))
+    daily.add(b1610_tags("T_A-1"), [("quantity", 10)], HALF_HOUR)
+    daily.add(b1610_tags("T_B-2"), [("quantity", 20)], HALF_HOUR)
+    lines(daily)
+    daily.add(b1610_tags("T_A-1"), [("quantity", 15)], HALF_HOUR)
+
+    assert lines(daily) == ["B1610_1d,psrType=Generation quantity_count=2i,quantity_sum=35 1709251200"]
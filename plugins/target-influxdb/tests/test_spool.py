@@ -0,0 +1,73 @@
+"""Tests of the write spool."""
+
+import pytest
+
+from target_influxdb import retry
+from target_influxdb.spool import WriteSpool, read_segment
+
+
+class WriteError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def spool_batches(directory, *payloads):
+    # One writer per payload, so each lands in its own segment
+    for payload in payloads:
+        writer = WriteSpool(str(directory), name="BOD")
+        writer.append(payload, "s")
+        writer.close()
+
+
+def test_rejected_segment_is_set_aside_and_replay_continues(tmp_path):
+    spool_batches(tmp_path, b"BOD bad=1 1", b"BOD good=1 2")
+    written = []
+
+    def write(payload, precision):
+        if b"bad" in payload:
+            raise WriteError(422)
+        written.append(payload)
+
+    replayed = WriteSpool(str(tmp_path), name="replay").replay(write, is_rejected=retry.is_splittable)
+
+    assert written == [b"BOD good=1 2"]
+    assert replayed == 1
+    assert not list(tmp_path.glob("*.seg"))
+    rejected = sorted(path.name for path in (tmp_path / "rejected").iterdir())
+    assert len(rejected) == 2 and rejected[1] == rejected[0] + ".error"
+
+
+def test_only_rejected_entries_of_a_segment_are_set_aside(tmp_path):
+    writer = WriteSpool(str(tmp_path), name="BOD")
+    for payload in (b"BOD a=1 1", b"BOD bad=1 2", b"BOD c=1 3"):
+        writer.append(payload, "s")
+    writer.close()
+    written = []
+
+    def write(payload, precision):
+        if b"bad" in payload:
+            raise WriteError(422)
+        written.append(payload)
+
+    replayed = WriteSpool(str(tmp_path), name="replay").replay(write, is_rejected=retry.is_splittable)
+
+    assert written == [b"BOD a=1 1", b"BOD c=1 3"]
+    assert replayed == 2
+    assert not list(tmp_path.glob("*.seg"))
+    [segment] = (tmp_path / "rejected").glob("*.seg")
+    with open(segment, "rb") as f:
+        assert list(read_segment(f)) == [("s", b"BOD bad=1 2")]
+
+
+def test_transient_error_stops_replay_and_keeps_segments(tmp_path):
+    spool_batches(tmp_path, b"BOD a=1 1", b"BOD b=1 2")
+
+    def write(payload, precision):
+        raise WriteError(503)
+
+    with pytest.raises(WriteError):
+        WriteSpool(str(tmp_path), name="replay").replay(write, is_rejected=retry.is_splittable)
+
+    assert len(list(tmp_path.glob("*.seg"))) == 2
+    assert not (tmp_path / "rejected").exists()
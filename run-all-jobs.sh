@@ -8,6 +8,15 @@ cd /app 2>/dev/null || cd "$(dirname "$0")" || true
 
 echo "$(date): Starting continuous ETL loop..."
 
+# Deep reconcile jobs (named *-reconcile-*) re-fetch a whole year of data, so
+# they run at most once every RECONCILE_INTERVAL_HOURS, not on every pass
+RECONCILE_INTERVAL_HOURS="${RECONCILE_INTERVAL_HOURS:-168}"
+
+reconcile_due() {
+    local stamp=".meltano/$1.last-success"
+    [ ! -f "$stamp" ] || [ -n "$(find "$stamp" -mmin +$((RECONCILE_INTERVAL_HOURS * 60)))" ]
+}
+
 # Function to get all active job names from meltano.yml
 get_active_jobs() {
     meltano job list --format=json 2>/dev/null | jq -r '.[].name' || \
@@ -31,9 +40,16 @@ while true; do
     
     # Run each job
     for job in $JOBS; do
+        if [[ "$job" == *-reconcile-* ]] && ! reconcile_due "$job"; then
+            echo "$(date): Skipping $job (last reconcile less than ${RECONCILE_INTERVAL_HOURS}h ago)"
+            continue
+        fi
         echo "$(date): Running job: $job"
         if meltano run "$job"; then
             echo "$(date): ✓ Completed: $job"
+            if [[ "$job" == *-reconcile-* ]]; then
+                mkdir -p .meltano && touch ".meltano/$job.last-success"
+            fi
         else
             echo "$(date): ✗ Failed: $job (continuing with remaining jobs)"
         fi